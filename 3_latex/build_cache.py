@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Content-hash build manifest for the md -> tex -> pdf pipeline.
+
+Every generated document gets one small JSON entry in build/manifest/<name>.json
+holding two keys:
+
+  source_key  hash of everything that shapes the .tex: markdown, template,
+              selected user profile entry (incl. date and font), style files,
+              referenced figures and the scripts that produce the .tex (parser,
+              texescape.py, template_engine.py)
+  pdf_key     hash of the .tex plus style files and figures it references,
+              recorded after a successful compile
+
+Entries are per document so parallel parser workers and concurrent
+compile.sh runs never write the same file.
+
+Usage (from compile.sh):
+  python3 build_cache.py pdf-fresh <file.tex> <file.pdf>   # exit 0 if up to date
+  python3 build_cache.py record-pdf <file.tex>
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+# Bump when the key layout changes so old manifests are ignored
+CACHE_VERSION = 2
+
+MANIFEST_DIR = Path("build") / "manifest"
+STYLE_GLOBS = ("style/*.cls", "style/*.sty")
+# Same lookup order as TEXINPUTS in compile.sh
+TEX_SEARCH_DIRS = (".", "style", "src", "src/applications")
+
+_FIGURE_RE = re.compile(r"\\(?:includegraphics(?:\[[^\]]*\])?|IfFileExists)\{([^{}]+)\}")
+
+# Digest cache keyed by (path, mtime_ns, size): batch runs hash the same
+# template/style/figure files for every document.
+_DIGESTS = {}
+
+
+def file_digest(path):
+    """Return the sha256 hex digest of a file, or 'missing' if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return "missing"
+    key = (str(path), st.st_mtime_ns, st.st_size)
+    digest = _DIGESTS.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        _DIGESTS[key] = digest
+    return digest
+
+
+def style_digest():
+    """Combined digest of the class and style files under style/."""
+    h = hashlib.sha256()
+    for pattern in STYLE_GLOBS:
+        for p in sorted(Path(".").glob(pattern)):
+            h.update(str(p).encode("utf-8"))
+            h.update(file_digest(p).encode("ascii"))
+    return h.hexdigest()
+
+
+def resolve_tex_path(ref):
+    """Resolve a path referenced from TeX the way TEXINPUTS would."""
+    ref = ref.replace("../figures/", "figures/")
+    for d in TEX_SEARCH_DIRS:
+        p = Path(d) / ref
+        if p.exists():
+            return p
+    return None
+
+
+def figures_digest(refs):
+    """Digest of referenced figures; a missing file hashes as 'missing'."""
+    h = hashlib.sha256()
+    for ref in sorted(set(r for r in refs if r)):
+        p = resolve_tex_path(str(ref))
+        h.update(str(ref).encode("utf-8"))
+        h.update((file_digest(p) if p else "missing").encode("ascii"))
+    return h.hexdigest()
+
+
+def source_key(md_file, template_path, user=None, tools=()):
+    """Hash of all inputs that determine the generated .tex for a letter."""
+    user = user or {}
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_VERSION}".encode("ascii"))
+    h.update(file_digest(md_file).encode("ascii"))
+    h.update(file_digest(template_path).encode("ascii"))
+    h.update(json.dumps(user, sort_keys=True, default=str).encode("utf-8"))
+    h.update(style_digest().encode("ascii"))
+    h.update(figures_digest([user.get("profile_pic"), user.get("signature_image")]).encode("ascii"))
+    for tool in tools:
+        h.update(file_digest(tool).encode("ascii"))
+    return h.hexdigest()
+
+
+def tex_key(tex_path):
+    """Hash of a .tex file plus the style files and figures it references."""
+    with open(tex_path, "r", encoding="utf-8", errors="replace") as f:
+        tex = f.read()
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_VERSION}".encode("ascii"))
+    h.update(tex.encode("utf-8"))
+    h.update(style_digest().encode("ascii"))
+    h.update(figures_digest(_FIGURE_RE.findall(tex)).encode("ascii"))
+    return h.hexdigest()
+
+
+def _entry_path(tex_path):
+    return MANIFEST_DIR / f"{Path(tex_path).stem}.json"
+
+
+def load_entry(tex_path):
+    """Return the manifest entry for a document, or {} if there is none."""
+    try:
+        with open(_entry_path(tex_path), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return entry if isinstance(entry, dict) else {}
+
+
+def _write_entry(tex_path, entry):
+    path = _entry_path(tex_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entry, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def is_source_fresh(tex_path, key):
+    """True if tex_path exists and was generated from inputs hashing to key."""
+    return Path(tex_path).exists() and load_entry(tex_path).get("source_key") == key
+
+
+def record_source(tex_path, key, md_file=None):
+    """Remember the source key a .tex was generated from."""
+    entry = load_entry(tex_path)
+    entry.update({"tex": str(tex_path), "source_key": key})
+    if md_file:
+        entry["md"] = str(md_file)
+    _write_entry(tex_path, entry)
+
+
+def is_pdf_fresh(tex_path, pdf_path):
+    """True if pdf_path exists and was compiled from the current .tex inputs."""
+    if not Path(pdf_path).exists() or not Path(tex_path).exists():
+        return False
+    pdf_key = load_entry(tex_path).get("pdf_key")
+    return pdf_key is not None and pdf_key == tex_key(tex_path)
+
+
+def record_pdf(tex_path):
+    """Remember the inputs of a successful compile."""
+    entry = load_entry(tex_path)
+    entry.update({"tex": str(tex_path), "pdf_key": tex_key(tex_path)})
+    _write_entry(tex_path, entry)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) == 3 and argv[0] == "pdf-fresh":
+        return 0 if is_pdf_fresh(argv[1], argv[2]) else 1
+    if len(argv) == 2 and argv[0] == "record-pdf":
+        record_pdf(argv[1])
+        return 0
+    print("Usage: build_cache.py pdf-fresh <file.tex> <file.pdf> | record-pdf <file.tex>")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
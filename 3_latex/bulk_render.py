@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Render pending letters and CVs of every candidate in one process.
+
+Replaces a shell loop over users calling parse_md_to_tex.py and
+parse_cv_universal.py once per file. Users are the profile ids in
+user_info.yml together with the folders below ../candidates/:
+
+  letters  ../candidates/<user>/2_applications-mds/**/*.md
+  CVs      ../candidates/<user>/1_profile/cv*.md (cv_<user>_de.md etc.)
+
+Letters are rendered with the profile of their candidate folder (or --user
+when there is none; without either they are skipped with a warning, as
+letters without contact details are no use), CVs with their user's profile
+into every --cv-template as CV_<user>_<template>_<lang>.tex. Profiles,
+templates and the escape tables are loaded once; documents whose inputs
+and PDF match the build manifest are skipped, so a rerun only does what
+changed.
+
+Work is interleaved round-robin across users (one document of each user in
+turn), for rendering as well as for the compile queue handed to
+compile_batch.sh, so a candidate with hundreds of letters does not hold up
+everyone else.
+
+Usage (from 3_latex/, or `make bulk`):
+  python3 bulk_render.py [--users a,b] [--template modern|engineering]
+                         [--cv-template hipster|luxsleek|all] [--no-letters] [--no-cvs]
+                         [--jobs N] [--font FONT] [--force] [--no-compile] [--dry-run]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from itertools import chain, zip_longest
+from pathlib import Path
+
+import build_cache
+import parse_cv_universal
+import parse_md_to_tex
+import pipeline_trace
+import profile_store
+import watch_mds
+
+CV_DIR = "1_profile"
+CV_GLOB = "[cC][vV]*.md"
+APPLICATIONS_DIR = Path("src") / "applications"
+OUTPUT_DIR = Path("output")
+
+
+def round_robin(groups):
+    """Items of several lists interleaved: first of each, then second of each, ..."""
+    _skip = object()
+    return [item for item in chain.from_iterable(zip_longest(*groups, fillvalue=_skip)) if item is not _skip]
+
+
+def discover_users(candidates, only=None):
+    """Sorted user ids: profile ids plus candidate folders (optionally only some)."""
+    users = set(profile_store.profile_ids())
+    if Path(candidates).is_dir():
+        users.update(
+            d.name for d in Path(candidates).iterdir() if d.is_dir() and not d.name.startswith((".", "0_"))
+        )
+    if only:
+        users &= set(only)
+    return sorted(users)
+
+
+def letters_of(tree, user):
+    """Letter markdown below candidates/<user>/2_applications-mds/."""
+    top = tree.candidates / user / watch_mds.LETTERS_DIR
+    return sorted(str(p) for p in tree.letters(top) if p.name.lower().endswith(".md")) if top.is_dir() else []
+
+
+def cvs_of(candidates, user):
+    """CV markdown in candidates/<user>/1_profile/."""
+    top = Path(candidates) / user / CV_DIR
+    return sorted(str(p) for p in top.glob(CV_GLOB)) if top.is_dir() else []
+
+
+def cv_jobs(user, profile, md_files, templates):
+    """(md, lang, template, output .tex) for every CV variant of a user.
+
+    The output name only holds user, template and language, so a second
+    markdown of the same language (cv.md next to cv_alex_en.md) would
+    overwrite the other's .tex. Files with a language suffix win, the
+    others are dropped. Returns (jobs, failed result dicts) like
+    parse_md_to_tex.split_duplicates.
+    """
+    jobs, failed = [], []
+    owners = {}
+    suffixes = {md: parse_cv_universal._LANG_SUFFIX_RE.search(Path(md).stem) for md in md_files}
+    for md in sorted(md_files, key=lambda md: (suffixes[md] is None, md)):
+        m = suffixes[md]
+        lang = m.group(1).lower() if m else "en"
+        if lang in owners:
+            failed.append({"md": md, "ok": False, "error": f"same {lang} CV output as {owners[lang]}; rename one"})
+            continue
+        owners[lang] = md
+        for template in templates:
+            out = APPLICATIONS_DIR / f"CV_{user}_{template}_{lang}.tex"
+            jobs.append((md, lang, template, out))
+    return jobs, failed
+
+
+def render_cvs(jobs, force=False):
+    """Render CV variants (user, profile, md, lang, template, out); each markdown is parsed once.
+
+    Returns result dicts shaped like parse_md_to_tex.run_batch's.
+    """
+    results = []
+    parsed = {}
+    for user, profile, md, lang, template, out in jobs:
+        key = cv_key(md, template, profile)
+        if not force and build_cache.is_source_fresh(out, key):
+            results.append({"md": md, "ok": True, "tex": str(out), "status": "unchanged"})
+            continue
+        try:
+            if md not in parsed:
+                parsed[md] = parse_cv_universal.load_cv_data(md, lang)
+            parse_cv_universal.render_cv(parsed[md], template, out, profile)
+        except Exception as e:
+            results.append({"md": md, "ok": False, "error": f"{type(e).__name__}: {e}"})
+            continue
+        build_cache.record_source(out, key, md)
+        results.append({"md": md, "ok": True, "tex": str(out), "status": "created"})
+    return results
+
+
+def is_pending(tex, key):
+    """Whether a document needs rendering or compiling according to the build manifest."""
+    pdf = OUTPUT_DIR / f"{Path(tex).stem}.pdf"
+    return not build_cache.is_source_fresh(tex, key) or not build_cache.is_pdf_fresh(tex, pdf)
+
+
+def letter_key(md, template, user, font=None):
+    """Build-cache key parse_md_to_tex gives a letter rendered today."""
+    _, effective = parse_md_to_tex.build_user_context(md, user, font=font)
+    return parse_md_to_tex.source_key(md, template, effective)
+
+
+def cv_key(md, template, profile):
+    """Build-cache key of one CV variant."""
+    return build_cache.source_key(
+        md, parse_cv_universal.TEMPLATES[template], profile, tools=parse_cv_universal.RENDER_TOOLS
+    )
+
+
+def main(argv=None):
+    pipeline_trace.startup("bulk.startup")
+    parser = argparse.ArgumentParser(description="Render pending letters and CVs of all candidates")
+    parser.add_argument("--candidates", default=str(watch_mds.CANDIDATES_DIR), help="Candidates folder")
+    parser.add_argument("--users", help="Comma list of user ids (default: all)")
+    parser.add_argument("--user", help="Profile for candidate folders that have none in user_info.yml")
+    parser.add_argument("--template", choices=sorted(watch_mds.TEMPLATES), default="modern", help="Letter template")
+    parser.add_argument(
+        "--cv-template", default="hipster", help="CV template, comma list or 'all' (default: hipster)"
+    )
+    parser.add_argument("--no-letters", action="store_true", help="Skip letters")
+    parser.add_argument("--no-cvs", action="store_true", help="Skip CVs")
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1, help="Render workers and parallel compiles (0 = one per CPU)"
+    )
+    parser.add_argument("--engine", "-e", default="xelatex", help="LaTeX engine for compile_batch.sh")
+    parser.add_argument("--font", help="Preferred letter font")
+    parser.add_argument("--force", action="store_true", help="Re-render and recompile everything")
+    parser.add_argument("--no-compile", action="store_true", help="Only write the .tex files")
+    parser.add_argument("--dry-run", action="store_true", help="List the pending documents only")
+    args = parser.parse_args(argv)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    cv_templates = parse_cv_universal._split_list(args.cv_template, parse_cv_universal.TEMPLATES, "--cv-template")
+
+    default_user = None
+    if args.user:
+        default_user = profile_store.get_profile(args.user)
+        if default_user is None:
+            print(f"Error: User profile '{args.user}' not found. Available: {profile_store.profile_ids()}")
+            return 1
+    users = discover_users(args.candidates, args.users.split(",") if args.users else None)
+    if not users:
+        print("No users found")
+        return 0
+
+    tree = watch_mds.Tree(args.candidates, watch_mds.CONTENT_DIR)
+    letter_groups, cv_groups, cv_failed = [], [], []
+    for user in users:
+        profile = profile_store.get_profile(user)
+        if not args.no_letters:
+            user_letters = letters_of(tree, user)
+            if profile is None and default_user is None:
+                if user_letters:
+                    print(f"Warning: no profile '{user}' in user_info.yml and no --user; skipping its letters")
+            else:
+                letter_groups.append([(md, profile or default_user) for md in user_letters])
+        if not args.no_cvs:
+            if profile is None:
+                if cvs_of(args.candidates, user):
+                    print(f"Warning: no profile '{user}' in user_info.yml; skipping its CVs")
+                continue
+            variants, failed = cv_jobs(user, profile, cvs_of(args.candidates, user), cv_templates)
+            cv_groups.append([(user, profile) + job for job in variants])
+            cv_failed.extend(failed)
+    letters, duplicates = parse_md_to_tex.split_duplicates(round_robin(letter_groups))
+    cvs = round_robin(cv_groups)
+    print(f"{len(users)} user(s): {len(letters)} letter(s), {len(cvs)} CV variant(s)")
+    template = watch_mds.TEMPLATES[args.template]
+    if args.dry_run:
+        pending = 0
+        for md, user in letters:
+            tex = APPLICATIONS_DIR / f"{Path(md).stem}.tex"
+            if args.force or is_pending(tex, letter_key(md, template, user, args.font)):
+                pending += 1
+                print(f"[dry-run] letter: {md}")
+        for user, profile, md, _, cv_template, out in cvs:
+            if args.force or is_pending(out, cv_key(md, cv_template, profile)):
+                pending += 1
+                print(f"[dry-run] cv {user}: {md} -> {out}")
+        for r in duplicates + cv_failed:
+            print(f"[dry-run] skipped: {r['md']} ({r['error']})")
+        print(f"[dry-run] {pending} document(s) pending")
+        return 0
+
+    work = [(md, template, user, None, args.font, args.force) for md, user in letters]
+    with pipeline_trace.span("bulk.render", files=len(work) + len(cvs), users=len(users)):
+        cv_results = render_cvs(cvs, args.force)
+        letter_results = parse_md_to_tex.run_jobs(work, template, jobs) if work else []
+    results = cv_results + letter_results + duplicates + cv_failed
+    ok = parse_md_to_tex.print_batch_summary(results)
+
+    # Compile in the interleaved order; skip PDFs the build manifest has
+    texs = [r["tex"] for r in round_robin([cv_results, letter_results]) if r["ok"]]
+    if not args.force:
+        texs = [t for t in texs if not build_cache.is_pdf_fresh(t, OUTPUT_DIR / f"{Path(t).stem}.pdf")]
+    if not texs:
+        print("All PDFs up to date")
+        return 0 if ok else 2
+    if args.no_compile:
+        print(f"Not compiling {len(texs)} document(s) (--no-compile)")
+        return 0 if ok else 2
+    with pipeline_trace.span("bulk.compile", files=len(texs)):
+        proc = subprocess.run(
+            ["bash", "./compile_batch.sh", "-j", str(jobs), "-e", args.engine],
+            input="".join(t + "\n" for t in texs),
+            text=True,
+            env=dict(os.environ, PYTHON=sys.executable, **({"FORCE": "1"} if args.force else {})),
+        )
+    return 0 if ok and proc.returncode == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
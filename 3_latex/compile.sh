@@ -3,6 +3,16 @@
 # LaTeX Compilation Script with Automatic Organization
 # Usage: ./compile.sh <filename.tex> [engine]
 # Example: ./compile.sh main.tex xelatex
+#
+# Set ISOLATED_BUILD=1 to compile inside a private scratch directory
+# (build/jobs/<name>.XXXXXX) so several compiles can run at the same time
+# without clobbering each other's aux/log files. compile_batch.sh does this.
+#
+# Set FMT=1 to compile against a cached precompiled preamble (build/fmt/,
+# see texformat.py); the first compile of a template dumps the format.
+#
+# The xelatex log is analyzed by texlog.py (errors with file and line, font
+# fallbacks, overfull boxes, missing files) into build/reports/<name>.json.
 #########################################################
 
 set -e  # Exit on error
@@ -19,6 +29,33 @@ OUTPUT_DIR="output"
 BUILD_DIR="build"
 DEFAULT_ENGINE="xelatex"
 
+# Timing spans for `make stats`, one JSON line per stage (same format as
+# pipeline_trace.py). PIPELINE_TRACE=0 disables them.
+PIPELINE_METRICS="${PIPELINE_METRICS:-$BUILD_DIR/metrics.jsonl}"
+PIPELINE_RUN_ID="${PIPELINE_RUN_ID:-$(date +%Y%m%dT%H%M%S)-$$}"
+trace_now() {
+    # EPOCHREALTIME needs bash 5 (and may use a decimal comma); older bash uses perl
+    if [ -n "${EPOCHREALTIME}" ]; then
+        TRACE_NOW="${EPOCHREALTIME/,/.}"
+    else
+        TRACE_NOW=$(perl -MTime::HiRes=time -e 'printf "%.6f", time')
+    fi
+}
+# trace_span <stage> <start> [exit status]
+trace_span() {
+    [ "${PIPELINE_TRACE}" = "0" ] && return 0
+    local ok=true doc
+    [ "${3:-0}" = "0" ] || ok=false
+    trace_now
+    doc="${BASENAME//\\/\\\\}"
+    doc="${doc//\"/\\\"}"
+    [ -d "$(dirname "$PIPELINE_METRICS")" ] || mkdir -p "$(dirname "$PIPELINE_METRICS")"
+    printf '{"run":"%s","stage":"%s","doc":"%s","start":%s,"end":%s,"ok":%s,"pid":%d}\n' \
+        "$PIPELINE_RUN_ID" "$1" "$doc" "$2" "$TRACE_NOW" "$ok" "$$" >> "$PIPELINE_METRICS" 2>/dev/null || true
+}
+trace_now
+T_TOTAL=$TRACE_NOW
+
 # Parse arguments
 if [ $# -eq 0 ]; then
     echo -e "${RED}Error: No .tex file specified${NC}"
@@ -60,9 +97,38 @@ echo -e "Build:   ${YELLOW}$BUILD_DIR/${NC}"
 echo -e "Output:  ${YELLOW}$OUTPUT_DIR/${BASENAME}.pdf${NC}"
 echo -e "${GREEN}════════════════════════════════════════${NC}"
 
+# Skip the compile when the PDF was already built from identical inputs
+# (.tex, style files, referenced figures; see build_cache.py).
+# Set FORCE=1 to always recompile.
+PYTHON="${PYTHON:-python3}"
+trace_now
+T_STAGE=$TRACE_NOW
+if [ -z "${FORCE}" ] && [ -f build_cache.py ] && \
+    "$PYTHON" build_cache.py pdf-fresh "$SOURCE_FILE" "$OUTPUT_DIR/$BASENAME.pdf" 2>/dev/null; then
+    echo -e "${GREEN}✓ Up to date: $OUTPUT_DIR/$BASENAME.pdf (set FORCE=1 to rebuild)${NC}"
+    trace_span compile.uptodate "$T_STAGE"
+    exit 0
+fi
+trace_span compile.cachecheck "$T_STAGE"
+
+# Structured log report of this compile (texlog.py); a stale one from an
+# earlier compile must not outlive a failed run
+REPORT_FILE="$BUILD_DIR/reports/$BASENAME.json"
+rm -f "$REPORT_FILE"
+
 # Create directories if they don't exist
 mkdir -p "$BUILD_DIR" "$OUTPUT_DIR"
 
+# Directory xelatex writes into. In isolated mode every compile gets its own
+# scratch directory which is removed again on exit.
+if [ "${ISOLATED_BUILD}" = "1" ]; then
+    mkdir -p "$BUILD_DIR/jobs"
+    WORK_DIR=$(mktemp -d "$BUILD_DIR/jobs/${BASENAME}.XXXXXX")
+else
+    WORK_DIR="$BUILD_DIR"
+fi
+LOG_FILE="$WORK_DIR/$BASENAME.log"
+
 # Function to collect build artifacts (logs, aux files) into build/logs
 collect_build_artifacts() {
     # Don't fail the script if copying artifacts fails
@@ -73,12 +139,20 @@ collect_build_artifacts() {
 
     # Copy files produced inside build dir
     for ext in log fls fdb_latexmk aux out synctex.gz xdv; do
-        for f in "$BUILD_DIR"/*."$ext"; do
+        for f in "$WORK_DIR"/*."$ext"; do
             [ -e "$f" ] || continue
             cp -a "$f" "$LOG_DIR/$(basename "$f").$TS" 2>/dev/null || true
         done
     done
 
+    if [ "$WORK_DIR" != "$BUILD_DIR" ]; then
+        # Isolated compile: drop the private scratch directory. Files at the
+        # repository root may belong to other compiles, so leave them alone.
+        rm -rf "$WORK_DIR"
+        set -e
+        return
+    fi
+
     # Also copy any auxiliary/log files created at repository root
     for ext in log fls fdb_latexmk aux out synctex.gz xdv; do
         for f in ./*."$ext"; do
@@ -91,133 +165,148 @@ collect_build_artifacts() {
 }
 
 # Ensure we always try to collect logs on exit (success or failure)
-trap 'collect_build_artifacts' EXIT
+finish() {
+    local status=$?
+    trace_now
+    local t_artifacts=$TRACE_NOW
+    collect_build_artifacts
+    trace_span compile.artifacts "$t_artifacts"
+    trace_span compile.total "$T_TOTAL" "$status"
+}
+trap 'finish' EXIT
 
 # Preflight checks: fail early if source .tex contains unsafe tokens
 echo -e "\n${YELLOW}[0/3] Running preflight checks...${NC}"
-# Read source and search for patterns that commonly break LaTeX or indicate placeholders
-## Detect unescaped ampersands using Perl (works on macOS)
-## Ignore lines that are comments (start with optional whitespace then %)
-## Also ignore ampersands in tabular/array environments (between \begin{tabular} and \end{tabular})
-RAW_AMP_COUNT=$(perl -nle 'next if /^[[:space:]]*%/; next if /\\begin\{tabular/ .. /\\end\{tabular/; next if /\\begin\{array/ .. /\\end\{array/; print "$.:$_" if /(?<!\\)\&/' "$SOURCE_FILE" 2>/dev/null || true)
-## Find placeholder tokens but ignore those that are only in commented lines (lines starting with optional whitespace then %)
-## Also ignore LaTeX command definitions like {\small$\diamond$\ #1}
-PLACEHOLDERS=$(awk '/\{\{[^}]+\}\}/ { if ($0 !~ /^[[:space:]]*%/ && $0 !~ /\\newcommand/ && $0 !~ /\\small\$\\diamond\$/) print NR":"$0 }' "$SOURCE_FILE" || true)
-TODO_MARKS=$(grep -n --line-buffered -i "TODO" "$SOURCE_FILE" || true)
-
-ERR=0
-if [ -n "$RAW_AMP_COUNT" ]; then
-    echo -e "${RED}Preflight: Found unescaped ampersand(s) in source:${NC}"
-    echo "$RAW_AMP_COUNT"
-    ERR=1
-fi
-if [ -n "$PLACEHOLDERS" ]; then
-    echo -e "${RED}Preflight: Found placeholder token(s) like {{...}} in source:${NC}"
-    echo "$PLACEHOLDERS"
-    ERR=1
-fi
-if [ -n "$TODO_MARKS" ]; then
-    echo -e "${YELLOW}Preflight: Found TODO markers (case-insensitive):${NC}"
-    echo "$TODO_MARKS"
-    # Do not treat TODO as fatal by default; just warn
-fi
+trace_now
+T_STAGE=$TRACE_NOW
+# The parsers run the same checks in Python before writing the .tex and leave
+# a stamp in build/preflight/ for clean output; skip the shell checks while
+# the stamp is at least as new as the source. FORCE=1 always re-checks.
+PREFLIGHT_STAMP="$BUILD_DIR/preflight/$BASENAME.ok"
+if [ -z "${FORCE}" ] && [ -f "$PREFLIGHT_STAMP" ] && [ ! "$SOURCE_FILE" -nt "$PREFLIGHT_STAMP" ]; then
+    echo -e "${GREEN}✓ Preflight already passed when the source was generated${NC}"
+else
+    # Read source and search for patterns that commonly break LaTeX or indicate placeholders
+    ## Detect unescaped ampersands using Perl (works on macOS)
+    ## Ignore lines that are comments (start with optional whitespace then %)
+    ## Also ignore ampersands in tabular/array environments (between \begin{tabular} and \end{tabular})
+    RAW_AMP_COUNT=$(perl -nle 'next if /^[[:space:]]*%/; next if /\\begin\{tabular/ .. /\\end\{tabular/; next if /\\begin\{array/ .. /\\end\{array/; print "$.:$_" if /(?<!\\)\&/' "$SOURCE_FILE" 2>/dev/null || true)
+    ## Find placeholder tokens but ignore those that are only in commented lines (lines starting with optional whitespace then %)
+    ## Also ignore LaTeX command definitions like {\small$\diamond$\ #1}
+    PLACEHOLDERS=$(awk '/\{\{[^}]+\}\}/ { if ($0 !~ /^[[:space:]]*%/ && $0 !~ /\\newcommand/ && $0 !~ /\\small\$\\diamond\$/) print NR":"$0 }' "$SOURCE_FILE" || true)
+    TODO_MARKS=$(grep -n --line-buffered -i "TODO" "$SOURCE_FILE" || true)
 
-if [ $ERR -ne 0 ]; then
-    echo -e "${RED}Preflight failed. Please fix the above issues in the .tex source or the markdown -> parser output before compiling.${NC}"
-    exit 2
+    ERR=0
+    if [ -n "$RAW_AMP_COUNT" ]; then
+        echo -e "${RED}Preflight: Found unescaped ampersand(s) in source:${NC}"
+        echo "$RAW_AMP_COUNT"
+        ERR=1
+    fi
+    if [ -n "$PLACEHOLDERS" ]; then
+        echo -e "${RED}Preflight: Found placeholder token(s) like {{...}} in source:${NC}"
+        echo "$PLACEHOLDERS"
+        ERR=1
+    fi
+    if [ -n "$TODO_MARKS" ]; then
+        echo -e "${YELLOW}Preflight: Found TODO markers (case-insensitive):${NC}"
+        echo "$TODO_MARKS"
+        # Do not treat TODO as fatal by default; just warn
+    fi
+
+    if [ $ERR -ne 0 ]; then
+        echo -e "${RED}Preflight failed. Please fix the above issues in the .tex source or the markdown -> parser output before compiling.${NC}"
+        trace_span compile.preflight "$T_STAGE" 2
+        exit 2
+    fi
 fi
+trace_span compile.preflight "$T_STAGE"
 
 # Compile with engine
 echo -e "\n${YELLOW}[1/3] Compiling with $ENGINE...${NC}"
 # Add style directory to TEXINPUTS so LaTeX can find custom class files
 export TEXINPUTS=".:./style:./src:./src/applications:$TEXINPUTS"
-$ENGINE \
-    -interaction=nonstopmode \
-    -halt-on-error \
-    -output-directory="$BUILD_DIR" \
-    "$SOURCE_FILE"
-
-# Check if PDF was created
-if [ ! -f "$BUILD_DIR/$BASENAME.pdf" ]; then
+run_engine() {
+    $ENGINE \
+        -interaction=nonstopmode \
+        -halt-on-error \
+        -file-line-error \
+        -output-directory="$WORK_DIR" \
+        "$@" \
+        "$SOURCE_FILE"
+}
+
+# FMT=1: compile against a precompiled preamble format (see texformat.py).
+# Falls back to a normal compile when there is no format or it fails.
+FMT_NAME=""
+if [ "${FMT}" = "1" ]; then
+    trace_now
+    T_STAGE=$TRACE_NOW
+    FMT_NAME=$("$PYTHON" texformat.py ensure "$SOURCE_FILE" "$ENGINE" || true)
+    trace_span compile.format "$T_STAGE"
+fi
+trace_now
+T_STAGE=$TRACE_NOW
+ENGINE_STATUS=0
+if [ -n "$FMT_NAME" ]; then
+    echo -e "Format:  ${YELLOW}$BUILD_DIR/fmt/$FMT_NAME.fmt${NC}"
+    if ! TEXFORMATS="$PWD/$BUILD_DIR/fmt:${TEXFORMATS}" run_engine -fmt="$FMT_NAME"; then
+        echo -e "${YELLOW}Warning: compile with format $FMT_NAME failed, retrying without it${NC}"
+        run_engine || ENGINE_STATUS=$?
+    fi
+else
+    run_engine || ENGINE_STATUS=$?
+fi
+trace_span compile.engine "$T_STAGE" "$ENGINE_STATUS"
+
+# Check if PDF was created; list the errors from the log when it was not
+if [ "$ENGINE_STATUS" -ne 0 ] || [ ! -f "$WORK_DIR/$BASENAME.pdf" ]; then
     echo -e "${RED}Error: Compilation failed - no PDF generated${NC}"
-    echo -e "Check $BUILD_DIR/$BASENAME.log for errors"
+    if [ -f "$LOG_FILE" ]; then
+        "$PYTHON" texlog.py analyze "$LOG_FILE" --tex "$SOURCE_FILE" --save "$REPORT_FILE" --status >/dev/null || true
+    fi
+    if [ "$WORK_DIR" = "$BUILD_DIR" ]; then
+        echo -e "Check $BUILD_DIR/$BASENAME.log for errors"
+    else
+        echo -e "Check $BUILD_DIR/logs/$BASENAME.log.* for errors"
+    fi
+    [ "$ENGINE_STATUS" -ne 0 ] && exit "$ENGINE_STATUS"
     exit 1
 fi
 
-# Move PDF to output directory
+# Move PDF to output directory. Stage it next to the target first so the
+# final rename is atomic: readers never see a half-written PDF, even when the
+# build and output directories live on different filesystems.
 echo -e "${YELLOW}[2/3] Moving PDF to output directory...${NC}"
-mv "$BUILD_DIR/$BASENAME.pdf" "$OUTPUT_DIR/$BASENAME.pdf"
-
-# Detect which font was requested in the source and whether compilation logged any fallbacks
-LOG_FILE="$BUILD_DIR/$BASENAME.log"
-REQUESTED_FONT=""
-# Try to extract an explicit \setmainfont or \setsansfont from the source (first occurrence)
-REQUESTED_FONT=$(/usr/bin/grep -oE "\\\\(setmainfont|setsansfont)\{[^}]+\}" "$SOURCE_FILE" 2>/dev/null | head -n1 | sed -E "s/.*\{([^}]+)\}.*/\1/") || true
-if [ -z "$REQUESTED_FONT" ]; then
-    # Fallback: look for the first \IfFontExistsTF{FontName} pattern
-    REQUESTED_FONT=$(/usr/bin/grep -oE "\\\\IfFontExistsTF\{[^}]+\}" "$SOURCE_FILE" 2>/dev/null | head -n1 | sed -E "s/.*\{([^}]+)\}.*/\1/" ) || true
-fi
+trace_now
+T_STAGE=$TRACE_NOW
+STAGED_PDF="$OUTPUT_DIR/.$BASENAME.pdf.$$"
+mv "$WORK_DIR/$BASENAME.pdf" "$STAGED_PDF"
+mv -f "$STAGED_PDF" "$OUTPUT_DIR/$BASENAME.pdf"
+# Record the inputs of this successful compile in the build manifest
+"$PYTHON" build_cache.py record-pdf "$SOURCE_FILE" 2>/dev/null || true
+trace_span compile.record "$T_STAGE"
+
+# One pass over the log (texlog.py): font substitutions against the font the
+# source requests, overfull boxes and missing files; the report is saved to
+# build/reports/<name>.json for `texlog.py summary`.
+trace_now
+T_STAGE=$TRACE_NOW
 APPLIED_STATUS="(unknown)"
-if [ -f "$LOG_FILE" ] && [ -n "$REQUESTED_FONT" ]; then
-    # Look for notable log messages related to fonts
-    NOTFOUND_MATCH=$(/usr/bin/grep -i -n "not found" "$LOG_FILE" 2>/dev/null | /usr/bin/grep -i "$REQUESTED_FONT" || true)
-    SHAPE_MATCH=$(/usr/bin/grep -i -n "Font shape" "$LOG_FILE" 2>/dev/null | /usr/bin/grep -i "$REQUESTED_FONT" || true)
-
-    # Capture explicit 'using `...` instead' substitution lines (may include internal spec like TU/Name(0)/m/n)
-    # Use a safer pipeline that avoids shell-interpreting backticks.
-    # Strip grep's line numbers first, then normalize the backtick to a pipe and extract the bit
-    SUBSTITUTED_SPEC=$(/usr/bin/grep -n 'using `' "$LOG_FILE" 2>/dev/null | sed -E 's/^[0-9]+://' | sed 's/`/|/g' | sed "s/' instead//" | sed -E 's/ on input line [0-9]+\.?$//' | cut -d'|' -f2 | tr '\n' ',' | sed 's/,$//' || true)
-
-    if [ -n "$NOTFOUND_MATCH" ] || [ -n "$SHAPE_MATCH" ] || [ -n "$SUBSTITUTED_SPEC" ]; then
-        if [ -n "$SUBSTITUTED_SPEC" ]; then
-            # Try to extract a readable font family from the substituted spec
-            # e.g. TU/SourceSans3(0)/m/n -> SourceSans3
-            CLEAN_SUB=$(echo "$SUBSTITUTED_SPEC" | tr ',' '\n' | sed -E 's#^.*/([^/()]+)\([0-9]+\)/.*#\1#; s#^.*/([^/()]+)$#\1#' | awk '{print $1}' | tr '\n' ',' | sed 's/,$//' )
-            APPLIED_STATUS="requested font '$REQUESTED_FONT' (fallback → ${CLEAN_SUB} [raw: ${SUBSTITUTED_SPEC}])"
-        else
-            APPLIED_STATUS="requested font '$REQUESTED_FONT' (fallback/substitution detected — see log excerpt below)"
-        fi
-
-        # Print a short relevant excerpt from the log to aid debugging
-    MATCH_LINE=$(/usr/bin/grep -n -E 'not found|Font shape|using `' "$LOG_FILE" 2>/dev/null | head -n1 | cut -d: -f1 || true)
-        if [ -n "$MATCH_LINE" ]; then
-            START=$((MATCH_LINE > 3 ? MATCH_LINE - 3 : 1))
-            END=$((MATCH_LINE + 3))
-            echo -e "${YELLOW}Relevant log excerpt (around line $MATCH_LINE):${NC}"
-            sed -n "${START},${END}p" "$LOG_FILE" | sed -n '1,200p'
-        fi
-    else
-        APPLIED_STATUS="requested font '$REQUESTED_FONT' (appears applied)"
-    fi
-elif [ -f "$LOG_FILE" ] && [ -z "$REQUESTED_FONT" ]; then
-    # No explicit requested font found in source; try to show any font names mentioned in log
-    LOG_FONTS=$(/usr/bin/grep -iE "font|Font" "$LOG_FILE" 2>/dev/null | sed -n '1,6p' | tr '\n' ' ')
-    if [ -n "$LOG_FONTS" ]; then
-        APPLIED_STATUS="Fonts mentioned in log: ${LOG_FONTS}"
-    fi
+if [ -f "$LOG_FILE" ]; then
+    APPLIED_STATUS=$("$PYTHON" texlog.py analyze "$LOG_FILE" --tex "$SOURCE_FILE" --pdf "$OUTPUT_DIR/$BASENAME.pdf" \
+        --save "$REPORT_FILE" --status) || APPLIED_STATUS="(unknown)"
 fi
 
-# If pdffonts is available, run it to show which fonts are embedded in the final PDF
-EMBEDDED_FONTS=""
-PDF_PATH="$OUTPUT_DIR/$BASENAME.pdf"
-if command -v pdffonts >/dev/null 2>&1 && [ -f "$PDF_PATH" ]; then
-    # pdffonts output has a two-line header; collect font names from first column
-    EMBEDDED_FONTS=$(/usr/bin/pdffonts "$PDF_PATH" 2>/dev/null | awk 'NR>2 {print $1}' | tr '\n' ',' | sed 's/,$//' || true)
-    if [ -n "$EMBEDDED_FONTS" ]; then
-        # Try to find a match between requested font and embedded font names (case-insensitive substring)
-        MATCHING_EMBED=$(echo "$EMBEDDED_FONTS" | tr ',' '\n' | /usr/bin/awk -v rq="$REQUESTED_FONT" 'BEGIN{IGNORECASE=1} index(tolower($0), tolower(rq)) { print $0; exit }') || true
-        if [ -n "$MATCHING_EMBED" ]; then
-            APPLIED_STATUS="$APPLIED_STATUS; embedded font: ${MATCHING_EMBED}"
-        else
-            APPLIED_STATUS="$APPLIED_STATUS; embedded fonts: ${EMBEDDED_FONTS}"
-        fi
-    fi
-fi
+trace_span compile.fontscan "$T_STAGE"
 
 echo -e "${YELLOW}[3/3] Cleaning up auxiliary files in build directory...${NC}"
 # By default remove auxiliary files produced inside the build directory.
 # Set KEEP_BUILD_LOGS=1 in the environment if you want to keep the .log files for debugging.
-if [ "${KEEP_BUILD_LOGS}" = "1" ]; then
+if [ "$WORK_DIR" != "$BUILD_DIR" ]; then
+    # Isolated compile: the scratch directory is removed on exit after its
+    # logs have been copied to $BUILD_DIR/logs.
+    :
+elif [ "${KEEP_BUILD_LOGS}" = "1" ]; then
     echo -e "${YELLOW}Keeping build logs in ${BUILD_DIR}/${NC} (KEEP_BUILD_LOGS=1)"
     rm -f "$BUILD_DIR"/*.{aux,out,fls,fdb_latexmk,synctex.gz,xdv} 2>/dev/null || true
 else
@@ -225,7 +314,9 @@ else
 fi
 
 # Also remove any stray auxiliary files that may have been written to the repository root
-rm -f ./*.aux ./*.log ./*.out ./*.fls ./*.fdb_latexmk ./*.synctex.gz ./*.xdv 2>/dev/null || true
+if [ "$WORK_DIR" = "$BUILD_DIR" ]; then
+    rm -f ./*.aux ./*.log ./*.out ./*.fls ./*.fdb_latexmk ./*.synctex.gz ./*.xdv 2>/dev/null || true
+fi
 
 echo -e "${GREEN}════════════════════════════════════════${NC}"
 echo -e "${GREEN}✓ Success!${NC}"
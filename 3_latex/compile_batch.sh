@@ -0,0 +1,107 @@
+#!/bin/bash
+#########################################################
+# Parallel LaTeX compilation
+# Usage: ./compile_batch.sh [-j N] [-e engine] [file.tex ...]
+#        (reads .tex paths from stdin, one per line, when no files are given)
+# Example: ./compile_batch.sh -j 8 src/applications/*.tex
+#
+# Every document is compiled by compile.sh with ISOLATED_BUILD=1, i.e. in
+# its own scratch build directory, so up to N xelatex processes can run at
+# once. PDFs only land in output/ when their compile succeeded.
+#
+# Afterwards the per-document log reports (build/reports/, see texlog.py)
+# are summarized across the batch.
+#
+# Optional environment:
+#   OK_LIST=path    append "<name>.pdf" for every successful compile
+#   FAIL_LIST=path  append the .tex path of every failed compile
+#########################################################
+
+set -e
+
+# Colors for output
+RED='\033[0;31m'
+GREEN='\033[0;32m'
+YELLOW='\033[1;33m'
+NC='\033[0m' # No Color
+
+BUILD_DIR="build"
+DEFAULT_ENGINE="xelatex"
+
+JOBS=""
+ENGINE="$DEFAULT_ENGINE"
+while getopts "j:e:" opt; do
+    case "$opt" in
+        j) JOBS="$OPTARG" ;;
+        e) ENGINE="$OPTARG" ;;
+        *)
+            echo "Usage: ./compile_batch.sh [-j N] [-e engine] [file.tex ...]"
+            exit 1
+            ;;
+    esac
+done
+shift $((OPTIND - 1))
+
+# Default / JOBS=0: one compile per CPU core
+if [ -z "$JOBS" ] || [ "$JOBS" = "0" ]; then
+    JOBS=$(getconf _NPROCESSORS_ONLN 2>/dev/null || sysctl -n hw.ncpu 2>/dev/null || echo 1)
+fi
+
+FILES=()
+if [ $# -gt 0 ]; then
+    FILES=("$@")
+else
+    while IFS= read -r line; do
+        [ -n "$line" ] && FILES+=("$line")
+    done
+fi
+
+if [ ${#FILES[@]} -eq 0 ]; then
+    echo -e "${YELLOW}compile_batch: nothing to compile${NC}"
+    exit 0
+fi
+
+LOG_DIR="$BUILD_DIR/logs"
+mkdir -p "$LOG_DIR"
+RESULT_DIR=$(mktemp -d "$BUILD_DIR/batch.XXXXXX")
+trap 'rm -rf "$RESULT_DIR"' EXIT
+
+echo -e "${GREEN}Compiling ${#FILES[@]} document(s) with up to $JOBS parallel $ENGINE process(es)${NC}"
+
+# Compile one document; its console output goes to build/logs/<name>.compile.txt
+# and an empty marker file records the outcome for the summary below.
+compile_one() {
+    local tex="$1"
+    local base
+    base=$(basename "$tex" .tex)
+    local out="$LOG_DIR/$base.compile.txt"
+    if ISOLATED_BUILD=1 bash ./compile.sh "$tex" "$ENGINE" >"$out" 2>&1; then
+        echo -e "${GREEN}✓${NC} $tex"
+        : > "$RESULT_DIR/ok.$base"
+    else
+        echo -e "${RED}✗${NC} $tex (see $out)"
+        printf '%s\n' "$tex" > "$RESULT_DIR/fail.$base"
+    fi
+}
+export -f compile_one
+export ENGINE LOG_DIR RESULT_DIR RED GREEN NC PYTHON FORCE
+
+printf '%s\0' "${FILES[@]}" | xargs -0 -n1 -P "$JOBS" bash -c 'compile_one "$1"' _
+
+OK_COUNT=0
+FAIL_COUNT=0
+for f in "$RESULT_DIR"/ok.*; do
+    [ -e "$f" ] || continue
+    OK_COUNT=$((OK_COUNT + 1))
+    if [ -n "$OK_LIST" ]; then echo "${f##*/ok.}.pdf" >> "$OK_LIST"; fi
+done
+for f in "$RESULT_DIR"/fail.*; do
+    [ -e "$f" ] || continue
+    FAIL_COUNT=$((FAIL_COUNT + 1))
+    if [ -n "$FAIL_LIST" ]; then cat "$f" >> "$FAIL_LIST"; fi
+done
+
+echo -e "${GREEN}compile_batch: $OK_COUNT succeeded${NC}, ${RED}$FAIL_COUNT failed${NC}"
+# Errors, font fallbacks, boxes and missing files across the batch (texlog.py)
+printf '%s\n' "${FILES[@]}" | "${PYTHON:-python3}" texlog.py summary - || true
+[ "$FAIL_COUNT" -eq 0 ]
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Parsed-document cache (IR) for the letter and CV parsers.
+
+The parsers turn markdown into plain data before any template is touched:
+parse_md_to_tex the front matter and the \\lettercontent sections of a
+letter, parse_cv_universal the skills/experience/education/... dict of a
+CV. That result is kept as one compact JSON file per source document in
+build/ir/<kind>/<name>-<path hash>.json:
+
+  version  IR_VERSION; files of another version are ignored
+  key      hash of the source path and content, the parser script(s) and
+           parse options (e.g. the CV language)
+  source   the markdown path
+  data     the parsed document
+
+A run whose markdown did not change loads the IR instead of re-running the
+regex parsers, and other tools can read parsed documents the same way
+(parse_md_to_tex.load_letter, parse_cv_universal.load_cv_data). Writes go
+through a temp file and os.replace, so concurrent workers never see a
+partial file.
+
+Usage (from 3_latex/):
+  python3 ir_cache.py show <file.md> [--cv] [--lang en|de]   # print the IR (parses on a miss)
+  python3 ir_cache.py list                                   # cached documents
+  python3 ir_cache.py prune                                  # drop IRs of deleted sources
+"""
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+import build_cache
+
+# Bump when the shape of a parser's data changes
+IR_VERSION = 1
+
+IR_DIR = Path("build") / "ir"
+
+
+def ir_key(kind, source, tools=(), options=None):
+    """Hash of everything a document's IR depends on."""
+    h = hashlib.sha256()
+    h.update(f"ir{IR_VERSION}:{kind}".encode("ascii"))
+    h.update(str(Path(source).resolve()).encode("utf-8"))
+    h.update(build_cache.file_digest(source).encode("ascii"))
+    for tool in tools:
+        h.update(build_cache.file_digest(tool).encode("ascii"))
+    h.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+def ir_path(kind, source):
+    """IR file of a source document; one per path, overwritten when it changes."""
+    path_hash = hashlib.sha1(str(Path(source).resolve()).encode("utf-8")).hexdigest()[:12]
+    return IR_DIR / kind / f"{Path(source).stem}-{path_hash}.json"
+
+
+def _read(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return entry if isinstance(entry, dict) and entry.get("version") == IR_VERSION else None
+
+
+def load(kind, source, key):
+    """The cached data of a document if its IR matches key, else None."""
+    entry = _read(ir_path(kind, source))
+    return entry["data"] if entry and entry.get("key") == key else None
+
+
+def store(kind, source, key, data):
+    """Write a document's IR."""
+    path = ir_path(kind, source)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    entry = {"version": IR_VERSION, "kind": kind, "key": key, "source": str(Path(source).resolve()), "data": data}
+    tmp = path.with_name(f".{path.name}.{os.getpid()}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def cached(kind, source, parse, tools=(), options=None):
+    """parse(source) served from the IR while source and tools are unchanged."""
+    key = ir_key(kind, source, tools, options)
+    data = load(kind, source, key)
+    if data is None:
+        data = parse(source)
+        try:
+            store(kind, source, key, data)
+        except OSError as e:
+            print(f"Warning: cannot write IR for {source}: {e}")
+    return data
+
+
+def entries():
+    """(IR file, entry) for every readable IR, sorted by path."""
+    for path in sorted(IR_DIR.glob("*/*.json")):
+        entry = _read(path)
+        if entry is not None:
+            yield path, entry
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) >= 2 and argv[0] == "show":
+        source = argv[1]
+        if not Path(source).is_file():
+            print(f"Error: file not found: {source}")
+            return 1
+        if "--cv" in argv:
+            import parse_cv_universal
+
+            lang = argv[argv.index("--lang") + 1] if "--lang" in argv[:-1] else None
+            data = parse_cv_universal.load_cv_data(source, lang)
+        else:
+            import parse_md_to_tex
+
+            data = parse_md_to_tex.load_letter(source)
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+        return 0
+    if argv == ["list"]:
+        count = 0
+        for path, entry in entries():
+            count += 1
+            print(f"{entry.get('kind', '?'):<7} {path.stat().st_size:>8,} B  {entry.get('source')}")
+        print(f"{count} document(s) in {IR_DIR}")
+        return 0
+    if argv == ["prune"]:
+        removed = 0
+        for path, entry in entries():
+            if not Path(entry.get("source", "")).is_file():
+                path.unlink()
+                removed += 1
+        print(f"Removed {removed} IR file(s)")
+        return 0
+    print("Usage: ir_cache.py show <file.md> [--cv] [--lang en|de] | list | prune")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
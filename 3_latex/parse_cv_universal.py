@@ -2,6 +2,12 @@
 """
 Universal CV parser supporting multiple templates (hipster, luxsleek)
 Usage: python parse_cv_universal.py <cv_markdown_file> --user <user_id> [--template hipster|luxsleek]
+       python parse_cv_universal.py <cv_markdown_file> --user <user_id> --templates all --langs en,de
+                                    [--tex-list FILE]
+
+The fan-out form parses each language's markdown once and renders it into
+every requested template (CV_<user>_<template>_<lang>.tex); `make cv-all`
+compiles the results in parallel.
 """
 
 import re
@@ -9,14 +15,15 @@ import sys
 import argparse
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
 
-# Try to import PyYAML
-yaml_mod = None
-try:
-    import yaml as yaml_mod
-    YAML_AVAILABLE = True
-except Exception:
-    YAML_AVAILABLE = False
+import ir_cache
+import pipeline_trace
+import profile_store
+import template_engine
+import tex_preflight
+import texescape
+from texescape import latex_escape_cv as latex_escape
 
 # Import the existing parser functions
 # The original project kept common parsing helpers in `parse_cv.py`.
@@ -24,61 +31,92 @@ except Exception:
 # we bring the small set of helper functions here (copied/adapted from parse_cv.py).
 
 
-def latex_escape(text):
-    """Escape special LaTeX characters"""
-    if not text:
-        return ""
-    # Order matters - do backslash first
-    replacements = {
-        "\\": r"\textbackslash{}",
-        "&": r"\&",
-        "%": r"\%",
-        "$": r"\$",
-        "#": r"\#",
-        "_": r"\_",
-        "{": r"\{",
-        "}": r"\}",
-        "~": r"\textasciitilde{}",
-        "^": r"\textasciicircum{}",
-    }
-    for char, replacement in replacements.items():
-        text = text.replace(char, replacement)
-    return text
+# Common English->German mappings for CV headings
+SECTION_I18N = {
+    "About Me": "Über mich",
+    "Interests": "Interessen",
+    "Specialization": "Spezialisierung",
+    "Technical Skills": "Technische Fähigkeiten",
+    "Experience": "Berufserfahrung",
+    "Education": "Ausbildung",
+    "Certifications": "Zertifikate",
+    "Languages": "Sprachen",
+    "Core strengths": "Kernkompetenzen",
+    "One-line summary": "Kurzprofil",
+}
+
+# "##" followed by whitespace; also matches the last two '#' of "###"
+_HEADING_RE = re.compile(r"##(?=\s)")
+_WS_RE = re.compile(r"\s+")
+
+
+def index_sections(content):
+    """Scan CV markdown once and index every "## Heading" section.
+
+    Returns a document dict {"content": ..., "sections": {...}} mapping each
+    lowercased heading to (offset, body_start, body_end) of its first
+    occurrence. The rules are those of the section regex used before,
+    ##\\s+Heading\\s*\\n\\n(.*?)(?=\\n##|\\Z): the heading must be followed by a
+    blank line and the body runs to the next "\\n##" (which includes "###"
+    subheadings) or the end of the file.
+    """
+    sections = {}
+    n = len(content)
+    for m in _HEADING_RE.finditer(content):
+        q = _WS_RE.match(content, m.end()).end()
+        if q >= n:
+            break
+        blank = content.find("\n\n", q)
+        if blank == -1:
+            break
+        # The heading ends where the whitespace run holding the blank line starts
+        r = blank
+        while r > q and content[r - 1].isspace():
+            r -= 1
+        heading = content[q:r]
+        if not heading or "\n" in heading:
+            continue
+        key = heading.lower()
+        if key in sections:
+            continue
+        # The body starts after the last blank line of that whitespace run
+        ws_end = _WS_RE.match(content, r).end()
+        start = content.rfind("\n\n", r, ws_end) + 2
+        end = content.find("\n##", start)
+        sections[key] = (m.start(), start, end if end != -1 else n)
+    return {"content": content, "sections": sections}
+
+
+@lru_cache(maxsize=16)
+def _document_for(content):
+    return index_sections(content)
 
 
 def parse_section(content, section_name):
-    """Extract content of a section"""
+    """Extract content of a section.
+
+    content is the markdown text or a document from index_sections; plain
+    text is indexed once and reused for every further lookup.
+    """
+    doc = content if isinstance(content, dict) else _document_for(content)
     # Try the provided section name first, but also support common
     # translations (English <-> German) so the parser can handle
     # markdown files written in either language.
-    # Build a list of candidate section headings to match.
     candidates = [section_name]
-    # Common English->German mappings for CV headings
-    SECTION_I18N = {
-        "About Me": "Über mich",
-        "Interests": "Interessen",
-        "Specialization": "Spezialisierung",
-        "Technical Skills": "Technische Fähigkeiten",
-        "Experience": "Berufserfahrung",
-        "Education": "Ausbildung",
-        "Certifications": "Zertifikate",
-        "Languages": "Sprachen",
-        "Core strengths": "Kernkompetenzen",
-        "One-line summary": "Kurzprofil",
-    }
-
-    # If section_name maps to a German equivalent, include it as candidate.
     if section_name in SECTION_I18N:
         candidates.append(SECTION_I18N[section_name])
 
-    # Also include a lowercase / capitalized variant to be more flexible
-    candidates.extend([s.capitalize() for s in list(dict.fromkeys(candidates))])
-
-    # Build an alternation pattern for any of the candidates and match.
-    alt = "|".join([re.escape(c) for c in candidates if c])
-    pattern = rf"##\s+(?:{alt})\s*\n\n(.*?)(?=\n##|\Z)"
-    match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
-    return match.group(1).strip() if match else ""
+    # Headings match case-insensitively; the first one in the file wins
+    best = None
+    for c in candidates:
+        if not c:
+            continue
+        hit = doc["sections"].get(c.lower())
+        if hit and (best is None or hit[0] < best[0]):
+            best = hit
+    if best is None:
+        return ""
+    return doc["content"][best[1]:best[2]].strip()
 
 
 def parse_specializations(content):
@@ -275,11 +313,8 @@ def parse_publications(content):
     return pubs
 
 
-def fill_template(template_path, data, output_path):
-    """Fill template with parsed data"""
-    with open(template_path, "r", encoding="utf-8") as f:
-        template = f.read()
-    # Prepare replacements
+def template_values(data):
+    """Placeholder values for the generic (hipster) CV template"""
     # Use a localized document title when the parser detected German input
     lang = data.get("lang", "en")
     if lang == "de":
@@ -287,84 +322,58 @@ def fill_template(template_path, data, output_path):
     else:
         doc_title = f"CV - {data.get('full_name', 'Curriculum Vitae')}"
 
-    replacements = {
-        "{{DOCUMENT_TITLE}}": doc_title,
-        "{{FULL_NAME}}": latex_escape(data.get("full_name", "")),
-        "{{FIRST_NAME}}": latex_escape(data.get("first_name", "")),
-        "{{LAST_NAME}}": latex_escape(data.get("last_name", "")),
-        "{{JOB_TITLE}}": latex_escape(data.get("job_title", "")),
-        "{{PROFILE_PICTURE}}": "profile.jpg",  # Default, can be customized
-        "{{ABOUT_ME}}": latex_escape(data.get("about_me", "")),
-        "{{PERSONAL_INFO}}": data.get("personal_info", ""),
-        "{{SPECIALIZATIONS}}": data.get("specializations", ""),
-        "{{INTERESTS}}": latex_escape(data.get("interests", "")),
-        "{{TECHNICAL_SKILLS}}": data.get("technical_skills", ""),
-        "{{PROGRAMMING_SKILLS}}": data.get("programming_skills", ""),
-        "{{CONTACT_BUBBLES}}": data.get("contact_bubbles", ""),
-        "{{SHORT_RESUME}}": data.get("short_resume", ""),
-        "{{EXPERIENCE_ENTRIES}}": data.get("experience", ""),
-        "{{EDUCATION_ENTRIES}}": data.get("education", ""),
-        "{{CERTIFICATIONS}}": data.get("certifications", ""),
-    # Languages: convert list -> LaTeX table lines when possible
-    "{{LANGUAGES}}": generate_languages(data.get("languages", [])),
-        "{{PUBLICATIONS_SECTION}}": data.get("publications", ""),
-        "{{TALKS_SECTION}}": data.get("talks", ""),
-        "{{FOOTER_INFO}}": data.get("footer", ""),
+    return {
+        "DOCUMENT_TITLE": doc_title,
+        "FULL_NAME": latex_escape(data.get("full_name", "")),
+        "FIRST_NAME": latex_escape(data.get("first_name", "")),
+        "LAST_NAME": latex_escape(data.get("last_name", "")),
+        "JOB_TITLE": latex_escape(data.get("job_title", "")),
+        "PROFILE_PICTURE": "profile.jpg",  # Default, can be customized
+        "ABOUT_ME": latex_escape(data.get("about_me", "")),
+        "PERSONAL_INFO": data.get("personal_info", ""),
+        "SPECIALIZATIONS": data.get("specializations", ""),
+        "INTERESTS": latex_escape(data.get("interests", "")),
+        "TECHNICAL_SKILLS": generate_hipster_skills(data.get("technical_skills", [])),
+        "PROGRAMMING_SKILLS": data.get("programming_skills", ""),
+        "CONTACT_BUBBLES": data.get("contact_bubbles", ""),
+        "SHORT_RESUME": data.get("short_resume", ""),
+        "EXPERIENCE_ENTRIES": generate_hipster_entries(data.get("experience", []), "cvevent"),
+        "EDUCATION_ENTRIES": generate_hipster_entries(data.get("education", []), "cvdegree"),
+        "CERTIFICATIONS": generate_hipster_certifications(data.get("certifications", [])),
+        # Languages: convert list -> LaTeX table lines when possible
+        "LANGUAGES": generate_languages(data.get("languages", [])),
+        "PUBLICATIONS_SECTION": data.get("publications", ""),
+        "TALKS_SECTION": data.get("talks", ""),
+        "FOOTER_INFO": data.get("footer", ""),
     }
 
-    # Replace all placeholders
-    for placeholder, value in replacements.items():
-        template = template.replace(placeholder, value)
+
+def write_filled_template(template_path, values, output_path):
+    """Render a template in one pass, preflight and write it; returns the diagnostics"""
+    tex, _ = template_engine.load_template(template_path).render(values)
+    diagnostics = tex_preflight.check_tex(tex)
 
     # Write output
+    output_path = Path(output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
     with open(output_path, "w", encoding="utf-8") as f:
-        f.write(template)
+        f.write(tex)
+    tex_preflight.record(output_path, diagnostics)
 
     print(f"✓ Generated: {output_path}")
+    if diagnostics:
+        print(tex_preflight.format_diagnostics(diagnostics, output_path))
+    return diagnostics
+
+
+def fill_template(template_path, data, output_path):
+    """Fill template with parsed data"""
+    return write_filled_template(template_path, template_values(data), output_path)
 
 
 def load_user_profiles(yaml_path="user_info.yml"):
-    """Load user profiles from YAML. If PyYAML not installed, do a minimal parse."""
-    p = Path(yaml_path)
-    if not p.exists():
-        # try searching upward up to 3 parent directories (works when running from 3_latex/)
-        cwd = Path.cwd()
-        found = None
-        for parent in [cwd, cwd.parent, cwd.parent.parent, cwd.parent.parent.parent]:
-            candidate = parent / yaml_path
-            if candidate.exists():
-                found = candidate
-                break
-        if found is None:
-            return []
-        p = found
-    if YAML_AVAILABLE:
-        with open(p, "r", encoding="utf-8") as f:
-            data = yaml_mod.safe_load(f)
-            return data if isinstance(data, list) else []
-    # Minimal parser for simple YAML list of maps
-    profiles = []
-    curr = None
-    with open(p, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.rstrip("\n")
-            if not line.strip() or line.strip().startswith("#"):
-                continue
-            if line.lstrip().startswith("- "):
-                if curr:
-                    profiles.append(curr)
-                curr = {}
-                line = line[line.index("- ") + 2 :]
-                if ":" in line:
-                    k, v = line.split(":", 1)
-                    curr[k.strip()] = v.strip()
-            elif ":" in line and curr is not None:
-                k, v = line.split(":", 1)
-                curr[k.strip()] = v.strip()
-    if curr:
-        profiles.append(curr)
-    return profiles
+    """Load user profiles (cached and validated by profile_store)."""
+    return profile_store.load_profiles(yaml_path)
 
 
 def generate_luxsleek_experience(entries):
@@ -457,7 +466,8 @@ def generate_luxsleek_certifications(certs):
 
         if year:
             year = latex_escape(year)
-            lines.append(f"  \\item \\textbf{{{year}}} - {name}{', \\textit{{' + org + '}}' if org else ''}")
+            org_part = f", \\textit{{{org}}}" if org else ""
+            lines.append(f"  \\item \\textbf{{{year}}} - {name}{org_part}")
         else:
             # No year: render name and optionally organization
             if org:
@@ -561,6 +571,53 @@ def generate_luxsleek_interests(interests_text):
     return "\n".join(lines)
 
 
+def generate_hipster_skills(skills):
+    """Skill bars for the hipster sidebar (levels 0.0-1.0; bold-only lines as labels)"""
+    if isinstance(skills, str):
+        return skills
+    lines = []
+    for skill in skills:
+        name = latex_escape(skill.get("name", ""))
+        level = skill.get("level")
+        if level is None:
+            lines.append(f"\\textbf{{{name}}}\\\\")
+        else:
+            level = min(max(float(level), 0.0), 1.0)
+            lines.append(f"{name} \\hfill \\barrule{{{level:g}}}{{0.4em}}{{cvgreen}}\\\\")
+    return "\n".join(lines)
+
+
+def generate_hipster_entries(entries, command):
+    """Experience/education table rows via \\cvevent or \\cvdegree"""
+    if isinstance(entries, str):
+        return entries
+    rows = []
+    for entry in entries:
+        dates = latex_escape(entry.get("dates", ""))
+        title = latex_escape(entry.get("title", ""))
+        org = latex_escape(entry.get("organization", ""))
+        location = latex_escape(entry.get("location", ""))
+        desc = latex_escape(entry.get("description", ""))
+        if command == "cvdegree":
+            rows.append(f"\\cvdegree{{{dates}}}{{{title}}}{{}}{{{org}}}{{{desc}}}{{}} \\\\")
+        else:
+            rows.append(f"\\cvevent{{{dates}}}{{{title}}}{{{org}}}{{{location}}}{{{desc}}}{{}} \\\\")
+    return "\n".join(rows)
+
+
+def generate_hipster_certifications(certs):
+    """Certification rows (year & name, organization) for the hipster table"""
+    if isinstance(certs, str):
+        return certs
+    rows = []
+    for cert in certs:
+        name = latex_escape(cert.get("name", ""))
+        org = latex_escape(cert.get("organization", ""))
+        org_part = f", \\textit{{{org}}}" if org else ""
+        rows.append(f"{latex_escape(cert.get('year', ''))} & {name}{org_part} \\\\")
+    return "\n".join(rows)
+
+
 def generate_languages(languages):
     """Generate languages table with proficiency circles for hipster template"""
     if not languages:
@@ -582,9 +639,6 @@ def generate_languages(languages):
 
 def fill_luxsleek_template(template_path, data, output_path, user_profile, font_name=None):
     """Fill LuxSleek template with parsed data and user profile"""
-    with open(template_path, "r", encoding="utf-8") as f:
-        template = f.read()
-    
     # Clean up markdown artifacts from text fields
     about_me = data.get("about_me", "").replace("---", "").strip()
     interests = data.get("interests", "").replace("---", "").strip()
@@ -624,38 +678,29 @@ def fill_luxsleek_template(template_path, data, output_path, user_profile, font_
         )
     
     # Prepare replacements using user profile for personal data
-    replacements = {
-        "{{MAIN_FONT_SETUP}}": font_setup,
-        "{{FIRST_NAME}}": latex_escape(user_profile.get("first_name", "")),
-        "{{LAST_NAME}}": latex_escape(user_profile.get("last_name", "")),
-        "{{JOB_TITLE}}": latex_escape(user_profile.get("job_title", "")),
-        "{{EMAIL}}": latex_escape(user_profile.get("email", "")),
-        "{{PHONE}}": latex_escape(user_profile.get("phone", "")),
-        "{{LOCATION}}": latex_escape(user_profile.get("location", "")),
-        "{{NATIONALITY}}": latex_escape(user_profile.get("nationality", "")),
-        "{{BIRTH_YEAR}}": latex_escape(user_profile.get("birth_year", "")),
-    "{{ABOUT_ME}}": latex_escape(about_me),
-    # Render interests as a vertical itemize list in the sidebar for LuxSleek
-    "{{INTERESTS}}": generate_luxsleek_interests(interests),
-        "{{PROFILE_PICTURE}}": user_profile.get("profile_pic", "profile.jpg"),
-        "{{LANGUAGES_LIST}}": generate_luxsleek_languages(data.get("languages", [])),
-        "{{SKILLS_LIST}}": generate_luxsleek_skills(data.get("technical_skills", [])),
-        "{{EXPERIENCE_ENTRIES}}": generate_luxsleek_experience(data.get("experience", [])),
-        "{{EDUCATION_ENTRIES}}": generate_luxsleek_education(data.get("education", [])),
-        "{{CERTIFICATIONS}}": generate_luxsleek_certifications(data.get("certifications", [])),
-        "{{PUBLICATIONS_SECTION}}": data.get("publications", ""),
+    values = {
+        "MAIN_FONT_SETUP": font_setup,
+        "FIRST_NAME": latex_escape(user_profile.get("first_name", "")),
+        "LAST_NAME": latex_escape(user_profile.get("last_name", "")),
+        "JOB_TITLE": latex_escape(user_profile.get("job_title", "")),
+        "EMAIL": latex_escape(user_profile.get("email", "")),
+        "PHONE": latex_escape(user_profile.get("phone", "")),
+        "LOCATION": latex_escape(user_profile.get("location", "")),
+        "NATIONALITY": latex_escape(user_profile.get("nationality", "")),
+        "BIRTH_YEAR": latex_escape(user_profile.get("birth_year", "")),
+        "ABOUT_ME": latex_escape(about_me),
+        # Render interests as a vertical itemize list in the sidebar for LuxSleek
+        "INTERESTS": generate_luxsleek_interests(interests),
+        "PROFILE_PICTURE": user_profile.get("profile_pic", "profile.jpg"),
+        "LANGUAGES_LIST": generate_luxsleek_languages(data.get("languages", [])),
+        "SKILLS_LIST": generate_luxsleek_skills(data.get("technical_skills", [])),
+        "EXPERIENCE_ENTRIES": generate_luxsleek_experience(data.get("experience", [])),
+        "EDUCATION_ENTRIES": generate_luxsleek_education(data.get("education", [])),
+        "CERTIFICATIONS": generate_luxsleek_certifications(data.get("certifications", [])),
+        "PUBLICATIONS_SECTION": data.get("publications", ""),
     }
-    
-    # Replace all placeholders
-    for placeholder, value in replacements.items():
-        template = template.replace(placeholder, value)
-    
-    # Write output
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(template)
-    
-    print(f"✓ Generated: {output_path}")
+
+    return write_filled_template(template_path, values, output_path)
 
 
 def fill_hipster_template(template_path, data, output_path, user_profile, font_name=None):
@@ -676,10 +721,6 @@ def fill_hipster_template(template_path, data, output_path, user_profile, font_n
         "birth_year": user_profile.get("birth_year", ""),
     })
     
-    # Read template
-    with open(template_path, "r", encoding="utf-8") as f:
-        template = f.read()
-    
     # Build font setup if font_name provided
     font_setup = ""
     if font_name:
@@ -706,80 +747,30 @@ def fill_hipster_template(template_path, data, output_path, user_profile, font_n
         # Leave empty - hipster template has its own defaults
         font_setup = "% Using document class default fonts"
     
-    # Replace font placeholder first
-    template = template.replace("{{MAIN_FONT_SETUP}}", font_setup)
-    
-    # Then use the local fill_template for the remaining placeholder substitutions.
-    # Write the modified template to the output file first, then call fill_template
-    # to perform the standard placeholder replacement and final write.
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(template)
-    # Now invoke local fill_template (copied into this module) to finish filling
-    fill_template(output_path, data, output_path)
+    # Font setup and the standard placeholders are filled in a single pass
+    values = template_values(data)
+    values["MAIN_FONT_SETUP"] = font_setup
+    return write_filled_template(template_path, values, output_path)
 
 
-def parse_and_generate(md_file, template_name="hipster", user_id=None, font_name=None):
-    """Parse CV markdown and generate output for specified template"""
-    
-    # Load user profiles
-    profiles = load_user_profiles()
-    
-    # Determine user_id from filename if not provided and detect language
-    lang = "en"
-    if not user_id:
-        # Extract stem and detect language suffixes like _de, -de, _en, -en
-        filename = Path(md_file).stem
-        m = re.search(r'[_-](de|en)$', filename, re.IGNORECASE)
-        if m:
-            lang = m.group(1).lower()
-        else:
-            lang = "en"
+def extract_cv_data(content, lang="en", source_file=None):
+    """Parse CV markdown into the data dict the fill_* functions consume.
 
-        # Remove leading cv- or cv_ and trailing language suffix when deriving user id
-        name_part = re.sub(r'^cv[-_]', '', filename, flags=re.IGNORECASE)
-        name_part = re.sub(r'[-_]?(en|de)$', '', name_part, flags=re.IGNORECASE)
-        # First token (split on - or _) is a reasonable user id guess
-        first_name = re.split(r'[-_]', name_part)[0]
-        for profile in profiles:
-            if profile.get("id") == first_name:
-                user_id = first_name
-                break
+    The markdown is indexed once (index_sections) and every section lookup
+    is served from that index. The result does not depend on the template,
+    so one parse can be rendered into several templates.
+    """
+    doc = content if isinstance(content, dict) else index_sections(content)
 
-    # Save detected language into a local variable for use later
-    detected_lang = lang
-    
-    if not user_id:
-        print("Error: Could not determine user ID. Please specify with --user flag.")
-        print(f"Available users: {', '.join([p.get('id', '?') for p in profiles])}")
-        sys.exit(1)
-    
-    # Find user profile
-    user_profile = None
-    for profile in profiles:
-        if profile.get("id") == user_id:
-            user_profile = profile
-            break
-    
-    if not user_profile:
-        print(f"Error: User '{user_id}' not found in user_info.yml")
-        print(f"Available users: {', '.join([p.get('id', '?') for p in profiles])}")
-        sys.exit(1)
-    
-    print(f"Using profile: {user_profile.get('full_name', user_id)}")
-    
-    # Parse the markdown file using base parser
-    with open(md_file, "r", encoding="utf-8") as f:
-        content = f.read()
-    
     # Extract basic data
     data = {}
-    data["source_file"] = md_file
+    data["source_file"] = source_file
     # expose detected language to templates and downstream functions
-    data["lang"] = detected_lang
-    
+    data["lang"] = lang
+
     # Parse sections
-    data["about_me"] = parse_section(content, "About Me")
-    data["interests"] = parse_section(content, "Interests")
+    data["about_me"] = parse_section(doc, "About Me")
+    data["interests"] = parse_section(doc, "Interests")
 
     # Fallbacks for Interests: if the explicit `## Interests` section is missing,
     # try to reuse other short-summary sections in a sensible order so the
@@ -788,12 +779,12 @@ def parse_and_generate(md_file, template_name="hipster", user_id=None, font_name
     #  2) Core strengths
     #  3) First one or two lines of About Me
     if not data.get("interests"):
-        one_line = parse_section(content, "One-line summary")
+        one_line = parse_section(doc, "One-line summary")
         if one_line:
             data["interests"] = one_line.strip()
 
     if not data.get("interests"):
-        core = parse_section(content, "Core strengths")
+        core = parse_section(doc, "Core strengths")
         if core:
             # Keep only the first few bullet lines if present
             lines = [l.strip() for l in core.splitlines() if l.strip()]
@@ -804,53 +795,196 @@ def parse_and_generate(md_file, template_name="hipster", user_id=None, font_name
         about_lines = [l.strip() for l in data["about_me"].splitlines() if l.strip()]
         if about_lines:
             data["interests"] = "\n".join(about_lines[:2])
-    
+
     # Parse technical skills
-    skills = parse_skills(content)
+    skills = parse_skills(doc)
     data["technical_skills"] = skills
-    
+
     # Parse experience and education
-    data["experience"] = parse_entries(content, "Experience")
-    data["education"] = parse_entries(content, "Education")
-    
+    data["experience"] = parse_entries(doc, "Experience")
+    data["education"] = parse_entries(doc, "Education")
+
     # Parse certifications
-    data["certifications"] = parse_certifications(content)
+    data["certifications"] = parse_certifications(doc)
     # Parse publications and render to LaTeX block for templates
-    pubs = parse_publications(content)
+    pubs = parse_publications(doc)
     data["publications"] = generate_luxsleek_publications(pubs)
-    
+
     # Parse languages
-    data["languages"] = parse_languages(content)
-    
-    # Determine template and output paths
-    templates = {
-        "hipster": Path("src/templates/cv_hipster_template.tex"),
-        "luxsleek": Path("src/templates/cv_luxsleek_template.tex"),
-    }
-    
-    if template_name not in templates:
-        print(f"Error: Unknown template '{template_name}'. Available: {', '.join(templates.keys())}")
+    data["languages"] = parse_languages(doc)
+
+    return data
+
+
+TEMPLATES = {
+    "hipster": Path("src/templates/cv_hipster_template.tex"),
+    "luxsleek": Path("src/templates/cv_luxsleek_template.tex"),
+}
+LANGS = ("en", "de")
+# Scripts whose code shapes the rendered .tex; part of the build-cache key
+RENDER_TOOLS = (__file__, texescape.__file__, template_engine.__file__)
+_LANG_SUFFIX_RE = re.compile(r"[_-](de|en)$", re.IGNORECASE)
+
+
+def resolve_user(md_file, user_id=None):
+    """(user_id, lang, user_profile) for a CV markdown.
+
+    The language comes from a _de/_en (or -de/-en) filename suffix, default
+    en. Without user_id the first token of the filename after "cv_" is tried
+    as profile id. Exits with a message when no profile matches.
+    """
+    with pipeline_trace.span("cv.profiles"):
+        profiles = load_user_profiles()
+
+    filename = Path(md_file).stem
+    m = _LANG_SUFFIX_RE.search(filename)
+    lang = m.group(1).lower() if m else "en"
+    if not user_id:
+        # Remove leading cv- or cv_ and trailing language suffix when deriving user id
+        name_part = re.sub(r'^cv[-_]', '', filename, flags=re.IGNORECASE)
+        name_part = re.sub(r'[-_]?(en|de)$', '', name_part, flags=re.IGNORECASE)
+        # First token (split on - or _) is a reasonable user id guess
+        first_name = re.split(r'[-_]', name_part)[0]
+        if profile_store.get_profile(first_name) is not None:
+            user_id = first_name
+
+    if not user_id:
+        print("Error: Could not determine user ID. Please specify with --user flag.")
+        print(f"Available users: {', '.join([p.get('id', '?') for p in profiles])}")
         sys.exit(1)
-    
-    template_path = templates[template_name]
-    
+
+    user_profile = profile_store.get_profile(user_id)
+    if not user_profile:
+        print(f"Error: User '{user_id}' not found in user_info.yml")
+        print(f"Available users: {', '.join([p.get('id', '?') for p in profiles])}")
+        sys.exit(1)
+    return user_id, lang, user_profile
+
+
+def _parse_cv_file(md_file, lang):
+    with open(md_file, "r", encoding="utf-8") as f:
+        content = f.read()
+    return extract_cv_data(content, lang, str(md_file))
+
+
+def load_cv_data(md_file, lang=None):
+    """extract_cv_data for a CV file, from build/ir/ while it and the parser are unchanged.
+
+    lang defaults to the filename suffix (see resolve_user).
+    """
+    if lang is None:
+        m = _LANG_SUFFIX_RE.search(Path(md_file).stem)
+        lang = m.group(1).lower() if m else "en"
+    with pipeline_trace.span("cv.parse", Path(md_file).stem):
+        data = ir_cache.cached(
+            "cv",
+            md_file,
+            lambda path: _parse_cv_file(path, lang),
+            tools=(__file__, texescape.__file__),
+            options={"lang": lang},
+        )
+    data["source_file"] = str(md_file)
+    return data
+
+
+def render_cv(data, template_name, output, user_profile, font_name=None):
+    """Fill one template from parsed CV data; data itself is left unchanged"""
+    # fill_hipster_template merges the profile into its data
+    data = dict(data)
+    with pipeline_trace.span("cv.render", Path(output).stem, template=template_name):
+        if template_name == "hipster":
+            fill_hipster_template(TEMPLATES[template_name], data, output, user_profile, font_name)
+        elif template_name == "luxsleek":
+            fill_luxsleek_template(TEMPLATES[template_name], data, output, user_profile, font_name)
+    return output
+
+
+def parse_and_generate(md_file, template_name="hipster", user_id=None, font_name=None):
+    """Parse CV markdown and generate output for specified template"""
+    user_id, detected_lang, user_profile = resolve_user(md_file, user_id)
+    print(f"Using profile: {user_profile.get('full_name', user_id)}")
+
+    if template_name not in TEMPLATES:
+        print(f"Error: Unknown template '{template_name}'. Available: {', '.join(TEMPLATES.keys())}")
+        sys.exit(1)
+
+    # Parse the markdown file (or load its cached IR)
+    data = load_cv_data(md_file, detected_lang)
+
     # Generate output filename using user_id
     output = Path(f"src/applications/CV_{user_id}_{template_name}.tex")
-    
-    # Fill template based on type
-    if template_name == "hipster":
-        fill_hipster_template(template_path, data, output, user_profile, font_name)
-    elif template_name == "luxsleek":
-        fill_luxsleek_template(template_path, data, output, user_profile, font_name)
-    
-    print(f"✓ Generated: {output}")
+    render_cv(data, template_name, output, user_profile, font_name)
+
     print(f"\nDone! Compile with:")
     print(f"  make compile FILE={output}")
-    
+
     return output
 
 
+def language_sources(md_file, langs):
+    """{lang: markdown path} for the requested languages.
+
+    md_file serves its own language (filename suffix, default en); another
+    language is read from the sibling file with the suffix swapped, e.g.
+    cv_alex_de.md next to cv_alex_en.md. Languages without a file are left
+    out with a warning: rendering English text under a German title would
+    not be a German CV.
+    """
+    md_file = Path(md_file)
+    m = _LANG_SUFFIX_RE.search(md_file.stem)
+    own = m.group(1).lower() if m else "en"
+    sources = {}
+    for lang in langs:
+        if lang == own:
+            sources[lang] = md_file
+            continue
+        if m:
+            suffix = m.group(0)
+            swapped = suffix[0] + (lang.upper() if suffix[1:].isupper() else lang)
+            candidate = md_file.with_name(md_file.stem[: m.start()] + swapped + md_file.suffix)
+        else:
+            candidate = md_file.with_name(f"{md_file.stem}_{lang}{md_file.suffix}")
+        if candidate.is_file():
+            sources[lang] = candidate
+        else:
+            print(f"Warning: no {lang} CV markdown ({candidate}); skipping {lang}")
+    return sources
+
+
+def fan_out(md_file, templates, langs, user_id=None, font_name=None, tex_list=None):
+    """Render every template x language combination, parsing each source once.
+
+    Outputs are src/applications/CV_<user>_<template>_<lang>.tex; their
+    paths are returned and, with tex_list, appended to that file one per
+    line for compile_batch.sh.
+    """
+    user_id, _, user_profile = resolve_user(md_file, user_id)
+    print(f"Using profile: {user_profile.get('full_name', user_id)}")
+    outputs = []
+    for lang, source in language_sources(md_file, langs).items():
+        data = load_cv_data(source, lang)
+        for template_name in templates:
+            output = Path(f"src/applications/CV_{user_id}_{template_name}_{lang}.tex")
+            render_cv(data, template_name, output, user_profile, font_name)
+            outputs.append(output)
+    if tex_list:
+        with open(tex_list, "a", encoding="utf-8") as f:
+            f.writelines(f"{out}\n" for out in outputs)
+    return outputs
+
+
+def _split_list(value, allowed, option):
+    """Comma list option value; "all" means every allowed item."""
+    items = list(allowed) if value == "all" else [v.strip() for v in value.split(",") if v.strip()]
+    unknown = [v for v in items if v not in allowed]
+    if unknown or not items:
+        print(f"Error: {option} takes a comma list of {', '.join(allowed)} or 'all', got '{value}'")
+        sys.exit(1)
+    return items
+
+
 if __name__ == "__main__":
+    pipeline_trace.startup("cv.startup")
     parser = argparse.ArgumentParser(description="Parse CV markdown and generate LaTeX")
     parser.add_argument("markdown_file", type=Path, help="Path to CV markdown file")
     parser.add_argument(
@@ -859,10 +993,19 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "--template",
-        choices=["hipster", "luxsleek"],
+        choices=list(TEMPLATES),
         default="hipster",
         help="CV template to use (default: hipster)"
     )
+    parser.add_argument(
+        "--templates",
+        help="Fan-out: comma list of templates or 'all'; renders CV_<user>_<template>_<lang>.tex for each"
+    )
+    parser.add_argument(
+        "--langs",
+        help="Fan-out: comma list of languages (en,de); other languages come from sibling _<lang> markdowns"
+    )
+    parser.add_argument("--tex-list", help="Fan-out: append the generated .tex paths to this file")
     parser.add_argument(
         "--font",
         help="Custom font name to use (requires fontspec and XeLaTeX). Example: 'Source Sans 3' or 'Inter'"
@@ -875,8 +1018,17 @@ if __name__ == "__main__":
         sys.exit(1)
     
     print(f"Parsing CV: {args.markdown_file}")
-    print(f"Using template: {args.template}")
     if args.font:
         print(f"Using custom font: {args.font}")
-    
-    parse_and_generate(args.markdown_file, args.template, args.user, args.font)
+
+    if args.templates or args.langs:
+        templates = _split_list(args.templates, TEMPLATES, "--templates") if args.templates else [args.template]
+        m = _LANG_SUFFIX_RE.search(args.markdown_file.stem)
+        langs = _split_list(args.langs, LANGS, "--langs") if args.langs else [m.group(1).lower() if m else "en"]
+        print(f"Using templates: {', '.join(templates)}; languages: {', '.join(langs)}")
+        if not fan_out(args.markdown_file, templates, langs, args.user, args.font, args.tex_list):
+            print("Error: nothing generated")
+            sys.exit(1)
+    else:
+        print(f"Using template: {args.template}")
+        parse_and_generate(args.markdown_file, args.template, args.user, args.font)
@@ -11,100 +11,251 @@ from pathlib import Path
 from datetime import datetime
 from typing import Optional
 import json
-import json
-
-yaml_mod = None
-try:
-    import yaml as yaml_mod
+import textwrap
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+
+import build_cache
+import ir_cache
+import pipeline_trace
+import profile_store
+import template_engine
+import tex_preflight
+import texescape
+from texescape import latex_escape
+
+# Block header: <!-- LABEL --> \lettercontent{
+# The block body is matched by scan_letter_blocks with a brace counter instead
+# of a regex, so nesting depth is unlimited and malformed input (an unclosed
+# brace in a long paragraph) costs linear time instead of backtracking.
+LETTER_BLOCK_RE = re.compile(r"<!--\s*(\w+)\s*-->\s*\\lettercontent\{")
+# A backslash escapes the next character, so \{ \} and \\ never count as braces
+_BRACE_TOKEN_RE = re.compile(r"\\.|[{}]", re.DOTALL)
+
+
+def scan_letter_blocks(content):
+    """Extract <!-- LABEL --> \\lettercontent{...} blocks in a single pass.
+
+    Each block body ends at its matching closing brace. The scan for a block
+    never runs past the next block header, so an unclosed brace only loses
+    that one block. Returns (blocks, errors); blocks are dicts with label,
+    text, offset, line and column (of the header), errors are dicts with
+    label, offset, line, column and message.
+    """
+    line_starts = [0] + [m.end() for m in re.finditer("\n", content)]
+
+    def position(offset):
+        line = bisect_right(line_starts, offset)
+        return line, offset - line_starts[line - 1] + 1
+
+    headers = list(LETTER_BLOCK_RE.finditer(content))
+    blocks = []
+    errors = []
+    for i, header in enumerate(headers):
+        start = header.end()
+        limit = headers[i + 1].start() if i + 1 < len(headers) else len(content)
+        depth = 1
+        end = None
+        for tok in _BRACE_TOKEN_RE.finditer(content, start, limit):
+            ch = tok.group()
+            if ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    end = tok.start()
+                    break
+        line, column = position(header.start())
+        if end is None:
+            errors.append(
+                {
+                    "label": header.group(1),
+                    "offset": header.start(),
+                    "line": line,
+                    "column": column,
+                    "message": f"unclosed \\lettercontent{{ ({depth} brace(s) still open)",
+                }
+            )
+            continue
+        blocks.append(
+            {
+                "label": header.group(1),
+                "text": content[start:end].strip(),
+                "offset": header.start(),
+                "line": line,
+                "column": column,
+            }
+        )
+    return blocks, errors
 
-    YAML_AVAILABLE = True
-except Exception:
-    YAML_AVAILABLE = False
 
+def parse_letter(md_file):
+    """Parse a letter into plain data: front matter, sections and block errors.
 
-def parse_markdown(md_file):
-    """Extract sections from markdown file"""
+    Later blocks with the same label win. This is the letter's IR (see
+    ir_cache.py); errors are scan_letter_blocks's.
+    """
     with open(md_file, "r", encoding="utf-8") as f:
         content = f.read()
-
+    blocks, errors = scan_letter_blocks(content)
     sections = {}
+    for block in blocks:
+        sections[block["label"]] = block["text"]
+    return {"front": front_matter_of(content), "sections": sections, "errors": errors}
 
-    # Pattern to match: <!-- LABEL --> \lettercontent{...}
-    # This regex handles multi-line content inside \lettercontent{}
-    pattern = r"<!--\s*(\w+)\s*-->\s*\\lettercontent\{([^}]*(?:\{[^}]*\}[^}]*)*)\}"
 
-    matches = re.finditer(pattern, content, re.DOTALL)
+def load_letter(md_file):
+    """parse_letter(md_file), from build/ir/ while the file and this script are unchanged."""
+    return ir_cache.cached("letter", md_file, parse_letter, tools=(__file__,))
 
-    for match in matches:
-        label = match.group(1)
-        text = match.group(2).strip()
-        sections[label] = text
 
-    return sections
+def warn_block_errors(md_file, errors):
+    """Print the block errors of a letter as warnings."""
+    for err in errors:
+        print(
+            f"Warning: {md_file}:{err['line']}:{err['column']}: "
+            f"{err['label']}: {err['message']}; block skipped"
+        )
+
+
+def parse_markdown(md_file):
+    """Extract sections from markdown file"""
+    letter = parse_letter(md_file)
+    warn_block_errors(md_file, letter["errors"])
+    return letter["sections"]
+
+
+# Templates are tokenized once per process (see template_engine.py). The
+# classic "Dear {{RECIPIENT_NAME}}," salutation line is replaced as a whole by
+# the SALUTATION section, so it becomes a placeholder of its own.
+SALUTATION_TOKEN = "_SALUTATION_LINE"
+
+
+def _mark_salutation(text):
+    return text.replace("Dear {{RECIPIENT_NAME}},", "{{" + SALUTATION_TOKEN + "}}")
+
+
+def read_template(template_path):
+    """Return the compiled letter template, tokenizing it only on first use."""
+    return template_engine.load_template(template_path, preprocess=_mark_salutation)
+
+
+# Placeholders blanked when nothing else provides a value, so no {{...}}
+# is left behind to trip preflight (some would also carry raw underscores).
+OPTIONAL_PLACEHOLDERS = (
+    "COMPANY_ADDRESS",
+    "COMPANY_CITY",
+    "COMPANY_ZIP",
+    "YOUR_TAGLINE_OR_EDUCATION",
+    "YOUR_LINKEDIN",
+    "YOUR_LINKEDIN_URL",
+    "YOUR_PHONE_TEL",
+)
+
+PARAGRAPH_KEYS = (
+    "PARAGRAPH_1_INTRODUCTION",
+    "PARAGRAPH_2_TECHNICAL_EXCELLENCE",
+    "PARAGRAPH_3_EXPERIENCE_AND_VALUE",
+    "PARAGRAPH_4_STRATEGIC_FIT",
+    "PARAGRAPH_5_CLOSING_STATEMENT",
+)
+
+PROFILE_PIC_NAMES = (
+    "figures/profile-pic.png",
+    "figures/profile-pic.jpg",
+    "figures/profile-pic.jpeg",
+    "figures/profile_placeholder.png",
+    "figures/profile_placeholder.jpg",
+)
+SIGNATURE_NAMES = (
+    "figures/signature.png",
+    "figures/signature.jpg",
+    "figures/signature.jpeg",
+    "figures/sign.png",
+    "figures/sign.jpg",
+)
+
+
+def _swap_images(text, profile_pic=None, signature_img=None):
+    """Point common profile-picture/signature filenames at the user's images."""
+    if profile_pic:
+        for cn in PROFILE_PIC_NAMES:
+            text = text.replace(cn, profile_pic)
+    if signature_img:
+        for cs in SIGNATURE_NAMES:
+            text = text.replace(cs, signature_img)
+    return text
+
+
+def _fix_escapes(text):
+    """Fix path and escaping artifacts in generated TeX.
+
+    Templates may reference ../figures/ but compilation runs from the project
+    root. Ampersands produced as "\\textbackslash{}&" by latex_escape are
+    reduced back to "\\&" (raw '&' tabular alignment is kept), and raw
+    underscores that are not already escaped get escaped to avoid
+    "Missing $ inserted".
+    """
+    text = text.replace("../figures/", "figures/")
+    text = re.sub(r"\\textbackslash\{\}\\&", r"\\&", text)
+    text = text.replace(r"\textbackslash{}&", r"\&")
+    text = re.sub(r"\\\\&", r"\\&", text)
+    return re.sub(r"(?<!\\)_", r"\\_", text)
+
+
+def _tidy_backslashes(text):
+    """Clean up line-break punctuation left behind by blank fields.
+
+    When template macros include '\\\\' between fields and some fields are
+    blank we can end up with sequences like '\\\\\\\\,'.
+    """
+    # 1) Collapse runs of three or more backslashes
+    text = re.sub(r"(?:\\){3,}", r"\\", text)
+    # 2) Remove double-backslash followed by a comma (comma after an empty field)
+    text = re.sub(r"\\\\,\s*", "", text)
+    # 3) Remove leading '\\' inside braces (e.g. address field)
+    text = re.sub(r"\{\\\\\s*", "{", text)
+    # 4) Remove stray '\,' left over
+    text = text.replace("\\,", "")
+    # 5) Collapse any remaining runs again
+    return re.sub(r"(?:\\){3,}", r"\\", text)
+
+
+def _cleanup(text, profile_pic=None, signature_img=None):
+    return _tidy_backslashes(_fix_escapes(_swap_images(text, profile_pic, signature_img)))
+
+
+# Cleaned template literals keyed by (template, profile_pic, signature_img):
+# the fixed parts of a template are identical for every letter of a user.
+_LITERAL_CACHE = {}
+
+
+def _cleaned_template(tpl, profile_pic, signature_img):
+    key = (tpl, profile_pic, signature_img)
+    cleaned = _LITERAL_CACHE.get(key)
+    if cleaned is None:
+        cleaned = tpl.map_literals(lambda s: _cleanup(s, profile_pic, signature_img))
+        _LITERAL_CACHE[key] = cleaned
+    return cleaned
 
 
 def create_tex_file(template_path, sections, output_path, user=None, md_basename=None, language=None):
-    """Create .tex file from template and parsed sections"""
-    with open(template_path, "r", encoding="utf-8") as f:
-        tex_content = f.read()
+    """Create .tex file from template and parsed sections.
 
+    The rendered TeX is preflighted before it is written; returns the
+    diagnostics (see tex_preflight.check_tex). A clean document gets a
+    validation stamp so compile.sh can skip its shell preflight.
+    """
     # Determine closing salutation based on language
     if language == "de":
         closing_salutation = "Mit freundlichen Grüßen"
     else:
         closing_salutation = "Kind regards"
 
-    # Modern template mapping - placeholders match markdown labels exactly
-    if "modern" in template_path:
-        replacements = {
-            "Dear {{RECIPIENT_NAME}},": latex_escape(
-                sections.get("SALUTATION", "Dear Hiring Manager,")
-            ),
-            "{{PARAGRAPH_1_INTRODUCTION}}": latex_escape(
-                sections.get("PARAGRAPH_1_INTRODUCTION", "")
-            ),
-            "{{PARAGRAPH_2_TECHNICAL_EXCELLENCE}}": latex_escape(
-                sections.get("PARAGRAPH_2_TECHNICAL_EXCELLENCE", "")
-            ),
-            "{{PARAGRAPH_3_EXPERIENCE_AND_VALUE}}": latex_escape(
-                sections.get("PARAGRAPH_3_EXPERIENCE_AND_VALUE", "")
-            ),
-            "{{PARAGRAPH_4_STRATEGIC_FIT}}": latex_escape(
-                sections.get("PARAGRAPH_4_STRATEGIC_FIT", "")
-            ),
-            "{{PARAGRAPH_5_CLOSING_STATEMENT}}": latex_escape(
-                sections.get("PARAGRAPH_5_CLOSING_STATEMENT", "")
-            ),
-        }
-    else:
-        # Fallback mapping for templates that follow the classic/simple structure
-        replacements = {
-            "Dear {{RECIPIENT_NAME}},": latex_escape(
-                sections.get("SALUTATION", "Dear Hiring Manager,")
-            ),
-            "{{PARAGRAPH_1_INTRODUCTION}}": latex_escape(
-                sections.get("PARAGRAPH_1_INTRODUCTION", "")
-            ),
-            "{{PARAGRAPH_2_TECHNICAL_EXCELLENCE}}": latex_escape(
-                sections.get("PARAGRAPH_2_TECHNICAL_EXCELLENCE", "")
-            ),
-            "{{PARAGRAPH_3_EXPERIENCE_AND_VALUE}}": latex_escape(
-                sections.get("PARAGRAPH_3_EXPERIENCE_AND_VALUE", "")
-            ),
-            "{{PARAGRAPH_4_STRATEGIC_FIT}}": latex_escape(
-                sections.get("PARAGRAPH_4_STRATEGIC_FIT", "")
-            ),
-            "{{PARAGRAPH_5_CLOSING_STATEMENT}}": latex_escape(
-                sections.get("PARAGRAPH_5_CLOSING_STATEMENT", "")
-            ),
-        }
-
-    # Apply replacements
-    for placeholder, value in replacements.items():
-        tex_content = tex_content.replace(placeholder, value)
-
-    # If user data provided, replace common placeholders
+    # If user data provided, build the user placeholder values
     user_context = {}
+    profile_pic = None
+    signature_img = None
     if user:
         phone_raw = user.get("phone", "")
         phone_tel = user.get("phone_tel")
@@ -159,64 +310,19 @@ def create_tex_file(template_path, sections, output_path, user=None, md_basename
                 "  }\n"
                 "}\n"
             )
-        # Inject the raw TeX for the font setup into the user_context so the
-        # parser can replace the {{MAIN_FONT_SETUP}} token with it.
+        # Raw TeX for the {{MAIN_FONT_SETUP}} token
         user_context["MAIN_FONT_SETUP"] = main_font_setup
-        user_map = {f"{{{{{k}}}}}": v for k, v in user_context.items()}
-        # Replace user-context tokens, but avoid replacing tokens that appear
-        # inside LaTeX comment lines (lines that start with optional
-        # whitespace followed by '%'). Replacing inside comments can produce
-        # broken TeX (e.g. a comment that mentions {{MAIN_FONT_SETUP}} would
-        # get replaced and leave an unmatched brace sequence). We therefore
-        # scan the file line-by-line and only substitute tokens on non-comment
-        # lines.
-        if user_map:
-            lines = tex_content.splitlines(True)
-            for idx, line in enumerate(lines):
-                # If the line is a pure LaTeX comment, skip replacements on it
-                if re.match(r"^\s*%", line):
-                    continue
-                new_line = line
-                for ph, val in user_map.items():
-                    if ph in new_line:
-                        new_line = new_line.replace(ph, val)
-                lines[idx] = new_line
-            tex_content = "".join(lines)
-
-        # If the user profile supplies an explicit profile picture path, prefer
-        # that image for any template references to common profile-picture
-        # filenames. This avoids requiring template edits and lets the
-        # selected user's picture appear in the generated .tex automatically.
-        profile_pic = user.get("profile_pic") if isinstance(user, dict) else None
+
+        # If the user profile supplies an explicit profile picture or
+        # signature path, prefer those images for any template references to
+        # the common filenames. This avoids requiring template edits.
+        if isinstance(user, dict):
+            profile_pic = user.get("profile_pic")
+            signature_img = user.get("signature_image")
         if profile_pic:
-            # Normalize to the form templates expect (parser already rewrites
-            # ../figures/ -> figures/ later but handle common variants here).
             profile_pic = profile_pic.replace("../figures/", "figures/")
-            # List of common filenames templates may reference; replace them
-            # with the profile_pic provided by the user profile.
-            common_names = [
-                "figures/profile-pic.png",
-                "figures/profile-pic.jpg",
-                "figures/profile-pic.jpeg",
-                "figures/profile_placeholder.png",
-                "figures/profile_placeholder.jpg",
-            ]
-            for cn in common_names:
-                tex_content = tex_content.replace(cn, profile_pic)
-        # If user provides an explicit signature image, replace common
-        # signature filenames in templates so the signature image is used.
-        signature_img = user.get("signature_image") if isinstance(user, dict) else None
         if signature_img:
             signature_img = signature_img.replace("../figures/", "figures/")
-            common_sig_names = [
-                "figures/signature.png",
-                "figures/signature.jpg",
-                "figures/signature.jpeg",
-                "figures/sign.png",
-                "figures/sign.jpg",
-            ]
-            for cs in common_sig_names:
-                tex_content = tex_content.replace(cs, signature_img)
 
     # Fill recipient/company placeholders from sections if available
     # Derive recipient name from SALUTATION if needed (strip 'Dear' and comma)
@@ -259,7 +365,6 @@ def create_tex_file(template_path, sections, output_path, user=None, md_basename
         derived_job = re.sub(r"\s+", " ", derived_job).strip()
         derived_company = re.sub(r"\s+", " ", derived_company).strip()
 
-    # If sections don't provide COMPANY_NAME or RECIPIENT_NAME, inject derived
     # If the markdown didn't supply COMPANY_NAME but we derived values from
     # the filename, prefer writing a single combined recipient string
     # "Company - Job Title" and do NOT also populate COMPANY_NAME to avoid
@@ -290,239 +395,63 @@ def create_tex_file(template_path, sections, output_path, user=None, md_basename
     elif derived_company:
         company_val = latex_escape(derived_company)
 
-    explicit_company_provided = bool(sections.get("COMPANY_NAME"))
-
     # If recipient still empty, derive from company_val and job_title_val
     if not recipient and company_val and job_title_val:
         recipient = f"{company_val} - {job_title_val}"
 
-    # Replace both triple-brace (keep braces for macro args) and double-brace variants
-    for ph in ["RECIPIENT_NAME", "COMPANY_NAME"]:
-        raw = ""
-        if ph == "RECIPIENT_NAME":
-            raw = latex_escape(recipient)
-        else:
-            raw = latex_escape(company)
-        # triple-brace usually used inside a macro argument like \companyname{{{RECIPIENT_NAME}}}
-        # replace with a braced value so macros get a proper argument: {Name}
-        tex_content = tex_content.replace("{{{" + ph + "}}}", "{" + raw + "}")
-        # double-brace may appear inline; replace with raw text
-        tex_content = tex_content.replace("{{" + ph + "}}", raw)
-
-    # Generic replacement: replace any remaining {{TOKEN}} or {{{TOKEN}}} from
-    # the sections parsed from markdown or from the user profile when available.
-    # This covers template variants that use slightly different placeholder names
-    # (for example the Classic template) and prevents preflight failures.
-    def try_replace_token(token_name):
-        # priority: sections -> user profile fields
-        if token_name in sections:
-            return latex_escape(sections.get(token_name, ""))
-        # map user fields without braces and uppercased keys
-        if user_context and token_name in user_context:
-            return user_context[token_name]
+    def cleanup(text):
+        return _cleanup(text, profile_pic, signature_img)
+
+    def cleanup_late(text):
+        # values that never had the user's images swapped in
+        return _tidy_backslashes(_fix_escapes(text))
+
+    # Resolve each placeholder once, in priority order. Section text, user
+    # profile values and section-derived names go through the same cleanup as
+    # the template text around them. Tokens on TeX comment lines are only
+    # filled where explicitly meant to be (paragraphs, salutation, recipient,
+    # company, optional blanks, job title).
+    def resolve(ph):
+        name = ph["name"]
+        if name == SALUTATION_TOKEN:
+            return cleanup(latex_escape(sections.get("SALUTATION", "Dear Hiring Manager,")))
+        if name in PARAGRAPH_KEYS:
+            return cleanup(latex_escape(sections.get(name, "")))
+        if not ph["in_comment"] and name in user_context:
+            return cleanup(user_context[name])
+        if name == "RECIPIENT_NAME":
+            return cleanup_late(latex_escape(recipient))
+        if name == "COMPANY_NAME":
+            return cleanup_late(latex_escape(company))
+        # Generic: any other token provided by a markdown section. This covers
+        # template variants with slightly different placeholder names.
+        if not ph["in_comment"] and name in sections:
+            return cleanup_late(latex_escape(sections.get(name, "")))
+        if name in OPTIONAL_PLACEHOLDERS:
+            return ""
+        if name == "JOB_TITLE":
+            return _tidy_backslashes(job_title_val)
         return None
 
-    # Replace triple- and double-brace tokens, but only on non-comment lines.
-    # This prevents replacing tokens that appear in explanatory comment
-    # lines (for example the template contains a commented mention of
-    # {{MAIN_FONT_SETUP}}). Replacing inside comments can break TeX
-    # when the replacement contains braces or percent signs.
-    lines = tex_content.splitlines(True)
-    for idx, line in enumerate(lines):
-        # Skip pure comment lines
-        if re.match(r"^\s*%", line):
-            continue
-
-        # triple-brace replacement (keeps braces around the value)
-        def repl_triple(m):
-            tn = m.group(1).strip()
-            val = try_replace_token(tn)
-            return ("{" + val + "}") if val is not None else m.group(0)
-
-        line = re.sub(r"\{\{\{([^}]+)\}\}\}", repl_triple, line)
-
-        # double-brace replacement
-        def repl_double(m):
-            tn = m.group(1).strip()
-            val = try_replace_token(tn)
-            return val if val is not None else m.group(0)
-
-        line = re.sub(r"\{\{([^}]+)\}\}", repl_double, line)
-        lines[idx] = line
-    tex_content = "".join(lines)
-
-    # If common company/address tokens remain and we don't have values for them,
-    # blank them out to avoid leaving {{...}} placeholders that trip preflight.
-    optional_company_tokens = [
-        "COMPANY_ADDRESS",
-        "COMPANY_CITY",
-        "COMPANY_ZIP",
-        "COMPANY_NAME",
-    ]
-    for tok in optional_company_tokens:
-        tex_content = tex_content.replace("{{" + tok + "}}", "")
-        tex_content = tex_content.replace("{{{" + tok + "}}}", "")
-
-    # Remove some optional placeholders that may contain underscores and break LaTeX
-    optional_placeholders = [
-        "{{YOUR_TAGLINE_OR_EDUCATION}}",
-        "{{YOUR_LINKEDIN}}",
-        "{{YOUR_LINKEDIN_URL}}",
-        "{{YOUR_PHONE_TEL}}",
-    ]
-    for ph in optional_placeholders:
-        tex_content = tex_content.replace(ph, "")
-
-    # Fix common image path mistakes: templates may reference ../figures/ but
-    # compilation runs from project root, so use figures/
-    tex_content = tex_content.replace("../figures/", "figures/")
-
-    # Final normalization: ensure ampersands inadvertently produced as
-    # "\textbackslash{}&" during escaping are reduced back to "\&". This
-    # preserves tabular alignment characters (raw '&') while still fixing
-    # artifacts coming from latex_escape transformations.
-    tex_content = re.sub(r"\\textbackslash\{\}\\&", r"\\&", tex_content)
-    tex_content = tex_content.replace(r"\textbackslash{}&", r"\&")
-    tex_content = re.sub(r"\\\\&", r"\\&", tex_content)
-
-    # Final safety: escape any raw underscores not already escaped. This
-    # avoids LaTeX errors like "Missing $ inserted" when an underscore
-    # sneaks into the output (for example after backslash/textbackslash
-    # normalization). Use a negative lookbehind so we don't double-escape.
-    tex_content = re.sub(r"(?<!\\)_", r"\\_", tex_content)
-
-    # punctuation. When template macros include '\\' between fields and
-    # some fields are blank, we can end up with sequences like '\\\\,'
-    # Inject JOB_TITLE and COMPANY_NAME placeholders explicitly
-    # COMPANY_NAME: only inject if explicitly provided or derived and not blank
-    # helper to replace multiple token variants (escaped underscores, triple/double braces)
-    def replace_variants(tex_content_local, token, value):
-        # token example: 'JOB_TITLE' or 'COMPANY_NAME'
-        plain_double = "{{" + token + "}}"
-        plain_triple = "{{{" + token + "}}}"
-        esc_token = token.replace("_", r"\_")
-        esc_double = "{{" + esc_token + "}}"
-        esc_triple = "{{{" + esc_token + "}}}"
-        for variant in (plain_double, plain_triple, esc_double, esc_triple):
-            if variant in tex_content_local:
-                # triple-brace variants expect a braced replacement
-                if variant.startswith("{{{"):
-                    tex_content_local = tex_content_local.replace(
-                        variant, "{" + value + "}"
-                    )
-                else:
-                    tex_content_local = tex_content_local.replace(variant, value)
-        return tex_content_local
-
-    if explicit_company_provided:
-        tex_content = replace_variants(tex_content, "JOB_TITLE", job_title_val)
-        tex_content = replace_variants(tex_content, "COMPANY_NAME", company_val)
-    else:
-        tex_content = replace_variants(tex_content, "JOB_TITLE", job_title_val)
-        tex_content = replace_variants(tex_content, "COMPANY_NAME", "")
-    #    LaTeX linebreak in the template). This avoids accidental long runs.
-    tex_content = re.sub(r"(?:\\){3,}", r"\\", tex_content)
-    # 2) Remove occurrences of double-backslash followed immediately by a comma
-    #    which happen when a comma in the template follows an empty field.
-    tex_content = re.sub(r"\\\\,\s*", "", tex_content)
-    # 3) Remove leading '\\' inside braces (e.g. address field) if present
-    tex_content = re.sub(r"\{\\\\\s*", "{", tex_content)
-    # 4) Remove stray '\\,' (backslash followed by comma) left over
-    tex_content = tex_content.replace("\\,", "")
-    # 5) Collapse any remaining runs of more than two backslashes to two
-    tex_content = re.sub(r"(?:\\){3,}", r"\\", tex_content)
+    tpl = _cleaned_template(read_template(template_path), profile_pic, signature_img)
+    tex_content, _ = tpl.render(
+        resolve=resolve, missing=lambda ph: cleanup("{{" + ph["name"] + "}}")
+    )
+    diagnostics = tex_preflight.check_tex(tex_content)
 
     # Write output: ensure parent directory exists before writing the .tex file
     out_dir = os.path.dirname(output_path)
     if out_dir:
-        try:
-            os.makedirs(out_dir, exist_ok=True)
-        except Exception:
-            # If directory creation fails for any reason, raise a clear error
-            raise
+        os.makedirs(out_dir, exist_ok=True)
     with open(output_path, "w", encoding="utf-8") as f:
         f.write(tex_content)
+    tex_preflight.record(output_path, diagnostics)
+    return diagnostics
 
 
 def load_user_profiles(yaml_path="user_info.yml"):
-    """Load user profiles from YAML. If PyYAML not installed, do a minimal parse."""
-    p = Path(yaml_path)
-    if not p.exists():
-        # try searching upward up to 3 parent directories (works when running from 3_latex/)
-        cwd = Path.cwd()
-        found = None
-        for parent in [cwd, cwd.parent, cwd.parent.parent, cwd.parent.parent.parent]:
-            candidate = parent / yaml_path
-            if candidate.exists():
-                found = candidate
-                break
-        if found is None:
-            return []
-        p = found
-    if YAML_AVAILABLE:
-        with open(p, "r", encoding="utf-8") as f:
-            data = yaml_mod.safe_load(f)
-            return data if isinstance(data, list) else []
-    # Minimal parser for simple YAML list of maps
-    profiles = []
-    curr = None
-    with open(p, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.rstrip("\n")
-            if not line.strip() or line.strip().startswith("#"):
-                continue
-            if line.lstrip().startswith("- "):
-                if curr:
-                    profiles.append(curr)
-                curr = {}
-                line = line[line.index("- ") + 2 :]
-                if ":" in line:
-                    k, v = line.split(":", 1)
-                    curr[k.strip()] = v.strip()
-            elif ":" in line and curr is not None:
-                k, v = line.split(":", 1)
-                curr[k.strip()] = v.strip()
-        if curr:
-            profiles.append(curr)
-    return profiles
-
-
-def latex_escape(s: str) -> str:
-    """Escape common LaTeX special characters."""
-    if s is None:
-        return ""
-    # Coerce to string if needed (YAML may parse phone numbers as int)
-    if not isinstance(s, str):
-        s = str(s)
-    # Preserve any user-escaped ampersands (literal \&) so we don't
-    # convert the leading backslash into a printed backslash glyph
-    # (\textbackslash{}) later. Use an alphanumeric token to avoid
-    # accidental escaping of underscores; restore it at the end.
-    AMP_PRE_ESC = "AMPTOKEN42"
-    s = s.replace("\\&", AMP_PRE_ESC)
-    # Replace characters with their LaTeX-escaped equivalents.
-    # Note: order matters. Do NOT replace backslash first — do it last to
-    # avoid introducing extra backslashes before other escapes (which
-    # could produce sequences like "\\\\&" or "\\&" that TeX
-    # interprets as a linebreak followed by an alignment tab).
-    repl_order = [
-        ("&", r"\&"),
-        ("%", r"\%"),
-        ("$", r"\$"),
-        ("#", r"\#"),
-        ("_", r"\_"),
-        ("{", r"\{"),
-        ("}", r"\}"),
-        ("~", r"\textasciitilde{}"),
-        ("^", r"\textasciicircum{}"),
-        # backslash last
-        ("\\", r"\textbackslash{}"),
-    ]
-    for k, v in repl_order:
-        s = s.replace(k, v)
-    # Restore any preserved user-escaped ampersands as a single-escaped \&
-    s = s.replace(AMP_PRE_ESC, r"\&")
-    return s
+    """Load user profiles (cached and validated by profile_store)."""
+    return profile_store.load_profiles(yaml_path)
 
 
 # Font detection and host-side caching removed per user request.
@@ -537,6 +466,11 @@ def parse_front_matter(md_file):
             text = f.read()
     except Exception:
         return {}
+    return front_matter_of(text)
+
+
+def front_matter_of(text):
+    """Top-level key: value pairs of the front matter at the start of text."""
     fm = {}
     if text.startswith("---"):
         parts = text.split("---", 2)
@@ -615,14 +549,192 @@ def format_date_for_lang(dt: datetime, lang: Optional[str] = None):
     return dt.strftime("%d. %B %Y")
 
 
+def build_user_context(md_file, user=None, date_override=None, font=None):
+    """Return (language, effective user dict) for a single markdown file.
+
+    The effective user always carries a DATE formatted for the language
+    detected from the front matter or filename suffix.
+    """
+    basename = Path(md_file).stem
+    front = load_letter(md_file)["front"]
+    lang = detect_language_from_frontmatter(front, basename)
+    if date_override:
+        date_str = date_override
+    else:
+        date_str = format_date_for_lang(datetime.now(), lang)
+    effective = dict(user) if user else {}
+    effective["date"] = date_str
+    if font:
+        effective["preferred_font"] = font
+    return lang, effective
+
+
+# Scripts whose code shapes the rendered .tex; part of the build-cache key
+RENDER_TOOLS = (__file__, texescape.__file__, template_engine.__file__)
+
+
+def source_key(md_file, template, effective_user):
+    """Build-cache key of everything that shapes the .tex for md_file."""
+    return build_cache.source_key(md_file, template, effective_user, tools=RENDER_TOOLS)
+
+
+def render_markdown_file(md_file, template, user=None, date_override=None, font=None, output_dir="src/applications", force=False):
+    """Parse one markdown letter and write its .tex without prompting.
+
+    Returns (output_path, status, diagnostics) where status is "created",
+    "unchanged" (inputs match the build manifest, nothing written) or "empty"
+    (no sections found, output_path is None) and diagnostics are the
+    preflight results for the .tex (see tex_preflight.check_tex).
+    """
+    basename = Path(md_file).stem
+    lang, effective = build_user_context(md_file, user, date_override, font)
+    output_path = f"{output_dir}/{basename}.tex"
+    with pipeline_trace.span("parse.cachecheck", basename):
+        key = source_key(md_file, template, effective)
+        fresh = not force and build_cache.is_source_fresh(output_path, key)
+    if fresh:
+        return output_path, "unchanged", tex_preflight.check_file(output_path)
+    with pipeline_trace.span("parse.markdown", basename):
+        letter = load_letter(md_file)
+    warn_block_errors(md_file, letter["errors"])
+    sections = letter["sections"]
+    if not sections:
+        return None, "empty", []
+    with pipeline_trace.span("parse.render", basename):
+        diagnostics = create_tex_file(
+            template,
+            sections,
+            output_path,
+            user=effective,
+            md_basename=basename,
+            language=lang,
+        )
+    build_cache.record_source(output_path, key, md_file)
+    return output_path, "created", diagnostics
+
+
+def _batch_init(template):
+    """Process pool initializer: warm the template cache once per worker."""
+    read_template(template)
+
+
+def _batch_worker(job):
+    """Render a single markdown file inside a worker; never raises."""
+    md_file, template, user, date_override, font, force = job
+    try:
+        output_path, status, diagnostics = render_markdown_file(
+            md_file, template, user, date_override, font, force=force
+        )
+    except Exception as e:
+        return {"md": md_file, "ok": False, "error": f"{type(e).__name__}: {e}"}
+    if output_path is None:
+        return {"md": md_file, "ok": False, "error": "no sections found"}
+    errors = sum(1 for d in diagnostics if d["severity"] == "error")
+    return {
+        "md": md_file,
+        "ok": not errors,
+        "tex": output_path,
+        "status": status,
+        "error": f"preflight failed for {output_path} ({errors} error(s))" if errors else None,
+        "preflight": tex_preflight.format_diagnostics(diagnostics),
+    }
+
+
+def run_batch(md_files, template, user=None, jobs=1, date_override=None, font=None, force=False):
+    """Render many markdown files, optionally across a process pool.
+
+    Profiles and the template are loaded once by the caller; each worker
+    only parses its markdown and writes the .tex. Returns one result dict
+    per input file, in input order.
+    """
+    work = [(md, template, user, date_override, font, force) for md in md_files]
+    return run_jobs(work, template, jobs)
+
+
+def run_jobs(work, template, jobs=1):
+    """Render (md, template, user, date_override, font, force) jobs in order.
+
+    The jobs may each carry their own user (see bulk_render.py); they all
+    share one letter template. Results come back in job order.
+    """
+    if jobs <= 1 or len(work) <= 1:
+        _batch_init(template)
+        return [_batch_worker(job) for job in work]
+    workers = min(jobs, len(work))
+    chunksize = max(1, len(work) // (workers * 4))
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_batch_init, initargs=(template,)
+    ) as pool:
+        return list(pool.map(_batch_worker, work, chunksize=chunksize))
+
+
+def split_duplicates(letters):
+    """Drop letters whose .tex name an earlier letter already claims.
+
+    Every letter is written to src/applications/<stem>.tex (and compiled to
+    output/<stem>.pdf), so two candidates' letters with the same file name
+    would overwrite each other. letters is [(md, user)]; returns (kept,
+    failed result dicts shaped like run_batch's).
+    """
+    owners = {}
+    kept, failed = [], []
+    for md, user in letters:
+        stem = Path(md).stem
+        if stem in owners:
+            failed.append({"md": md, "ok": False, "error": f"same output name as {owners[stem]}; rename one"})
+            continue
+        owners[stem] = md
+        kept.append((md, user))
+    return kept, failed
+
+
+def print_batch_summary(results, ok_list=None, fail_list=None):
+    """Print the per-file batch summary and optionally append list files.
+
+    ok_list receives one generated .tex path per line, fail_list one
+    markdown path per line (same shape as the Makefile md2pdf lists).
+    """
+    ok = [r for r in results if r["ok"]]
+    failed = [r for r in results if not r["ok"]]
+    print("\n===== parse summary =====")
+    if ok:
+        print(f"Succeeded ({len(ok)}):")
+        for r in ok:
+            note = " (unchanged)" if r.get("status") == "unchanged" else ""
+            print(f"  {r['md']} -> {r['tex']}{note}")
+            if r.get("preflight"):
+                print(textwrap.indent(r["preflight"], "    "))
+    else:
+        print("No .tex files produced.")
+    if failed:
+        print(f"Failed ({len(failed)}):")
+        for r in failed:
+            print(f"  {r['md']}: {r['error']}")
+            if r.get("preflight"):
+                print(textwrap.indent(r["preflight"], "    "))
+    print("=========================")
+    if ok_list:
+        with open(ok_list, "a", encoding="utf-8") as f:
+            for r in ok:
+                f.write(r["tex"] + "\n")
+    if fail_list:
+        with open(fail_list, "a", encoding="utf-8") as f:
+            for r in failed:
+                f.write(r["md"] + "\n")
+    return len(failed) == 0
+
+
 def main():
     import argparse
 
+    pipeline_trace.startup("parse.startup")
     parser = argparse.ArgumentParser(
         description="Convert n8n markdown to .tex files (batch or single)"
     )
     parser.add_argument(
-        "file", nargs="?", help="Optional single markdown file to process"
+        "file",
+        nargs="*",
+        help="Optional markdown file(s) to process (default: all of src/content/*.md)",
     )
     parser.add_argument("--user", "-u", help="User profile id from user_info.yml")
     parser.add_argument(
@@ -650,6 +762,25 @@ def main():
         "--font",
         help='Preferred main font name to use in templates (e.g. "Lato" or "Source Sans 3").',
     )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        help="Batch mode: render all files non-interactively with N worker processes (0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--ok-list",
+        help="Batch mode: append each generated .tex path to this file",
+    )
+    parser.add_argument(
+        "--fail-list",
+        help="Batch mode: append each failed markdown path to this file",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Regenerate .tex files even if the build manifest says they are up to date",
+    )
     args = parser.parse_args()
     # If environment variables are set (via Make), use them as defaults when flags omitted
     env_user = os.environ.get("USER") or os.environ.get("USER_PROFILE")
@@ -669,6 +800,8 @@ def main():
         args.yes = True
     if not args.dry_run and env_dry:
         args.dry_run = True
+    if not args.force and os.environ.get("FORCE"):
+        args.force = True
     # If running non-interactively (e.g. invoked from Make), default to yes to avoid prompts
     try:
         if not sys.stdout.isatty():
@@ -679,11 +812,11 @@ def main():
     # Allow either: single file passed as argument, or no args -> process all md in src/content/
     md_files = []
     if args.file:
-        md_file = args.file
-        if not os.path.exists(md_file):
-            print(f"Error: File not found: {md_file}")
-            sys.exit(1)
-        md_files = [md_file]
+        for md_file in args.file:
+            if not os.path.exists(md_file):
+                print(f"Error: File not found: {md_file}")
+                sys.exit(1)
+        md_files = list(args.file)
     else:
         # Batch mode: look for all markdown files in src/content/
         content_dir = Path("src/content")
@@ -719,15 +852,16 @@ def main():
         template_name = "Modern"
 
     # Load user profiles and prompt selection
-    profiles = load_user_profiles()
+    with pipeline_trace.span("parse.profiles"):
+        profiles = load_user_profiles()
     selected_user = None
     if profiles:
         # If --user provided, try to find it
-        if args.user:
-            for p in profiles:
-                if p.get("id") == args.user:
-                    selected_user = p
-                    break
+        if args.user is None and args.jobs is not None:
+            # Batch mode never prompts; render without auto-fill
+            print("No --user given; rendering without user profile")
+        elif args.user:
+            selected_user = profile_store.get_profile(args.user)
             if not selected_user:
                 print(
                     f"User profile '{args.user}' not found. Available: {[p.get('id') for p in profiles]}"
@@ -753,11 +887,37 @@ def main():
     # (Per-file date handling moved into processing loop so we can detect
     # language per-markdown and format dates accordingly.)
 
+    # Batch mode: profiles and template are loaded once here, workers only
+    # parse and render. Existing outputs are always overwritten.
+    if args.jobs is not None:
+        jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+        if args.dry_run:
+            for md_file in md_files:
+                print(f"[dry-run] Would create: src/applications/{Path(md_file).stem}.tex")
+            return
+        print(f"Batch mode: {len(md_files)} file(s), {jobs} worker(s), template {template_name}")
+        with pipeline_trace.span("parse.batch", files=len(md_files), jobs=jobs):
+            results = run_batch(
+                md_files,
+                template,
+                user=selected_user,
+                jobs=jobs,
+                date_override=args.date,
+                font=args.font,
+                force=args.force,
+            )
+        if not print_batch_summary(results, args.ok_list, args.fail_list):
+            sys.exit(2)
+        return
+
     # Process each markdown file
     for md_file in md_files:
         print("\n-------------------------------------------------------")
         print(f"Processing: {md_file}")
-        sections = parse_markdown(md_file)
+        with pipeline_trace.span("parse.markdown", Path(md_file).stem):
+            letter = load_letter(md_file)
+        warn_block_errors(md_file, letter["errors"])
+        sections = letter["sections"]
         if not sections:
             print(f"Warning: No sections found in {md_file} - skipping")
             continue
@@ -766,7 +926,7 @@ def main():
         # Detect front-matter language or filename suffix (DE/ENG) and
         # compute a language-aware date string for this file. CLI --date
         # overrides formatting if provided.
-        front = parse_front_matter(md_file)
+        front = letter["front"]
         lang = detect_language_from_frontmatter(front, basename)
         if args.date:
             date_str = args.date
@@ -805,6 +965,14 @@ def main():
 
         output_path = f"src/applications/{filename}"
 
+        # Skip documents whose inputs are unchanged since the last run
+        with pipeline_trace.span("parse.cachecheck", basename):
+            key = source_key(md_file, template, selected_user_effective)
+            fresh = not args.force and build_cache.is_source_fresh(output_path, key)
+        if fresh:
+            print(f"✓ Up to date: {output_path}")
+            continue
+
         # If exists, ask per-file
         if os.path.exists(output_path):
             if args.yes:
@@ -817,17 +985,23 @@ def main():
                 print(f"Skipping {output_path}")
                 continue
 
-        create_tex_file(
-            template,
-            sections,
-            output_path,
-            user=selected_user_effective,
-            md_basename=basename,
-            language=lang,
-        )
+        with pipeline_trace.span("parse.render", basename):
+            diagnostics = create_tex_file(
+                template,
+                sections,
+                output_path,
+                user=selected_user_effective,
+                md_basename=basename,
+                language=lang,
+            )
+        build_cache.record_source(output_path, key, md_file)
         print(f"✓ Created: {output_path}")
         print(f"  Template: {template_name}")
         print(f"  Source: {md_file}")
+        if diagnostics:
+            print(tex_preflight.format_diagnostics(diagnostics, output_path))
+        if tex_preflight.has_errors(diagnostics):
+            print(f"  Warning: preflight failed, compile.sh will reject {output_path}")
 
     print(
         "\nAll done. Review files in src/applications/ and run ./compile.sh or `make all` to build PDFs."
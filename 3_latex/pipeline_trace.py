@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing spans for the md -> tex -> pdf pipeline.
+
+Every stage appends one JSON line to build/metrics.jsonl:
+
+  {"run": "...", "stage": "parse.markdown", "doc": "<name>",
+   "start": <epoch s>, "end": <epoch s>, "ok": true, "pid": 123}
+
+The parsers use span()/startup() below; compile.sh writes the same lines
+with printf and the Makefile targets use the `now`/`emit` commands. All
+processes of one `make` invocation share PIPELINE_RUN_ID (set by the
+Makefile), so spans can be grouped per run. Lines are appended with a
+single write each, so parallel workers and compiles can share the file.
+
+Environment:
+  PIPELINE_TRACE=0    disable tracing
+  PIPELINE_METRICS    metrics file (default build/metrics.jsonl)
+  PIPELINE_RUN_ID     run id (default: one per process; new_run() starts
+                      another, e.g. per watch_mds.py batch)
+
+Usage:
+  python3 pipeline_trace.py stats [--runs N] [--stage PREFIX]
+  python3 pipeline_trace.py now
+  python3 pipeline_trace.py emit <stage> <doc> <start> [exit status]
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_METRICS = Path("build") / "metrics.jsonl"
+
+_RUN_ID = os.environ.get("PIPELINE_RUN_ID") or f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+# Child processes (pool workers, compile.sh) report under the same run
+os.environ["PIPELINE_RUN_ID"] = _RUN_ID
+_RUNS = 0
+
+
+def new_run():
+    """Start a new run id for this process and its children; returns it.
+
+    For long-running processes (watch_mds.py) that build many batches: each
+    batch becomes a run of its own in `stats`.
+    """
+    global _RUN_ID, _RUNS
+    _RUNS += 1
+    _RUN_ID = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{_RUNS}"
+    os.environ["PIPELINE_RUN_ID"] = _RUN_ID
+    return _RUN_ID
+
+
+def enabled():
+    return os.environ.get("PIPELINE_TRACE", "1") != "0"
+
+
+def metrics_path():
+    return Path(os.environ.get("PIPELINE_METRICS") or DEFAULT_METRICS)
+
+
+def emit(stage, doc, start, end=None, ok=True, **fields):
+    """Append one finished span; never raises."""
+    if not enabled():
+        return
+    record = {
+        "run": _RUN_ID,
+        "stage": stage,
+        "doc": doc,
+        "start": round(start, 6),
+        "end": round(time.time() if end is None else end, 6),
+        "ok": bool(ok),
+        "pid": os.getpid(),
+    }
+    record.update(fields)
+    line = (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+    path = metrics_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+@contextmanager
+def span(stage, doc=None, **fields):
+    """Time the enclosed block; an exception marks the span ok=false."""
+    start = time.time()
+    ok = True
+    try:
+        yield fields
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        emit(stage, doc, start, ok=ok, **fields)
+
+
+def process_age():
+    """Seconds since this process was started, or None where /proc is unavailable.
+
+    Linux only; resolution is one clock tick (usually 10 ms).
+    """
+    try:
+        with open("/proc/self/stat", "rb") as f:
+            stat = f.read()
+        with open("/proc/uptime", "rb") as f:
+            uptime = float(f.read().split()[0])
+        # Fields after the parenthesized command name; starttime is field 22
+        started = int(stat[stat.rindex(b")") + 2 :].split()[19])
+        return max(0.0, uptime - started / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def startup(stage):
+    """Emit a span from process start until now (interpreter start + imports)."""
+    if not enabled():
+        return
+    age = process_age()
+    if age is not None:
+        now = time.time()
+        emit(stage, None, now - age, now)
+
+
+def read_spans(path=None):
+    """Yield the spans of the metrics file, skipping broken lines."""
+    try:
+        f = open(path or metrics_path(), "r", encoding="utf-8")
+    except OSError:
+        return
+    with f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                record["ms"] = (float(record["end"]) - float(record["start"])) * 1000.0
+            except (ValueError, KeyError, TypeError):
+                continue
+            yield record
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return 0.0
+    k = max(0, min(len(values) - 1, math.ceil(p / 100.0 * len(values)) - 1))
+    return values[k]
+
+
+def stats(spans, runs=20, stage_prefix=None):
+    """Aggregate the spans of the last `runs` runs into per-stage rows."""
+    spans = list(spans)
+    recent = list(dict.fromkeys(s.get("run") for s in spans))
+    keep = set(recent[-runs:]) if runs else set(recent)
+    by_stage = {}
+    for s in spans:
+        if s.get("run") not in keep:
+            continue
+        if stage_prefix and not str(s.get("stage", "")).startswith(stage_prefix):
+            continue
+        by_stage.setdefault(s.get("stage"), []).append(s)
+    rows = []
+    for stage, items in by_stage.items():
+        ms = sorted(s["ms"] for s in items)
+        rows.append(
+            {
+                "stage": stage,
+                "count": len(ms),
+                "failed": sum(1 for s in items if not s.get("ok", True)),
+                "p50": percentile(ms, 50),
+                "p95": percentile(ms, 95),
+                "max": ms[-1],
+                "total": sum(ms),
+            }
+        )
+    rows.sort(key=lambda r: r["total"], reverse=True)
+    return rows, len(keep)
+
+
+def print_stats(rows, run_count):
+    print(f"Pipeline stages over the last {run_count} run(s) ({metrics_path()}):")
+    if not rows:
+        print("  no spans recorded")
+        return
+    print(f"  {'stage':26} {'count':>6} {'fail':>5} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'total s':>9}")
+    for r in rows:
+        print(
+            f"  {r['stage']:26} {r['count']:6d} {r['failed']:5d} {r['p50']:9.1f} "
+            f"{r['p95']:9.1f} {r['max']:9.1f} {r['total'] / 1000.0:9.2f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline timing spans")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_stats = sub.add_parser("stats", help="p50/p95 per stage over recent runs")
+    p_stats.add_argument("--runs", type=int, default=20, help="number of recent runs (0 = all)")
+    p_stats.add_argument("--stage", help="only stages starting with this prefix")
+    sub.add_parser("now", help="print the current epoch time")
+    p_emit = sub.add_parser("emit", help="append a span that started at <start>")
+    p_emit.add_argument("stage")
+    p_emit.add_argument("doc")
+    p_emit.add_argument("start", type=float)
+    p_emit.add_argument("status", nargs="?", type=int, default=0, help="exit status of the stage")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "now":
+        print(f"{time.time():.6f}")
+    elif args.cmd == "emit":
+        emit(args.stage, args.doc if args.doc != "-" else None, args.start, ok=args.status == 0)
+    else:
+        rows, run_count = stats(read_spans(), runs=args.runs, stage_prefix=args.stage)
+        print_stats(rows, run_count)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Cached, indexed access to user profiles (user_info.yml).
+
+Both parsers used to locate, read and parse user_info.yml on every call and
+then scan the list for the wanted id. This module does that once:
+
+  - the file is located like before (given path, then the current directory
+    and up to three parents)
+  - parsed profiles are kept in memory per process and in a JSON cache next
+    to the file (build/user_profiles.json), invalidated by mtime, size and
+    parser (PyYAML or the minimal fallback), so cold CLI runs skip YAML
+  - profiles are validated once at parse time; warnings are kept with the
+    cache and printed once per process
+  - lookups by id go through a dict index (first profile wins on duplicates)
+
+The JSON cache stores YAML dates as ISO strings, which is what the
+templates print for them anyway.
+
+Usage: python3 profile_store.py [user_info.yml]   # list ids, show warnings
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+yaml_mod = None
+try:
+    import yaml as yaml_mod
+
+    YAML_AVAILABLE = True
+except Exception:
+    YAML_AVAILABLE = False
+
+PROFILE_FILE = "user_info.yml"
+CACHE_NAME = "user_profiles.json"
+# Bump when the cache layout or the minimal parser changes
+CACHE_VERSION = 1
+
+# Fields the templates render as text; anything else is passed through
+TEXT_FIELDS = (
+    "full_name",
+    "first_name",
+    "last_name",
+    "email",
+    "phone",
+    "phone_tel",
+    "job_title",
+    "address",
+    "city",
+    "zip",
+    "location",
+    "nationality",
+    "birth_year",
+    "linkedin",
+    "linkedin_url",
+    "linkedin_label",
+    "github",
+    "website",
+    "profile_pic",
+    "signature_image",
+)
+
+# In-process memo: resolved path -> (stat key, profiles, index)
+_MEMO = {}
+_WARNED = set()
+
+
+def find_profile_file(yaml_path=PROFILE_FILE):
+    """Locate the profile file; None if it does not exist anywhere."""
+    p = Path(yaml_path)
+    if p.exists():
+        return p
+    # try searching upward up to 3 parent directories (works when running from 3_latex/)
+    cwd = Path.cwd()
+    for parent in [cwd, cwd.parent, cwd.parent.parent, cwd.parent.parent.parent]:
+        candidate = parent / yaml_path
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def _scalar(value):
+    """Strip an inline '# comment' and matching quotes from a YAML scalar."""
+    value = value.strip()
+    if value[:1] in ("'", '"'):
+        end = value.find(value[0], 1)
+        if end != -1:
+            return value[1:end]
+    hash_pos = value.find(" #")
+    if hash_pos != -1:
+        value = value[:hash_pos].rstrip()
+    return value
+
+
+def parse_minimal(text):
+    """Minimal parser for a simple YAML list of flat maps (no PyYAML)."""
+    profiles = []
+    curr = None
+    for line in text.splitlines():
+        if not line.strip() or line.strip().startswith("#"):
+            continue
+        if line.lstrip().startswith("- "):
+            if curr:
+                profiles.append(curr)
+            curr = {}
+            line = line[line.index("- ") + 2 :]
+            if ":" in line:
+                k, v = line.split(":", 1)
+                curr[k.strip()] = _scalar(v)
+        elif ":" in line and curr is not None:
+            k, v = line.split(":", 1)
+            curr[k.strip()] = _scalar(v)
+    if curr:
+        profiles.append(curr)
+    return profiles
+
+
+def parse_profiles(path):
+    """Parse the profile file with PyYAML, or the minimal parser without it."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if YAML_AVAILABLE:
+        data = yaml_mod.safe_load(text)
+        return data if isinstance(data, list) else []
+    return parse_minimal(text)
+
+
+def validate_profiles(profiles):
+    """Return a list of human-readable problems with the profile list."""
+    problems = []
+    seen = set()
+    for i, p in enumerate(profiles, start=1):
+        if not isinstance(p, dict):
+            problems.append(f"entry {i} is not a mapping")
+            continue
+        pid = p.get("id")
+        if pid is None or str(pid).strip() == "":
+            problems.append(f"entry {i} has no id")
+        elif str(pid) in seen:
+            problems.append(f"duplicate id '{pid}' (entry {i} is ignored for lookups)")
+        else:
+            seen.add(str(pid))
+        for key in TEXT_FIELDS:
+            if isinstance(p.get(key), (list, dict)):
+                problems.append(f"'{pid}': {key} should be a single value")
+    return problems
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size, "yaml" if YAML_AVAILABLE else "minimal"]
+
+
+def _cache_path(path):
+    return Path(path).resolve().parent / "build" / CACHE_NAME
+
+
+def _read_cache(path, key):
+    try:
+        with open(_cache_path(path), "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (
+        not isinstance(cached, dict)
+        or cached.get("version") != CACHE_VERSION
+        or cached.get("source") != str(Path(path).resolve())
+        or cached.get("key") != key
+    ):
+        return None
+    return cached
+
+
+def _write_cache(path, key, profiles, warnings):
+    cache = _cache_path(path)
+    payload = {
+        "version": CACHE_VERSION,
+        "source": str(Path(path).resolve()),
+        "key": key,
+        "profiles": profiles,
+        "warnings": warnings,
+    }
+    try:
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache.with_name(f".{cache.name}.{os.getpid()}")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, default=str)
+        os.replace(tmp, cache)
+    except OSError:
+        # A read-only checkout still works, just without the disk cache
+        pass
+
+
+def _load(yaml_path):
+    path = find_profile_file(yaml_path)
+    if path is None:
+        return [], {}
+    resolved = str(path.resolve())
+    key = _stat_key(path)
+    memo = _MEMO.get(resolved)
+    if memo and memo[0] == key:
+        return memo[1], memo[2]
+
+    cached = _read_cache(path, key)
+    if cached is not None:
+        profiles = cached.get("profiles") or []
+        warnings = cached.get("warnings") or []
+    else:
+        profiles = parse_profiles(path)
+        warnings = validate_profiles(profiles)
+        # Round-trip through JSON so cold and warm runs see the same values
+        profiles = json.loads(json.dumps(profiles, default=str))
+        _write_cache(path, key, profiles, warnings)
+
+    if resolved not in _WARNED:
+        _WARNED.add(resolved)
+        for w in warnings:
+            print(f"Warning: {path}: {w}")
+
+    index = {}
+    for p in profiles:
+        if isinstance(p, dict) and p.get("id") is not None:
+            index.setdefault(str(p["id"]), p)
+    _MEMO[resolved] = (key, profiles, index)
+    return profiles, index
+
+
+def load_profiles(yaml_path=PROFILE_FILE):
+    """Return all profiles (copies; callers may modify them)."""
+    profiles, _ = _load(yaml_path)
+    return [dict(p) if isinstance(p, dict) else p for p in profiles]
+
+
+def get_profile(user_id, yaml_path=PROFILE_FILE):
+    """Return a copy of the profile with the given id, or None."""
+    _, index = _load(yaml_path)
+    p = index.get(str(user_id))
+    return dict(p) if p is not None else None
+
+
+def profile_ids(yaml_path=PROFILE_FILE):
+    """Ids of all profiles, in file order."""
+    _, index = _load(yaml_path)
+    return list(index)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    yaml_path = argv[0] if argv else PROFILE_FILE
+    path = find_profile_file(yaml_path)
+    if path is None:
+        print(f"Error: {yaml_path} not found")
+        return 1
+    ids = profile_ids(yaml_path)
+    print(f"{path}: {len(ids)} profile(s): {', '.join(ids)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
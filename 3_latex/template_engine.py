@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Precompiled {{PLACEHOLDER}} templates.
+
+A template is tokenized once into literal text and placeholder segments and
+cached per file. Rendering is a single join over the segments instead of one
+full-text str.replace pass per placeholder. Placeholders nobody provided a
+value for are kept verbatim in the output and reported back as structured
+data (name, line, column, whether the line is a TeX comment).
+
+Triple-brace placeholders like \\companyname{{{COMPANY_NAME}}} need no special
+handling: the outer braces stay literal text around the {{COMPANY_NAME}} token,
+which gives the same "{value}" result the old replace chains produced.
+"""
+
+import os
+import re
+
+PLACEHOLDER_RE = re.compile(r"\{\{([A-Za-z_][A-Za-z0-9_]*)\}\}")
+_COMMENT_LINE_RE = re.compile(r"[ \t\f\v]*%")
+
+
+class Template:
+    """A template split into literals and placeholders.
+
+    literals always has exactly one more element than placeholders; the
+    rendered text is literals[0] + value[0] + literals[1] + ... + literals[-1].
+    Each placeholder is a dict with name, line, column and in_comment.
+    """
+
+    __slots__ = ("source", "literals", "placeholders")
+
+    def __init__(self, text, source=None):
+        self.source = source
+        self.literals = []
+        self.placeholders = []
+        pos = 0
+        line = 1
+        line_start = 0
+        for m in PLACEHOLDER_RE.finditer(text):
+            start = m.start()
+            self.literals.append(text[pos:start])
+            line += text.count("\n", pos, start)
+            nl = text.rfind("\n", 0, start)
+            line_start = nl + 1
+            self.placeholders.append(
+                {
+                    "name": m.group(1),
+                    "line": line,
+                    "column": start - line_start + 1,
+                    "in_comment": bool(_COMMENT_LINE_RE.match(text, line_start)),
+                }
+            )
+            pos = m.end()
+        self.literals.append(text[pos:])
+
+    @property
+    def names(self):
+        """Distinct placeholder names in template order."""
+        return list(dict.fromkeys(p["name"] for p in self.placeholders))
+
+    def map_literals(self, fn):
+        """Return a copy whose literal segments have been passed through fn."""
+        other = Template.__new__(Template)
+        other.source = self.source
+        other.literals = [fn(lit) for lit in self.literals]
+        other.placeholders = self.placeholders
+        return other
+
+    def render(self, values=None, resolve=None, missing=None):
+        """Render the template in one pass.
+
+        values is a name -> text mapping. Alternatively resolve(placeholder)
+        is called with the placeholder dict and returns the text or None.
+        Unresolved placeholders are emitted as missing(placeholder) when given,
+        otherwise verbatim as {{NAME}}.
+
+        Returns (text, unresolved) where unresolved lists the placeholder dicts
+        that had no value.
+        """
+        literals = self.literals
+        parts = [literals[0]]
+        unresolved = []
+        for i, ph in enumerate(self.placeholders, start=1):
+            if resolve is not None:
+                val = resolve(ph)
+            else:
+                val = values.get(ph["name"]) if values is not None else None
+            if val is None:
+                unresolved.append(ph)
+                val = missing(ph) if missing is not None else "{{" + ph["name"] + "}}"
+            parts.append(val)
+            parts.append(literals[i])
+        return "".join(parts), unresolved
+
+
+# Compiled templates keyed by (path, mtime, size, preprocess)
+_CACHE = {}
+
+
+def load_template(path, preprocess=None):
+    """Return the compiled Template for a file, tokenizing it only once.
+
+    preprocess, if given, is applied to the raw text before tokenizing and is
+    part of the cache key. The cache is invalidated when the file changes.
+    """
+    path = str(path)
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size, preprocess)
+    tpl = _CACHE.get(key)
+    if tpl is None:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        if preprocess is not None:
+            text = preprocess(text)
+        tpl = Template(text, source=path)
+        _CACHE[key] = tpl
+    return tpl
+
+
+def render_file(path, values):
+    """Convenience wrapper: render a template file with a plain value mapping."""
+    return load_template(path).render(values)
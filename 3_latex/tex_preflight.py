@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Preflight checks for generated .tex files.
+
+The same checks compile.sh runs with perl/awk/grep, done in-process on the
+rendered TeX string before it is written:
+
+  ampersand    unescaped '&' outside tabular/array environments (error)
+  placeholder  leftover {{...}} tokens on non-comment lines (error)
+  todo         TODO markers, case-insensitive (warning)
+
+A document without errors gets a stamp file build/preflight/<name>.ok;
+compile.sh skips its shell preflight while the stamp is newer than the .tex.
+
+Usage: python3 tex_preflight.py <file.tex> [...]   # exit 2 on errors
+"""
+
+import os
+import re
+import sys
+from pathlib import Path
+
+STAMP_DIR = Path("build") / "preflight"
+
+_COMMENT_RE = re.compile(r"^\s*%")
+_TABULAR_BEGIN = re.compile(r"\\begin\{tabular")
+_TABULAR_END = re.compile(r"\\end\{tabular")
+_ARRAY_BEGIN = re.compile(r"\\begin\{array")
+_ARRAY_END = re.compile(r"\\end\{array")
+_RAW_AMP_RE = re.compile(r"(?<!\\)&")
+_PLACEHOLDER_RE = re.compile(r"\{\{[^}]+\}\}")
+# Macro definitions with doubled braces are not placeholders
+_PLACEHOLDER_EXEMPT_RE = re.compile(r"\\newcommand|\\small\$\\diamond\$")
+_TODO_RE = re.compile(r"todo", re.IGNORECASE)
+
+
+def _flip_flop(begin, end):
+    """Perl's /begin/ .. /end/ range operator, evaluated once per line."""
+    active = False
+
+    def in_range(line):
+        nonlocal active
+        if not active:
+            if not begin.search(line):
+                return False
+            active = True
+        # The closing pattern is checked on the opening line as well
+        if end.search(line):
+            active = False
+        return True
+
+    return in_range
+
+
+def check_tex(text):
+    """Return preflight diagnostics for a TeX document.
+
+    Each diagnostic is a dict with kind, severity ("error" or "warning"),
+    line (1-based) and text (the offending line).
+    """
+    diagnostics = []
+    in_tabular = _flip_flop(_TABULAR_BEGIN, _TABULAR_END)
+    in_array = _flip_flop(_ARRAY_BEGIN, _ARRAY_END)
+    lines = text.split("\n")
+    if text.endswith("\n"):
+        lines.pop()
+    for lineno, line in enumerate(lines, start=1):
+        comment = bool(_COMMENT_RE.match(line))
+        # Ampersands: comment lines never reach the range operators
+        if not comment and not in_tabular(line) and not in_array(line):
+            if _RAW_AMP_RE.search(line):
+                diagnostics.append(
+                    {"kind": "ampersand", "severity": "error", "line": lineno, "text": line}
+                )
+        if (
+            not comment
+            and _PLACEHOLDER_RE.search(line)
+            and not _PLACEHOLDER_EXEMPT_RE.search(line)
+        ):
+            diagnostics.append(
+                {"kind": "placeholder", "severity": "error", "line": lineno, "text": line}
+            )
+        if _TODO_RE.search(line):
+            diagnostics.append(
+                {"kind": "todo", "severity": "warning", "line": lineno, "text": line}
+            )
+    return diagnostics
+
+
+def has_errors(diagnostics):
+    return any(d["severity"] == "error" for d in diagnostics)
+
+
+_HEADINGS = {
+    "ampersand": "Preflight: Found unescaped ampersand(s) in source:",
+    "placeholder": "Preflight: Found placeholder token(s) like {{...}} in source:",
+    "todo": "Preflight: Found TODO markers (case-insensitive):",
+}
+
+
+def format_diagnostics(diagnostics, source=None):
+    """Render diagnostics like the compile.sh preflight ("line:text")."""
+    out = []
+    for kind, heading in _HEADINGS.items():
+        items = [d for d in diagnostics if d["kind"] == kind]
+        if not items:
+            continue
+        out.append(f"{heading} {source}" if source else heading)
+        out.extend(f"{d['line']}:{d['text']}" for d in items)
+    return "\n".join(out)
+
+
+def stamp_path(tex_path):
+    return STAMP_DIR / f"{Path(tex_path).stem}.ok"
+
+
+def record(tex_path, diagnostics):
+    """Write the validation stamp for a clean document, drop it otherwise.
+
+    Call after the .tex has been written so the stamp is newer than it.
+    """
+    stamp = stamp_path(tex_path)
+    if has_errors(diagnostics):
+        try:
+            stamp.unlink()
+        except FileNotFoundError:
+            pass
+        return
+    stamp.parent.mkdir(parents=True, exist_ok=True)
+    tmp = stamp.with_name(f".{stamp.name}.{os.getpid()}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(f"{tex_path}\n")
+    os.replace(tmp, stamp)
+
+
+def check_file(tex_path):
+    """Preflight an existing .tex file and update its stamp."""
+    with open(tex_path, "r", encoding="utf-8", errors="replace") as f:
+        diagnostics = check_tex(f.read())
+    record(tex_path, diagnostics)
+    return diagnostics
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("Usage: tex_preflight.py <file.tex> [...]")
+        return 1
+    status = 0
+    for tex_path in argv:
+        diagnostics = check_file(tex_path)
+        if diagnostics:
+            print(format_diagnostics(diagnostics, tex_path))
+        if has_errors(diagnostics):
+            status = 2
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Shared LaTeX escaping for the letter and CV parsers.
+
+  latex_escape     letter parser: backslash is escaped last, so every escape
+                   comes out as \\textbackslash{}<char> (create_tex_file
+                   normalizes the ampersand/underscore forms afterwards);
+                   a user-written \\& is kept as \\&
+  latex_escape_cv  CV parser: backslash is escaped first, \\& style escapes
+
+Each escaper is an ordered replacement table. Only the characters that occur
+in the input are replaced, so a plain string costs one regex scan and is
+returned as is. Results for short strings (names, emails, phone numbers
+repeat in every document) are memoized.
+
+A per-character str.translate table would be a single pass, but with
+multi-character replacements it is several times slower than a few C-level
+str.replace calls on paragraph-sized input (see
+98_testfiles/bench_latex_escape.py).
+"""
+
+import re
+from functools import lru_cache
+
+_SPECIAL_RE = re.compile(r"[\\&%$#_{}~^]")
+
+# Strings up to this length are memoized; paragraphs are not worth caching
+MEMO_MAX_LEN = 256
+
+# Order matters. The letter table does NOT replace backslash first but last,
+# to avoid introducing extra backslashes before other escapes (which could
+# produce sequences like "\\\\&" that TeX interprets as a linebreak
+# followed by an alignment tab).
+LETTER_TABLE = (
+    ("&", r"\&"),
+    ("%", r"\%"),
+    ("$", r"\$"),
+    ("#", r"\#"),
+    ("_", r"\_"),
+    ("{", r"\{"),
+    ("}", r"\}"),
+    ("~", r"\textasciitilde{}"),
+    ("^", r"\textasciicircum{}"),
+    ("\\", r"\textbackslash{}"),
+)
+
+# The CV table escapes backslash first
+CV_TABLE = (
+    ("\\", r"\textbackslash{}"),
+    ("&", r"\&"),
+    ("%", r"\%"),
+    ("$", r"\$"),
+    ("#", r"\#"),
+    ("_", r"\_"),
+    ("{", r"\{"),
+    ("}", r"\}"),
+    ("~", r"\textasciitilde{}"),
+    ("^", r"\textasciicircum{}"),
+)
+
+
+def _apply(s, table):
+    for char, replacement in table:
+        if char in s:
+            s = s.replace(char, replacement)
+    return s
+
+
+def _escape_letter(s):
+    if not _SPECIAL_RE.search(s):
+        return s
+    if "\\&" in s:
+        # Preserve user-escaped ampersands (literal \&) instead of turning
+        # the backslash into a printed \textbackslash{} glyph
+        return r"\&".join(_apply(part, LETTER_TABLE) for part in s.split("\\&"))
+    return _apply(s, LETTER_TABLE)
+
+
+def _escape_cv(s):
+    if not _SPECIAL_RE.search(s):
+        return s
+    return _apply(s, CV_TABLE)
+
+
+_escape_letter_memo = lru_cache(maxsize=4096)(_escape_letter)
+_escape_cv_memo = lru_cache(maxsize=4096)(_escape_cv)
+
+
+def latex_escape(s) -> str:
+    """Escape common LaTeX special characters (letter parser variant)."""
+    if s is None:
+        return ""
+    # Coerce to string if needed (YAML may parse phone numbers as int)
+    if not isinstance(s, str):
+        s = str(s)
+    if len(s) <= MEMO_MAX_LEN:
+        return _escape_letter_memo(s)
+    return _escape_letter(s)
+
+
+def latex_escape_cv(text) -> str:
+    """Escape special LaTeX characters (CV parser variant)"""
+    if not text:
+        return ""
+    if not isinstance(text, str):
+        text = str(text)
+    if len(text) <= MEMO_MAX_LEN:
+        return _escape_cv_memo(text)
+    return _escape_cv(text)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Precompiled preamble formats (.fmt) for compile.sh (opt-in with FMT=1).
+
+Every letter and CV re-reads the same preamble. With the mylatexformat
+package the part of the preamble before an endofdump marker is dumped into a
+custom format once; documents are then compiled with -fmt=<name> and TeX
+skips everything up to the marker.
+
+The templates carry the marker as
+
+    \\csname endofdump\\endcsname
+
+which expands to \\relax in a normal compile. It sits before the first
+package that loads fonts (fontawesome5, \\setmainfont, \\IfFontExistsTF):
+XeTeX cannot dump native (OpenType) fonts, so font selection always runs
+at compile time. A document without the marker is compiled normally.
+
+Formats live in build/fmt/<key>.fmt. The key hashes the dumped preamble,
+the files under style/ and the engine binary, so editing the template
+preamble, a class or style file, or updating TeX rebuilds the format. A
+failed dump leaves <key>.failed next to it (with the log) and compiles fall
+back to the normal path until the key changes; `texformat.py clean` forgets
+everything. Concurrent compiles serialize the dump with a lock file.
+
+Usage (from compile.sh; messages go to stderr, the format name to stdout):
+  python3 texformat.py ensure <file.tex> [engine]   # exit 1 = no format
+  python3 texformat.py clean
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import build_cache
+
+try:
+    import fcntl
+except ImportError:  # no flock on Windows; dumps are then not serialized
+    fcntl = None
+
+# Bump when the dump procedure changes so old formats are rebuilt
+FORMAT_VERSION = 1
+
+FMT_DIR = Path("build") / "fmt"
+ENDOFDUMP = r"\csname endofdump\endcsname"
+DUMP_TIMEOUT = 300
+
+_MARKER_RE = re.compile(r"^[ \t]*\\(?:csname endofdump\\endcsname|endofdump\b)", re.MULTILINE)
+_BEGIN_DOCUMENT_RE = re.compile(r"^[^%\n]*\\begin\{document\}", re.MULTILINE)
+
+
+def split_preamble(tex):
+    """Return the preamble part before the endofdump marker, or None."""
+    marker = _MARKER_RE.search(tex)
+    if marker is None:
+        return None
+    begin = _BEGIN_DOCUMENT_RE.search(tex)
+    if begin is not None and begin.start() < marker.start():
+        return None
+    return tex[: marker.start()]
+
+
+def _engine_id(engine):
+    """Identify the engine binary by path, mtime and size (cheap, no subprocess)."""
+    path = shutil.which(engine)
+    if path is None:
+        return None
+    st = os.stat(path)
+    return f"{engine}:{os.path.realpath(path)}:{st.st_mtime_ns}:{st.st_size}"
+
+
+def format_name(preamble, engine):
+    """Format name for a preamble; None if the engine is not installed."""
+    engine_id = _engine_id(engine)
+    if engine_id is None:
+        return None
+    h = hashlib.sha256()
+    h.update(f"v{FORMAT_VERSION}".encode("ascii"))
+    h.update(engine_id.encode("utf-8"))
+    h.update(build_cache.style_digest().encode("ascii"))
+    h.update(preamble.encode("utf-8"))
+    return f"{engine}-{h.hexdigest()[:20]}"
+
+
+def _tex_env():
+    env = dict(os.environ)
+    # Same search path as compile.sh
+    env["TEXINPUTS"] = ".:./style:./src:./src/applications:" + env.get("TEXINPUTS", "")
+    return env
+
+
+def _dump(name, preamble, engine):
+    """Dump a format for the preamble; True if build/fmt/<name>.fmt exists afterwards."""
+    fmt = FMT_DIR / f"{name}.fmt"
+    source = FMT_DIR / f"{name}.tex"
+    job = f"{name}.{os.getpid()}"
+    with open(source, "w", encoding="utf-8") as f:
+        f.write(preamble)
+        f.write(ENDOFDUMP + "\n\\begin{document}\\end{document}\n")
+    cmd = [
+        engine,
+        "-ini",
+        "-interaction=nonstopmode",
+        "-halt-on-error",
+        f"-jobname={job}",
+        f"-output-directory={FMT_DIR}",
+        f"&{engine}",
+        "mylatexformat.ltx",
+        str(source),
+    ]
+    try:
+        proc = subprocess.run(
+            cmd,
+            env=_tex_env(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            timeout=DUMP_TIMEOUT,
+        )
+        ok = proc.returncode == 0 and (FMT_DIR / f"{job}.fmt").exists()
+    except (OSError, subprocess.TimeoutExpired):
+        ok = False
+    if ok:
+        os.replace(FMT_DIR / f"{job}.fmt", fmt)
+    log = FMT_DIR / f"{job}.log"
+    if log.exists():
+        os.replace(log, FMT_DIR / f"{name}.log")
+    if not ok:
+        with open(FMT_DIR / f"{name}.failed", "w", encoding="utf-8") as f:
+            f.write(" ".join(cmd) + "\n")
+    return ok
+
+
+def ensure_format(tex_path, engine="xelatex"):
+    """Return the format name to compile tex_path with, building it if needed.
+
+    Returns None when the document has no endofdump marker, the engine or
+    mylatexformat is missing, or the dump failed; compile normally then.
+    """
+    with open(tex_path, "r", encoding="utf-8", errors="replace") as f:
+        preamble = split_preamble(f.read())
+    if preamble is None:
+        return None
+    name = format_name(preamble, engine)
+    if name is None:
+        return None
+    fmt = FMT_DIR / f"{name}.fmt"
+    failed = FMT_DIR / f"{name}.failed"
+    if fmt.exists():
+        return name
+    if failed.exists():
+        return None
+
+    FMT_DIR.mkdir(parents=True, exist_ok=True)
+    with open(FMT_DIR / f"{name}.lock", "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        # Another compile may have dumped (or failed) while we waited
+        if fmt.exists():
+            return name
+        if failed.exists():
+            return None
+        if not _has_mylatexformat(engine):
+            print("Warning: mylatexformat.ltx not found; compiling without a format", file=sys.stderr)
+            return None
+        print(f"Building format {fmt} ...", file=sys.stderr)
+        if not _dump(name, preamble, engine):
+            print(f"Warning: format dump failed, see {FMT_DIR / (name + '.log')}", file=sys.stderr)
+            return None
+    return name
+
+
+def _has_mylatexformat(engine):
+    kpsewhich = shutil.which("kpsewhich")
+    if kpsewhich is None:
+        return False
+    proc = subprocess.run(
+        [kpsewhich, f"-progname={engine}", "mylatexformat.ltx"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    return proc.returncode == 0 and proc.stdout.strip() != b""
+
+
+def clean():
+    """Remove all cached formats, logs and failure markers."""
+    if FMT_DIR.exists():
+        shutil.rmtree(FMT_DIR)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["ensure"] and len(argv) in (2, 3):
+        name = ensure_format(argv[1], *argv[2:])
+        if name is None:
+            return 1
+        print(name)
+        return 0
+    if argv == ["clean"]:
+        clean()
+        return 0
+    print("Usage: texformat.py ensure <file.tex> [engine] | clean")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
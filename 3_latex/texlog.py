@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Structured reports from xelatex logs.
+
+compile.sh used to grep the .log several times ("not found", "Font shape",
+"using `") and pipe the matches through sed/cut/tr/awk to guess the font
+status. This reads the log once and returns a report dict:
+
+  errors              file, line, message and the "l.N ..." context; with
+                      -file-line-error (compile.sh passes it) file and line
+                      come from the error line itself, otherwise from the
+                      log's file nesting and the l.N line
+  warnings            LaTeX/package/class warnings with their input line
+  boxes               overfull/underfull \\hbox and \\vbox, with the amount
+                      (pt) or badness, source lines and file
+  font_substitutions  requested and used font shape ("using `...' instead")
+  missing_fonts       fonts fontspec/XeTeX could not load
+  missing_files       files TeX could not find (aux-type files left out)
+  pages               from "Output written on ... (N pages)"; 0 for "No
+                      pages of output", None if the compile stopped early
+  fatal               the run ended in an emergency stop/fatal error
+
+analyze() adds the document's font status (the requested font from the
+.tex, substitutions, and the embedded fonts via pdffonts when installed),
+the line compile.sh prints as "Font info". compile.sh saves one report per
+document to build/reports/<name>.json; `summary` aggregates them across a
+batch (compile_batch.sh runs it after the compiles).
+
+Usage (from 3_latex/):
+  python3 texlog.py analyze <file.log> [--tex file.tex] [--pdf file.pdf]
+                    [--save report.json] [--status] [--json]
+  python3 texlog.py summary [-|file.tex|report.json ...] [--json]
+      (- reads .tex or report paths from stdin; no paths: all reports)
+
+--status prints only the font status on stdout (diagnostics go to stderr).
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+
+REPORTS_DIR = Path("build") / "reports"
+# TeX wraps log lines at max_print_line characters
+MAX_PRINT_LINE = 79
+# Files every first compile misses
+AUX_EXTENSIONS = (".aux", ".toc", ".lof", ".lot", ".out", ".bbl", ".nav", ".snm", ".vrb")
+
+_FILE_LINE_ERROR_RE = re.compile(r"^(\S+\.\w+):(\d+): (.+)$")
+_CONTEXT_RE = re.compile(r"^l\.(\d+) ?(.*)$")
+_WARNING_RE = re.compile(r"^(?:(LaTeX(?: Font)?)|Package (\S+)|Class (\S+)) Warning: (.*)$")
+_INPUT_LINE_RE = re.compile(r"on input line (\d+)")
+_BOX_RE = re.compile(
+    r"^(Overfull|Underfull) \\([hv]box) \((?:([\d.]+)pt too \w+|badness (\d+))\) "
+    r"(?:in (?:paragraph|alignment) at lines (\d+)--(\d+)|detected at line (\d+)|has occurred while)"
+)
+_SHAPE_RE = re.compile(r"Font shape `([^']+)' undefined")
+_USING_RE = re.compile(r"using `([^']+)' instead")
+_MISSING_FILE_RES = (
+    re.compile(r"File `([^']+)' not found"),
+    re.compile(r"I can't find file `([^']+)'"),
+    re.compile(r"^No file (\S+)\.$"),
+)
+_MISSING_FONT_RES = (
+    re.compile(r'The font "([^"]+)" cannot be\s*found'),
+    re.compile(r"Font \\\S+=\"?([^\":]+?)\"?(?::\S*)?(?: at [\d.]+pt)? not loadable"),
+)
+_PAGES_RE = re.compile(r"^Output written on .*\((\d+) pages?")
+_FATAL_MESSAGES = ("Emergency stop.", "==> Fatal error occurred, no output PDF file produced!")
+_PAREN_RE = re.compile(r"\(([^()\s]*)|\)")
+_FILE_NAME_RE = re.compile(r"^(?:\.{0,2}/|/)?[^()\s]*\.[A-Za-z]{1,8}$")
+_REQUESTED_FONT_RE = re.compile(r"\\(?:setmainfont|setsansfont)(?:\[[^\]]*\])?\{([^}]+)\}")
+_IF_FONT_RE = re.compile(r"\\IfFontExistsTF\{([^}]+)\}")
+
+
+def unwrap(text):
+    """Log lines with TeX's hard wrapping at MAX_PRINT_LINE undone."""
+    lines = []
+    pending = ""
+    for line in text.splitlines():
+        if len(line) == MAX_PRINT_LINE:
+            pending += line
+            continue
+        lines.append(pending + line)
+        pending = ""
+    if pending:
+        lines.append(pending)
+    return lines
+
+
+def _track_files(stack, line):
+    """Update the stack of open files with the "(file" / ")" tokens of a line."""
+    for m in _PAREN_RE.finditer(line):
+        if m.group(0) == ")":
+            if stack:
+                stack.pop()
+        else:
+            name = m.group(1)
+            stack.append(name if name and _FILE_NAME_RE.match(name) else None)
+
+
+def _current_file(stack):
+    return next((name for name in reversed(stack) if name), None)
+
+
+def _family(spec):
+    """Font family of a NFSS shape spec: TU/SourceSans3(0)/m/n -> SourceSans3."""
+    parts = spec.split("/")
+    return re.sub(r"\(\d+\)$", "", parts[1] if len(parts) > 1 else parts[0])
+
+
+def parse_log(text):
+    """Report dict of a TeX log (see the module docstring)."""
+    lines = unwrap(text)
+    report = {
+        "pages": None,
+        "fatal": False,
+        "errors": [],
+        "warnings": [],
+        "boxes": [],
+        "font_substitutions": [],
+        "missing_fonts": [],
+        "missing_files": [],
+    }
+    stack = []
+    shape = None
+    warning = None
+    in_box = False
+    for i, line in enumerate(lines):
+        # The typeset material printed after a box message runs to a blank line
+        if in_box:
+            in_box = bool(line.strip())
+            continue
+        # Continuation lines of a warning start with "(Package)" padding
+        if warning is not None:
+            prefix = f"({warning['package'] or 'LaTeX'})"
+            if line.startswith(prefix) or (warning["package"] is None and line.startswith("(Font)")):
+                warning["message"] += " " + line[line.index(")") + 1 :].strip()
+                _finish_warning(warning)
+                m = _USING_RE.search(line)
+                if m:
+                    report["font_substitutions"].append(
+                        {"requested": shape, "used": m.group(1), "line": warning["line"]}
+                    )
+                continue
+            warning = None
+
+        m = _FILE_LINE_ERROR_RE.match(line)
+        if m or line.startswith("!"):
+            if m:
+                error = {"file": m.group(1), "line": int(m.group(2)), "message": m.group(3), "context": None}
+            else:
+                error = {"file": _current_file(stack), "line": None, "message": line[1:].strip(), "context": None}
+            for follow in lines[i + 1 : i + 12]:
+                c = _CONTEXT_RE.match(follow)
+                if c:
+                    error["line"] = error["line"] or int(c.group(1))
+                    error["context"] = c.group(2).strip() or None
+                    break
+            if error["message"] in _FATAL_MESSAGES:
+                report["fatal"] = True
+            else:
+                report["errors"].append(error)
+        elif line.startswith("No pages of output"):
+            report["pages"] = 0
+
+        m = _WARNING_RE.match(line)
+        if m:
+            warning = {"package": m.group(2) or m.group(3), "message": m.group(4).strip(), "line": None}
+            _finish_warning(warning)
+            report["warnings"].append(warning)
+            if m.group(1) == "LaTeX Font":
+                s = _SHAPE_RE.search(line)
+                shape = s.group(1) if s else None
+                u = _USING_RE.search(line)
+                if u:
+                    report["font_substitutions"].append(
+                        {"requested": shape, "used": u.group(1), "line": warning["line"]}
+                    )
+
+        m = _BOX_RE.match(line)
+        if m:
+            first = m.group(5) or m.group(7)
+            last = m.group(6) or m.group(7)
+            report["boxes"].append(
+                {
+                    "kind": m.group(1).lower(),
+                    "box": m.group(2),
+                    "amount": float(m.group(3)) if m.group(3) else None,
+                    "badness": int(m.group(4)) if m.group(4) else None,
+                    "lines": [int(first), int(last)] if first else None,
+                    "file": _current_file(stack),
+                }
+            )
+            in_box = True
+            continue
+
+        for regex in _MISSING_FILE_RES:
+            f = regex.search(line)
+            if f and not f.group(1).lower().endswith(AUX_EXTENSIONS) and f.group(1) not in report["missing_files"]:
+                report["missing_files"].append(f.group(1))
+        for regex in _MISSING_FONT_RES:
+            f = regex.search(line)
+            if f and f.group(1).strip() not in report["missing_fonts"]:
+                report["missing_fonts"].append(f.group(1).strip())
+
+        m = _PAGES_RE.match(line)
+        if m:
+            report["pages"] = int(m.group(1))
+            continue
+
+        _track_files(stack, line)
+    return report
+
+
+def _finish_warning(warning):
+    m = _INPUT_LINE_RE.search(warning["message"])
+    if m:
+        warning["line"] = int(m.group(1))
+
+
+def requested_font(tex_text):
+    """First \\setmainfont/\\setsansfont family of a document, else the first \\IfFontExistsTF one."""
+    m = _REQUESTED_FONT_RE.search(tex_text) or _IF_FONT_RE.search(tex_text)
+    return m.group(1).strip() if m else None
+
+
+def embedded_fonts(pdf_path):
+    """Font names embedded in a PDF according to pdffonts, or [] without it."""
+    if not pdf_path or not Path(pdf_path).exists() or not shutil.which("pdffonts"):
+        return []
+    try:
+        out = subprocess.run(["pdffonts", str(pdf_path)], capture_output=True, text=True, timeout=30).stdout
+    except (OSError, subprocess.SubprocessError):
+        return []
+    # Two header lines, then one font per line with its name first
+    return [line.split()[0] for line in out.splitlines()[2:] if line.split()]
+
+
+def log_excerpt(lines):
+    """A few log lines around the first font problem, for the console."""
+    for i, line in enumerate(lines):
+        if re.search(r"not found|Font shape|using `", line):
+            return lines[max(0, i - 3) : i + 4]
+    return []
+
+
+def font_status(report, lines, requested, embedded):
+    """The "Font info" line compile.sh prints, and whether to show an excerpt."""
+    if requested is None:
+        mentioned = [line for line in lines if "font" in line.lower()][:6]
+        status = f"Fonts mentioned in log: {' '.join(mentioned)}" if mentioned else "(unknown)"
+        excerpt = False
+    else:
+        needle = requested.lower()
+        trouble = any(
+            needle in line.lower() and ("not found" in line.lower() or "font shape" in line.lower()) for line in lines
+        ) or any(needle in name.lower() for name in report["missing_fonts"])
+        if report["font_substitutions"]:
+            used = ",".join(dict.fromkeys(_family(s["used"]) for s in report["font_substitutions"]))
+            raw = ",".join(s["used"] for s in report["font_substitutions"])
+            status = f"requested font '{requested}' (fallback → {used} [raw: {raw}])"
+        elif trouble:
+            status = f"requested font '{requested}' (fallback/substitution detected — see log excerpt below)"
+        else:
+            status = f"requested font '{requested}' (appears applied)"
+        excerpt = bool(report["font_substitutions"]) or trouble
+    if embedded:
+        match = next((name for name in embedded if requested and requested.lower() in name.lower()), None)
+        status += f"; embedded font: {match}" if match else f"; embedded fonts: {','.join(embedded)}"
+    return status, excerpt
+
+
+def analyze(log_path, tex_path=None, pdf_path=None):
+    """parse_log for a log file plus the document's font status.
+
+    The report also gets log, tex, font (requested, status, embedded) and
+    excerpt (log lines around the first font problem, or []).
+    """
+    with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    lines = unwrap(text)
+    report = parse_log(text)
+    requested = None
+    if tex_path:
+        try:
+            requested = requested_font(Path(tex_path).read_text(encoding="utf-8", errors="replace"))
+        except OSError:
+            pass
+    embedded = embedded_fonts(pdf_path)
+    status, show_excerpt = font_status(report, lines, requested, embedded)
+    report.update(
+        log=str(log_path),
+        tex=str(tex_path) if tex_path else None,
+        font={"requested": requested, "status": status, "embedded": embedded},
+        excerpt=log_excerpt(lines) if show_excerpt else [],
+    )
+    return report
+
+
+def report_path(tex_path):
+    return REPORTS_DIR / f"{Path(tex_path).stem}.json"
+
+
+def save_report(report, path):
+    """Write a report atomically (concurrent compiles share build/reports/)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def load_reports(paths=None):
+    """Reports for .tex or report paths (all under build/reports/ when paths is None)."""
+    if paths is None:
+        paths = sorted(REPORTS_DIR.glob("*.json"))
+    reports = []
+    for p in paths:
+        p = Path(p)
+        if p.suffix == ".tex":
+            p = report_path(p)
+        try:
+            with open(p, "r", encoding="utf-8") as f:
+                reports.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return reports
+
+
+def _document(report):
+    return Path(report.get("tex") or report.get("log") or "?").stem
+
+
+def aggregate(reports):
+    """Totals over several reports, for batch triage."""
+    summary = {
+        "documents": len(reports),
+        "pages": sum(r.get("pages") or 0 for r in reports),
+        "failed": sorted(_document(r) for r in reports if r.get("fatal") or r.get("errors")),
+        "errors": [],
+        "overfull": 0,
+        "underfull": 0,
+        "worst_overfull": None,
+        "font_fallbacks": {},
+        "missing_fonts": {},
+        "missing_files": {},
+    }
+    messages = Counter()
+    fallbacks, fonts, files = Counter(), Counter(), Counter()
+    worst = None
+    for r in reports:
+        doc = _document(r)
+        for e in r.get("errors", []):
+            summary["errors"].append(dict(e, document=doc))
+            messages[e["message"]] += 1
+        for b in r.get("boxes", []):
+            summary[b["kind"]] += 1
+            if b["kind"] == "overfull" and b.get("amount") and (worst is None or b["amount"] > worst[0]):
+                worst = (b["amount"], doc)
+        requested = (r.get("font") or {}).get("requested")
+        for s in r.get("font_substitutions", []):
+            fallbacks[f"{requested or _family(s['requested'] or '?')} -> {_family(s['used'])}"] += 1
+        fonts.update(set(r.get("missing_fonts", [])))
+        files.update(set(r.get("missing_files", [])))
+    if worst:
+        summary["worst_overfull"] = {"amount": worst[0], "document": worst[1]}
+    summary["error_messages"] = dict(messages.most_common())
+    summary["font_fallbacks"] = dict(fallbacks.most_common())
+    summary["missing_fonts"] = dict(fonts.most_common())
+    summary["missing_files"] = dict(files.most_common())
+    return summary
+
+
+def print_summary(summary):
+    failed = len(summary["failed"])
+    print(f"texlog: {summary['documents']} document(s), {summary['pages']} page(s), {failed} with errors")
+    for e in summary["errors"][:20]:
+        where = f"{e['file'] or e['document']}:{e['line']}" if e["line"] else (e["file"] or e["document"])
+        print(f"  error    {where}: {e['message']}")
+    if len(summary["errors"]) > 20:
+        print(f"  ... {len(summary['errors']) - 20} more error(s)")
+    if summary["overfull"] or summary["underfull"]:
+        worst = summary["worst_overfull"]
+        extra = f", worst {worst['amount']:g}pt in {worst['document']}" if worst else ""
+        print(f"  boxes    {summary['overfull']} overfull, {summary['underfull']} underfull{extra}")
+    for key, label in (("font_fallbacks", "fallback"), ("missing_fonts", "no font"), ("missing_files", "no file")):
+        for name, count in summary[key].items():
+            print(f"  {label:<8} {name} ({count} document(s))")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Structured reports from xelatex logs")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_analyze = sub.add_parser("analyze", help="Report for one log")
+    p_analyze.add_argument("log")
+    p_analyze.add_argument("--tex", help="The compiled .tex (for the requested font)")
+    p_analyze.add_argument("--pdf", help="The PDF (embedded fonts via pdffonts)")
+    p_analyze.add_argument("--save", help="Also write the report as JSON to this file")
+    p_analyze.add_argument("--status", action="store_true", help="Print only the font status (details to stderr)")
+    p_analyze.add_argument("--json", action="store_true", help="Print the report as JSON")
+    p_summary = sub.add_parser("summary", help="Aggregate saved reports")
+    p_summary.add_argument("paths", nargs="*", help=".tex or report paths; - reads them from stdin")
+    p_summary.add_argument("--json", action="store_true", help="Print the aggregate as JSON")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "summary":
+        paths = args.paths
+        if paths == ["-"]:
+            paths = [line.strip() for line in sys.stdin if line.strip()]
+        summary = aggregate(load_reports(paths or None))
+        if args.json:
+            print(json.dumps(summary, ensure_ascii=False, indent=2))
+        elif summary["documents"]:
+            print_summary(summary)
+        return 0
+
+    if not Path(args.log).is_file():
+        print(f"Error: log not found: {args.log}", file=sys.stderr)
+        return 1
+    report = analyze(args.log, args.tex, args.pdf)
+    if args.save:
+        save_report(report, args.save)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 0
+    out = sys.stderr if args.status else sys.stdout
+    for e in report["errors"]:
+        where = f"{e['file']}:{e['line']}" if e["file"] and e["line"] else (e["file"] or f"line {e['line']}")
+        context = f"  [{e['context']}]" if e["context"] else ""
+        print(f"Error: {where}: {e['message']}{context}", file=out)
+    for name in report["missing_files"]:
+        print(f"Warning: file not found: {name}", file=out)
+    overfull = [b for b in report["boxes"] if b["kind"] == "overfull"]
+    if overfull:
+        worst = max((b["amount"] or 0) for b in overfull)
+        print(f"Warning: {len(overfull)} overfull box(es), worst {worst:g}pt", file=out)
+    if report["excerpt"]:
+        print("Relevant log excerpt:", file=out)
+        print("\n".join(report["excerpt"]), file=out)
+    print(report["font"]["status"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Watch for new or changed letter markdown and turn it into PDFs (Linux).
+
+Watched directories:
+
+  ../candidates/*/2_applications-mds/   (recursively; where n8n writes letters)
+  src/content/
+
+A burst of writes (n8n's "write generated letters to repo" node writes many
+files at once) is collected until nothing changed for --debounce seconds.
+Then only the affected files are handled: their names are normalized like
+normalize_mds.py does for the whole tree, the letters are rendered to
+src/applications/ (documents the build manifest marks up to date are
+skipped) and the resulting .tex files are compiled by compile_batch.sh.
+
+Events come from inotify (through ctypes, no extra packages). Where inotify
+is unavailable (not Linux, or the watch limit is reached) the directories
+are polled every --interval seconds instead.
+
+Letters below candidates/<name>/ use the profile with id <name> when
+user_info.yml has one, otherwise the --user profile.
+
+Usage (from 3_latex/, or `make watch-md`):
+  python3 watch_mds.py [--user ID] [--template modern|engineering] [--font FONT]
+                       [--jobs N] [--debounce S] [--poll] [--interval S]
+                       [--initial] [--once] [--dry-run]
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import subprocess
+import sys
+import time
+from fnmatch import fnmatch
+from pathlib import Path
+
+import parse_md_to_tex
+import pipeline_trace
+import profile_store
+
+# normalize_mds.py lives at the repository root
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+import normalize_mds  # noqa: E402
+
+CANDIDATES_DIR = Path("..") / "candidates"
+CONTENT_DIR = Path("src") / "content"
+LETTERS_DIR = "2_applications-mds"
+
+TEMPLATES = {
+    "modern": "src/templates/cover_letter_modern.tex",
+    "engineering": "src/templates/cover_letter_engineering.tex",
+}
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+_EVENT = struct.Struct("iIII")
+
+
+def is_letter(name):
+    """Markdown files, including ones whose .md ending still needs normalizing."""
+    return ".md" in name.lower() and not name.startswith(".") and not name.endswith("~")
+
+
+class Tree:
+    """The set of watched directories below src/content and candidates/."""
+
+    def __init__(self, candidates, content):
+        self.candidates = Path(candidates).resolve()
+        self.content = Path(content).resolve()
+
+    def wants(self, path):
+        """Whether a directory should be watched."""
+        path = Path(path)
+        if path == self.content:
+            return True
+        try:
+            parts = path.relative_to(self.candidates).parts
+        except ValueError:
+            return False
+        if any(fnmatch(p, g) for p in parts for g in normalize_mds.DEFAULT_PRUNE):
+            return False
+        # candidates/ and candidates/<name>/ only to notice new letter folders
+        return len(parts) <= 1 or parts[1] == LETTERS_DIR
+
+    def holds_letters(self, directory):
+        """Whether markdown in a directory is a letter (not e.g. candidates/<name>/NOTES.md)."""
+        directory = Path(directory)
+        if directory == self.content or self.content in directory.parents:
+            return True
+        try:
+            parts = directory.relative_to(self.candidates).parts
+        except ValueError:
+            return False
+        return len(parts) >= 2 and parts[1] == LETTERS_DIR and self.wants(directory)
+
+    def walk(self, top=None):
+        """Yield the watched directories at or below top (default: all)."""
+        tops = [Path(top)] if top is not None else [self.content, self.candidates]
+        stack = [t for t in tops if t.is_dir() and self.wants(t)]
+        while stack:
+            d = stack.pop()
+            yield d
+            try:
+                with os.scandir(d) as it:
+                    subdirs = [Path(e.path) for e in it if e.is_dir(follow_symlinks=False)]
+            except OSError:
+                continue
+            stack.extend(s for s in subdirs if self.wants(s))
+
+    def letters(self, top=None):
+        """All letter files in the watched directories."""
+        found = []
+        for d in self.walk(top):
+            if not self.holds_letters(d):
+                continue
+            try:
+                with os.scandir(d) as it:
+                    found.extend(Path(e.path) for e in it if e.is_file() and is_letter(e.name))
+            except OSError:
+                continue
+        return found
+
+
+class InotifySource:
+    """Changed letter files from inotify; raises OSError where unavailable."""
+
+    def __init__(self, tree):
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify is Linux only")
+        self.tree = tree
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1: {os.strerror(err)}")
+        self._dirs = {}
+        for d in tree.walk():
+            self._add(d)
+
+    def _add(self, path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                # fs.inotify.max_user_watches reached; the caller falls back to polling
+                raise OSError(err, f"inotify watch limit reached at {path}")
+            return
+        self._dirs[wd] = Path(path)
+
+    def _add_tree(self, top):
+        """Watch a new directory and report the letters already inside it."""
+        for d in self.tree.walk(top):
+            self._add(d)
+        return self.tree.letters(top)
+
+    def wait(self, timeout):
+        """Return changed letter paths (None: events were lost, rescan)."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self._fd, 64 * 1024)
+        changed = set()
+        rescan = False
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+            raw = data[offset + _EVENT.size : offset + _EVENT.size + length]
+            offset += _EVENT.size + length
+            name = os.fsdecode(raw.rstrip(b"\0"))
+            if mask & IN_Q_OVERFLOW:
+                rescan = True
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            parent = self._dirs.get(wd)
+            if parent is None or not name:
+                continue
+            path = parent / name
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and self.tree.wants(path):
+                    changed.update(self._add_tree(path))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and is_letter(name) and self.tree.holds_letters(parent):
+                changed.add(path)
+        return None if rescan else changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollSource:
+    """Changed letter files from comparing directory snapshots."""
+
+    def __init__(self, tree, interval=2.0):
+        self.tree = tree
+        self.interval = interval
+        self._seen = self._snapshot()
+
+    def _snapshot(self):
+        snap = {}
+        for path in self.tree.letters():
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            snap[path] = (st.st_mtime_ns, st.st_size)
+        return snap
+
+    def wait(self, timeout):
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        snap = self._snapshot()
+        changed = {p for p, sig in snap.items() if self._seen.get(p) != sig}
+        self._seen = snap
+        return changed
+
+    def close(self):
+        pass
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class Pipeline:
+    """normalize -> render -> compile for a set of changed letter files."""
+
+    def __init__(self, tree, template, default_user=None, font=None, jobs=1, engine="xelatex", dry_run=False):
+        self.tree = tree
+        self.template = template
+        self.default_user = default_user
+        self.font = font
+        self.jobs = jobs
+        self.engine = engine
+        self.dry_run = dry_run
+        # Files we renamed ourselves; their rename event is not a new change
+        self._renamed = {}
+
+    def is_echo(self, path):
+        sig = self._renamed.pop(path, None)
+        return sig is not None and sig == _signature(path)
+
+    def normalize(self, path):
+        """Rename a single file the way normalize_mds.py would; returns the new path."""
+        new_name = normalize_mds.normalize_name(path.name)
+        if new_name == path.name:
+            return path
+        target = normalize_mds.unique_path(path.with_name(new_name))
+        print(f"Rename: {path} -> {target}")
+        if self.dry_run:
+            return target
+        try:
+            path.rename(target)
+        except OSError as e:
+            print(f"Error renaming {path} -> {target}: {e}")
+            return None
+        self._renamed[target] = _signature(target)
+        return target
+
+    def user_for(self, path):
+        """Profile for a letter: candidates/<name>/ if <name> is a profile id."""
+        try:
+            owner = path.relative_to(self.tree.candidates).parts[0]
+        except (ValueError, IndexError):
+            return self.default_user
+        return profile_store.get_profile(owner) or self.default_user
+
+    def run(self, paths):
+        """Handle one debounced batch; returns True if everything built."""
+        letters = []
+        for path in sorted(paths):
+            if not path.is_file():
+                continue
+            path = self.normalize(path)
+            if path is not None:
+                letters.append(path)
+        if not letters:
+            return True
+        # The watcher lives for days; every batch is a run of its own in `make stats`
+        pipeline_trace.new_run()
+        print(f"\n--- {time.strftime('%H:%M:%S')}: {len(letters)} changed letter(s)")
+        if self.dry_run:
+            for path in letters:
+                print(f"[dry-run] Would render and compile: {path}")
+            return True
+
+        # One batch per profile; the build manifest skips unchanged inputs.
+        # Letters sharing a file name would overwrite each other's .tex/.pdf.
+        kept, results = parse_md_to_tex.split_duplicates([(str(path), self.user_for(path)) for path in letters])
+        groups = {}
+        for md, user in kept:
+            key = user.get("id") if user else None
+            groups.setdefault(key, (user, []))[1].append(md)
+        with pipeline_trace.span("watch.render", files=len(letters)):
+            for user, files in groups.values():
+                results.extend(
+                    parse_md_to_tex.run_batch(files, self.template, user=user, jobs=self.jobs, font=self.font)
+                )
+        ok = parse_md_to_tex.print_batch_summary(results)
+        texs = [r["tex"] for r in results if r["ok"]]
+        if texs:
+            with pipeline_trace.span("watch.compile", files=len(texs)):
+                proc = subprocess.run(
+                    ["bash", "./compile_batch.sh", "-j", str(self.jobs), "-e", self.engine],
+                    input="".join(t + "\n" for t in texs),
+                    text=True,
+                    env=dict(os.environ, PYTHON=sys.executable),
+                )
+            ok = ok and proc.returncode == 0
+        return ok
+
+
+def watch(source, pipeline, debounce=1.0, max_wait=10.0):
+    """Collect changes until quiet for `debounce` s (at most `max_wait` s), then build."""
+    pending = set()
+    first = last = None
+    while True:
+        timeout = None
+        if pending:
+            now = time.monotonic()
+            timeout = max(0.0, min(last + debounce, first + max_wait) - now)
+        changed = source.wait(timeout)
+        now = time.monotonic()
+        if changed is None:
+            print("Warning: watch events were lost; rescanning all letters")
+            changed = set(pipeline.tree.letters())
+        changed = {p for p in changed if not pipeline.is_echo(p)}
+        if changed:
+            pending |= changed
+            first = first or now
+            last = now
+        if pending and (now - last >= debounce or now - first >= max_wait):
+            batch, pending = pending, set()
+            first = last = None
+            pipeline.run(batch)
+
+
+def main(argv=None):
+    pipeline_trace.startup("watch.startup")
+    parser = argparse.ArgumentParser(description="Render and compile letters as they arrive")
+    parser.add_argument("--user", "-u", help="User profile id for letters without a matching candidate profile")
+    parser.add_argument("--template", choices=sorted(TEMPLATES), help="Letter template (default: modern)")
+    parser.add_argument("--font", help="Preferred main font name")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Render and compile N documents at once (0 = one per CPU)")
+    parser.add_argument("--engine", default="xelatex", help="LaTeX engine for compile_batch.sh")
+    parser.add_argument("--candidates", default=str(CANDIDATES_DIR), help="Candidates folder (default: ../candidates)")
+    parser.add_argument("--debounce", type=float, default=1.0, help="Seconds without changes before a batch is built")
+    parser.add_argument("--max-wait", type=float, default=10.0, help="Build a batch after at most this many seconds")
+    parser.add_argument("--poll", action="store_true", help="Poll instead of using inotify")
+    parser.add_argument("--interval", type=float, default=2.0, help="Polling interval in seconds")
+    parser.add_argument("--initial", action="store_true", help="Build all existing letters before watching")
+    parser.add_argument("--once", action="store_true", help="Build all existing letters and exit")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would be done without writing files")
+    args = parser.parse_args(argv)
+    # Same environment defaults as parse_md_to_tex.py (Make passes them)
+    args.user = args.user or os.environ.get("USER_PROFILE")
+    args.template = args.template or os.environ.get("TEMPLATE") or "modern"
+    args.font = args.font or os.environ.get("FONT") or None
+    if args.template not in TEMPLATES:
+        print(f"Error: unsupported template '{args.template}'. Only 'modern' and 'engineering' are supported.")
+        return 1
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+
+    default_user = None
+    if args.user:
+        default_user = profile_store.get_profile(args.user)
+        if default_user is None:
+            print(f"Error: user profile '{args.user}' not found. Available: {profile_store.profile_ids()}")
+            return 1
+    elif os.environ.get("USER"):
+        # $USER is often just the login name; use it only if it is a profile id
+        default_user = profile_store.get_profile(os.environ["USER"])
+
+    tree = Tree(args.candidates, CONTENT_DIR)
+    pipeline = Pipeline(tree, TEMPLATES[args.template], default_user, args.font, jobs, args.engine, args.dry_run)
+    if args.initial or args.once:
+        ok = pipeline.run(tree.letters())
+        if args.once:
+            return 0 if ok else 2
+
+    source = None
+    if not args.poll:
+        try:
+            source = InotifySource(tree)
+        except OSError as e:
+            print(f"Warning: {e.strerror or e}; polling every {args.interval:g}s instead")
+    if source is None:
+        source = PollSource(tree, args.interval)
+    kind = "inotify" if isinstance(source, InotifySource) else "polling"
+    print(f"Watching {tree.content} and {tree.candidates}/*/{LETTERS_DIR} ({kind}, Ctrl+C to stop)")
+    try:
+        watch(source, pipeline, args.debounce, args.max_wait)
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+    finally:
+        source.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the letter/CV parsers and normalize_mds.py.
+
+Generates synthetic corpora in a temporary workspace:
+
+  letters  front matter + <!-- LABEL --> \\lettercontent{} blocks, like the
+           n8n output in candidates/*/2_applications-mds/
+  cvs      CV markdown with every section parse_cv_universal reads
+  inbox    candidates/<user>/0_inbox-jobs/YYYY-MM-DD/ trees; a share of the
+           file names ends in stray dots/spaces for normalize_mds to fix
+
+and times latex_escape, parse_markdown, create_tex_file, parse_and_generate,
+the parse-once CV fan-out (cv_fan_out, ops are rendered template variants)
+and normalize_mds.collect_and_normalize. Each case reports ops/sec (best of
+--repeat runs) and the peak traced memory of one extra run under
+tracemalloc.
+
+The CV parsers serve parsed documents from build/ir (ir_cache.py):
+parse_and_generate and cv_fan_out clear it before every run, so they time
+the full parse and stay comparable with baselines from before the cache;
+the *_warm cases fill it first and time the cached path.
+
+--save-baseline stores the results (default 3_latex/build/bench_baseline.json,
+which stays out of git: numbers are per machine). Later runs compare against
+it and exit 1 when a case is slower, or uses more memory, than --tolerance
+allows.
+
+Usage: python3 98_testfiles/bench_pipeline.py [--letters N] [--cvs N]
+           [--jobs N] [--escape N] [--repeat N] [--only CASE ...]
+           [--baseline PATH] [--save-baseline] [--tolerance 0.2]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+LATEX_DIR = REPO / "3_latex"
+sys.path.insert(0, str(LATEX_DIR))
+sys.path.insert(0, str(REPO))
+
+DEFAULT_BASELINE = LATEX_DIR / "build" / "bench_baseline.json"
+CASES = (
+    "latex_escape",
+    "parse_markdown",
+    "create_tex_file",
+    "parse_and_generate",
+    "parse_and_generate_warm",
+    "cv_fan_out",
+    "cv_fan_out_warm",
+    "normalize_mds",
+)
+
+WORDS = (
+    "scalable backend systems data pipelines Python Go Kubernetes Docker "
+    "PostgreSQL Redis latency throughput observability mentoring migration "
+    "microservices customers platform reliability cloud costs team delivery"
+).split()
+SPECIALS = ["R&D", "100%", "$5k", "C#", "snake_case", "{x}", "~", "^2", "50\\%", "AT&T"]
+COMPANIES = ["CloudScale", "DataForge", "Müller & Söhne", "Nordwind", "PixelWorks", "Acme_AI"]
+TITLES = ["Backend Engineer", "Data Engineer", "Platform Engineer", "Senior SRE", "ML Engineer"]
+LETTER_LABELS = (
+    "PARAGRAPH_1_INTRODUCTION",
+    "PARAGRAPH_2_TECHNICAL_EXCELLENCE",
+    "PARAGRAPH_3_EXPERIENCE_AND_VALUE",
+    "PARAGRAPH_4_STRATEGIC_FIT",
+    "PARAGRAPH_5_CLOSING_STATEMENT",
+)
+DIRTY_SUFFIXES = (".md ", ".md.", ". .md", "..md", " .md", ".MD", ".md\u200b")
+
+PROFILE_YAML = """\
+- id: bench
+  full_name: Bench Mark
+  first_name: Bench
+  last_name: Mark
+  email: bench.mark@example.com
+  phone: "+49 170 1234567"
+  job_title: Senior Software Engineer
+  location: Berlin, Germany
+  nationality: German
+  birth_year: 1990
+  linkedin: bench-mark
+  github: benchmark
+"""
+
+
+def sentence(rng, n=18):
+    words = [rng.choice(WORDS) for _ in range(n)]
+    if rng.random() < 0.5:
+        words.insert(rng.randrange(len(words)), rng.choice(SPECIALS))
+    return " ".join(words).capitalize() + "."
+
+
+def paragraph(rng):
+    return " ".join(sentence(rng) for _ in range(rng.randint(3, 6)))
+
+
+def make_letter(rng, i):
+    """One application letter markdown in the n8n output format."""
+    lang = rng.choice(("ENG", "DE"))
+    company = rng.choice(COMPANIES)
+    parts = [
+        "---",
+        f"fileName: 2025-01-{i % 28 + 1:02d}_{company.split()[0].lower()}_{i}_{lang}.md",
+        f"language: {lang}",
+        "---",
+        "",
+        "<!-- COMPANY_NAME -->",
+        "",
+        f"\\lettercontent{{{company}}}",
+        "",
+        "<!-- JOB_TITLE -->",
+        "",
+        f"\\lettercontent{{{rng.choice(TITLES)}}}",
+        "",
+    ]
+    for label in LETTER_LABELS:
+        parts += [f"<!-- {label} -->", "", "\\lettercontent{", paragraph(rng), "}", ""]
+    return "\n".join(parts)
+
+
+def make_cv(rng):
+    """One CV markdown with every section parse_cv_universal reads."""
+    out = ["# Curriculum Vitae", ""]
+    out += ["## About Me", "", paragraph(rng), ""]
+    out += ["## Interests", "", ", ".join(rng.sample(WORDS, 5)), ""]
+    out += ["## Specialization", ""] + [f"- {sentence(rng, 4)}" for _ in range(4)] + [""]
+    out += ["## Technical Skills", ""]
+    out += [f"**{rng.choice(WORDS).capitalize()}:** {rng.randint(1, 10) / 10}" for _ in range(8)]
+    out += ["**Tooling & Frameworks**", ""]
+    for section in ("Experience", "Education"):
+        out += [f"## {section}", ""]
+        blocks = []
+        for _ in range(rng.randint(2, 5)):
+            start = rng.randint(2005, 2022)
+            block = [
+                f"**{rng.choice(TITLES)}** | {rng.choice(COMPANIES)}",
+                f"*{start}--{start + rng.randint(1, 4)} | Berlin*",
+            ]
+            block += [f"- {sentence(rng, 12)}" for _ in range(rng.randint(2, 5))]
+            blocks.append("\n".join(block))
+        out += ["\n\n---\n\n".join(blocks), ""]
+    out += ["## Certifications", ""]
+    out += [f"**{rng.randint(2015, 2024)}** - {rng.choice(WORDS).capitalize()} Certified - {rng.choice(COMPANIES)}" for _ in range(3)]
+    out += [""]
+    out += ["## Languages", "", "**German:** Native (4/4)", "**English:** Fluent (3/4)", "**French:** Basic", ""]
+    out += ["## Publications", ""]
+    out += ["\n---\n".join(f"{sentence(rng, 6)}\nhttps://example.com/p/{rng.randint(1, 999)}" for _ in range(2)), ""]
+    return "\n".join(out)
+
+
+def make_inbox(root, rng, files, users=4, days=30):
+    """candidates/<user>/0_inbox-jobs/YYYY-MM-DD/ tree with some dirty names."""
+    for i in range(files):
+        day = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, days % 28 + 1):02d}"
+        folder = root / f"user{i % users}" / "0_inbox-jobs" / day
+        folder.mkdir(parents=True, exist_ok=True)
+        name = f"{day}_{rng.choice(COMPANIES).split()[0].lower()}_{i}"
+        suffix = rng.choice(DIRTY_SUFFIXES) if rng.random() < 0.2 else ".md"
+        (folder / f"{name}{suffix}").write_text(sentence(rng), encoding="utf-8")
+
+
+class Workspace:
+    """Temporary 3_latex-like directory holding the generated corpora."""
+
+    def __init__(self, args):
+        self.root = Path(tempfile.mkdtemp(prefix="bench_pipeline_"))
+        rng = random.Random(args.seed)
+        shutil.copytree(LATEX_DIR / "src" / "templates", self.root / "src" / "templates")
+        (self.root / "src" / "applications").mkdir(parents=True)
+        (self.root / "user_info.yml").write_text(PROFILE_YAML, encoding="utf-8")
+
+        self.letters = []
+        letter_dir = self.root / "letters"
+        letter_dir.mkdir()
+        for i in range(args.letters):
+            p = letter_dir / f"letter_{i:05d}.md"
+            p.write_text(make_letter(rng, i), encoding="utf-8")
+            self.letters.append(str(p))
+
+        self.cvs = []
+        cv_dir = self.root / "cvs"
+        cv_dir.mkdir()
+        for i in range(args.cvs):
+            p = cv_dir / f"cv-bench-{i:04d}-en.md"
+            p.write_text(make_cv(rng), encoding="utf-8")
+            self.cvs.append(str(p))
+
+        # Escaper input: paragraphs plus the short fields every letter repeats
+        self.strings = []
+        for _ in range(args.escape):
+            if rng.random() < 0.3:
+                self.strings.append(paragraph(rng))
+            else:
+                self.strings.append(rng.choice(COMPANIES + TITLES + SPECIALS))
+
+        self.inbox_files = args.jobs
+        self.inbox_seed = args.seed
+        self.inbox_count = 0
+
+    def fresh_inbox(self):
+        """A new inbox tree (normalize_mds renames files in place)."""
+        self.inbox_count += 1
+        root = self.root / f"inbox_{self.inbox_count}"
+        make_inbox(root, random.Random(self.inbox_seed), self.inbox_files)
+        return root
+
+    def cleanup(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def case_latex_escape(ws):
+    from texescape import latex_escape
+
+    def run(strings):
+        for s in strings:
+            latex_escape(s)
+
+    return lambda: (ws.strings, len(ws.strings)), run
+
+
+def case_parse_markdown(ws):
+    import parse_md_to_tex
+
+    def run(files):
+        for md in files:
+            parse_md_to_tex.parse_markdown(md)
+
+    return lambda: (ws.letters, len(ws.letters)), run
+
+
+def case_create_tex_file(ws):
+    import parse_md_to_tex
+    import profile_store
+
+    user = profile_store.get_profile("bench")
+    template = "src/templates/cover_letter_modern.tex"
+    jobs = []
+    for md in ws.letters:
+        lang, effective = parse_md_to_tex.build_user_context(md, user, date_override="1. January 2025")
+        out = f"src/applications/{Path(md).stem}.tex"
+        jobs.append((parse_md_to_tex.parse_markdown(md), out, effective, Path(md).stem, lang))
+
+    def run(jobs):
+        for sections, out, effective, basename, lang in jobs:
+            parse_md_to_tex.create_tex_file(
+                template, sections, out, user=effective, md_basename=basename, language=lang
+            )
+
+    return lambda: (jobs, len(jobs)), run
+
+
+def cv_setup(ws, ops_per_cv, warm):
+    """setup() for the CV cases: an empty build/ir (cold) or one filled beforehand (warm)."""
+    import ir_cache
+    import parse_cv_universal
+
+    def setup():
+        if warm:
+            for md in ws.cvs:
+                parse_cv_universal.load_cv_data(md)
+        else:
+            shutil.rmtree(ir_cache.IR_DIR, ignore_errors=True)
+        return ws.cvs, len(ws.cvs) * ops_per_cv
+
+    return setup
+
+
+def case_parse_and_generate(ws, warm=False):
+    import parse_cv_universal
+
+    # LuxSleek only, so the numbers stay comparable with older baselines
+    def run(files):
+        for md in files:
+            parse_cv_universal.parse_and_generate(md, "luxsleek", "bench")
+
+    return cv_setup(ws, 1, warm), run
+
+
+def case_cv_fan_out(ws, warm=False):
+    import parse_cv_universal
+
+    templates = list(parse_cv_universal.TEMPLATES)
+
+    def run(files):
+        for md in files:
+            parse_cv_universal.fan_out(md, templates, ["en"], "bench")
+
+    return cv_setup(ws, len(templates), warm), run
+
+
+def case_normalize_mds(ws):
+    import normalize_mds
+
+    def setup():
+        return ws.fresh_inbox(), ws.inbox_files
+
+    def run(root):
+        normalize_mds.collect_and_normalize([str(root)])
+
+    return setup, run
+
+
+CASE_FUNCS = {
+    "latex_escape": case_latex_escape,
+    "parse_markdown": case_parse_markdown,
+    "create_tex_file": case_create_tex_file,
+    "parse_and_generate": case_parse_and_generate,
+    "parse_and_generate_warm": lambda ws: case_parse_and_generate(ws, warm=True),
+    "cv_fan_out": case_cv_fan_out,
+    "cv_fan_out_warm": lambda ws: case_cv_fan_out(ws, warm=True),
+    "normalize_mds": case_normalize_mds,
+}
+
+
+def measure(setup, run, repeat):
+    """Return (ops/sec of the best run, peak traced KiB of one more run)."""
+    best = None
+    ops = 0
+    for _ in range(repeat):
+        state, ops = setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            run(state)
+            elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    state, _ = setup()
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            run(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return ops / best if best else float("inf"), peak / 1024.0
+
+
+def compare(results, baseline, tolerance, same_sizes):
+    """Print the comparison table; return the names of regressed cases."""
+    regressions = []
+    base_cases = baseline.get("cases", {})
+    for name, r in results.items():
+        b = base_cases.get(name)
+        if not b or "ops_per_sec" not in r:
+            continue
+        speed = r["ops_per_sec"] / b["ops_per_sec"] if b.get("ops_per_sec") else 1.0
+        mem = r["peak_kib"] / b["peak_kib"] if b.get("peak_kib") else 1.0
+        flags = []
+        if speed < 1.0 - tolerance:
+            flags.append("SLOWER")
+        # Peak memory grows with corpus size, so only compare equal sizes
+        if same_sizes and mem > 1.0 + tolerance:
+            flags.append("MORE MEMORY")
+        if flags:
+            regressions.append(name)
+        mem_note = f"{mem:5.2f}x mem" if same_sizes else "  (sizes differ)"
+        print(f"  {name:24} {speed:5.2f}x ops/sec  {mem_note}  {' '.join(flags) or 'ok'}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--letters", type=int, default=200, help="synthetic letters")
+    parser.add_argument("--cvs", type=int, default=40, help="synthetic CVs")
+    parser.add_argument("--jobs", type=int, default=2000, help="files in the synthetic inbox tree")
+    parser.add_argument("--escape", type=int, default=20000, help="strings for latex_escape")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (best is kept)")
+    parser.add_argument("--seed", type=int, default=12, help="corpus random seed")
+    parser.add_argument("--only", nargs="+", choices=CASES, help="run only these cases")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    sizes = {"letters": args.letters, "cvs": args.cvs, "jobs": args.jobs, "escape": args.escape}
+    ws = Workspace(args)
+    cwd = os.getcwd()
+    # The parsers resolve templates, profiles and output paths from the cwd;
+    # keep their build/ side files (stamps, metrics) inside the workspace too
+    os.chdir(ws.root)
+    results = {}
+    try:
+        print(f"Workspace: {ws.root}")
+        print(f"{'case':24} {'ops/sec':>12} {'peak KiB':>10}")
+        for name in args.only or CASES:
+            try:
+                setup, run = CASE_FUNCS[name](ws)
+                ops_per_sec, peak_kib = measure(setup, run, args.repeat)
+            except (ImportError, SyntaxError) as e:
+                results[name] = {"skipped": f"{type(e).__name__}: {e}"}
+                print(f"{name:24} skipped ({type(e).__name__}: {e})")
+                continue
+            results[name] = {"ops_per_sec": ops_per_sec, "peak_kib": peak_kib}
+            print(f"{name:24} {ops_per_sec:12.1f} {peak_kib:10.1f}")
+    finally:
+        os.chdir(cwd)
+        ws.cleanup()
+
+    status = 0
+    if args.baseline.exists() and not args.save_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.baseline} (tolerance {args.tolerance:.0%}):")
+        if compare(results, baseline, args.tolerance, baseline.get("sizes") == sizes):
+            status = 1
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "python": platform.python_version(),
+            "sizes": sizes,
+            "cases": {k: v for k, v in results.items() if "ops_per_sec" in v},
+        }
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Check which markdown files 3_latex/watch_mds.py treats as letters.
+
+Builds a throwaway candidates/ and src/content tree and verifies that
+Tree.letters() and, on Linux, the inotify handler accept files below
+<name>/2_applications-mds/ and src/content, but ignore stray markdown
+such as candidates/<name>/NOTES.md or candidates/README.md.
+
+Usage: python3 98_testfiles/check_watch_mds.py
+Exits non-zero on the first mismatch.
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "3_latex"))
+
+import watch_mds  # noqa: E402
+
+
+def check(label, got, expected):
+    if got != expected:
+        print(f"FAIL {label}: got {sorted(map(str, got))}, expected {sorted(map(str, expected))}")
+        sys.exit(1)
+    print(f"ok   {label}")
+
+
+def collect(source, seconds=1.0):
+    changed = set()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        changed |= source.wait(0.1) or set()
+    return changed
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp).resolve()
+        candidates = root / "candidates"
+        content = root / "src" / "content"
+        letters_dir = candidates / "example_user" / watch_mds.LETTERS_DIR / "2025-03-01"
+        for d in (content, letters_dir):
+            d.mkdir(parents=True)
+        expected = {letters_dir / "acme.md", content / "draft.md"}
+        for path in expected | {candidates / "README.md", candidates / "example_user" / "NOTES.md"}:
+            path.write_text("# x\n", encoding="utf-8")
+
+        tree = watch_mds.Tree(candidates, content)
+        check("letters() skips candidates/*.md and candidates/<name>/*.md", set(tree.letters()), expected)
+
+        try:
+            source = watch_mds.InotifySource(tree)
+        except OSError as e:
+            print(f"skip inotify: {e.strerror or e}")
+            return 0
+        try:
+            (candidates / "example_user" / "NOTES.md").write_text("# y\n", encoding="utf-8")
+            (candidates / "README.md").write_text("# y\n", encoding="utf-8")
+            (letters_dir / "acme.md").write_text("# y\n", encoding="utf-8")
+            check("inotify ignores stray markdown", collect(source), {letters_dir / "acme.md"})
+
+            new_user = candidates / "new_user"
+            new_user.mkdir()
+            time.sleep(0.2)
+            (new_user / "NOTES.md").write_text("# z\n", encoding="utf-8")
+            (new_user / watch_mds.LETTERS_DIR).mkdir()
+            time.sleep(0.2)
+            letter = new_user / watch_mds.LETTERS_DIR / "initech.md"
+            letter.write_text("# z\n", encoding="utf-8")
+            check("inotify follows new candidate folders", collect(source), {letter})
+        finally:
+            source.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
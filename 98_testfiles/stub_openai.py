@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Stub OpenAI upstream for trying llm_cache_proxy.py without an API key.
+
+Answers POST /v1/chat/completions and /v1/responses after --delay seconds
+with a deterministic letter in the workflow's output format and a usage
+block; the letter's fileName is the one under "## Job Title" in the prompt,
+if any. GET /_stub/calls returns how many model requests it received. Send
+"fail" anywhere in the last message to get an HTTP 500 instead.
+
+For letter_runner.py: --rate-limit N answers 429 with Retry-After beyond N
+requests per second, --fail-rate P answers a random share P with 500/503.
+
+Usage:
+  python3 98_testfiles/stub_openai.py [--port 8788] [--delay 2] [--rate-limit N] [--fail-rate P]
+  python3 llm_cache_proxy.py --upstream http://127.0.0.1:8788/v1 --cache-dir /tmp/llm-cache
+  curl -s localhost:8787/v1/chat/completions -H 'Content-Type: application/json' \\
+       -d '{"model": "gpt-5-mini", "messages": [{"role": "user", "content": "job"}]}'
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LETTER = """---
+fileName: {name}
+language: English
+---
+
+<!-- PARAGRAPH_1_INTRODUCTION -->
+\\lettercontent{{Stub letter {digest}.}}
+"""
+_JOB_TITLE_RE = re.compile(r"## Job Title\s*\n\s*\n([^\n]+)")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    calls = 0
+    lock = threading.Lock()
+    delay = 0.0
+    rate_limit = 0
+    fail_rate = 0.0
+    recent = []
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status, payload, extra=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (extra or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/_stub/calls":
+            self._send(200, {"calls": StubHandler.calls})
+        else:
+            self._send(200, {"object": "list", "data": [{"id": "gpt-5-mini", "object": "model"}]})
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        with StubHandler.lock:
+            StubHandler.calls += 1
+            now = time.monotonic()
+            StubHandler.recent = [t for t in StubHandler.recent if now - t < 1.0]
+            limited = StubHandler.rate_limit and len(StubHandler.recent) >= StubHandler.rate_limit
+            if not limited:
+                StubHandler.recent.append(now)
+        if limited:
+            self._send(429, {"error": {"message": "Rate limit reached", "type": "requests"}}, {"Retry-After": "1"})
+            return
+        if random.random() < StubHandler.fail_rate:
+            self._send(random.choice((500, 503)), {"error": {"message": "stub overload", "type": "server_error"}})
+            return
+        time.sleep(StubHandler.delay)
+        messages = request.get("messages") or [{"content": request.get("input", "")}]
+        prompt = json.dumps(messages, sort_keys=True)
+        if "fail" in str(messages[-1].get("content", "")):
+            self._send(500, {"error": {"message": "stub failure", "type": "server_error"}})
+            return
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+        m = _JOB_TITLE_RE.search(str(messages[-1].get("content", "")))
+        name = f"{m.group(1).strip().rsplit('.', 1)[0]}_ENG.md" if m else f"job_{digest}_ENG.md"
+        text = LETTER.format(name=name, digest=digest)
+        usage_in, usage_out = len(prompt) // 4, len(text) // 4
+        if self.path.endswith("/responses"):
+            self._send(
+                200,
+                {
+                    "object": "response",
+                    "model": request.get("model"),
+                    "output": [{"type": "message", "content": [{"type": "output_text", "text": text}]}],
+                    "usage": {"input_tokens": usage_in, "output_tokens": usage_out},
+                },
+            )
+            return
+        self._send(
+            200,
+            {
+                "object": "chat.completion",
+                "model": request.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": usage_in, "completion_tokens": usage_out},
+            },
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stub OpenAI upstream")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8788)
+    parser.add_argument("--delay", type=float, default=2.0, help="Seconds before each answer")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Answer 429 beyond N requests per second")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of requests answered with 500/503")
+    args = parser.parse_args(argv)
+    StubHandler.delay = args.delay
+    StubHandler.rate_limit = args.rate_limit
+    StubHandler.fail_rate = args.fail_rate
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    server.daemon_threads = True
+    print(f"Stub OpenAI API on http://{args.host}:{args.port}/v1 (delay {args.delay:g}s)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
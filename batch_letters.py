@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""Generate application letters through the OpenAI Batch API.
+
+The n8n workflow sends one HTTP request per job. For overnight bulk runs the
+Batch API is half the price and has no per-item round trips; this builds its
+input file and turns its output back into letters.
+
+  build   one request per unprocessed inbox job of a candidate (from
+          job_index.py, optionally only the job_rank.py shortlist and
+          without the near-duplicates job_dedup.py finds). The
+          prompt is the ATS prompt from 0_queries&prompts/prompts/ with its
+          n8n placeholders ({{$json.fileName}}, {{$json.jobText}},
+          {{$json.extracted}}) filled from the posting and the competence
+          profile, exactly as the workflow does. --profile-budget sends
+          only the profile parts relevant to each posting instead.
+  ingest  reads the Batch API result file and writes each answer like the
+          workflow's "write generated letters to repo" node:
+          candidates/<candidate>/2_applications-mds/<date>/<fileName> with
+          fileName/language front matter. Letters are also copied to
+          3_latex/src/content/ so `make md2pdf` renders them (`make
+          watch-md` picks them up without that).
+
+The input file defaults to .cache/batch/requests.jsonl (the requests.jsonl
+at the repository root is not used), next to a manifest that maps each
+custom_id back to its posting.
+
+Usage:
+  batch_letters.py build CANDIDATE [--since YYYY-MM-DD] [--shortlist [--threshold T]]
+                   [--skip-duplicates] [--model M] [--profile-budget TOKENS] [--prompt FILE] [--out FILE]
+  batch_letters.py ingest RESULTS.jsonl [--date YYYY-MM-DD] [--no-queue]
+
+Then, with the OpenAI API (see the Batch API guide):
+  upload .cache/batch/requests.jsonl with purpose "batch", create a batch for
+  /v1/chat/completions, download its output file and run `ingest` on it.
+"""
+
+import argparse
+import json
+import re
+import shutil
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+import job_index
+from normalize_mds import normalize_name, unique_path
+
+REPO_ROOT = Path(__file__).resolve().parent
+PROMPT_FILE = REPO_ROOT / "0_queries&prompts" / "prompts" / "3_last_update_ATS_optimized_prompt.md"
+PROFILE_FILE = Path("1_profile") / "competence-profile.md"
+BATCH_DIR = REPO_ROOT / ".cache" / "batch"
+CONTENT_DIR = REPO_ROOT / "3_latex" / "src" / "content"
+DEFAULT_MODEL = "gpt-5-mini"
+ENDPOINT = "/v1/chat/completions"
+
+_FENCE_RE = re.compile(r"^```[a-z]*\s*\r?\n", re.IGNORECASE)
+_FRONT_RE = re.compile(r"^---\s*\r?\n([\s\S]*?)\r?\n---\s*\r?\n([\s\S]*)$")
+_OLD_FORMAT_RE = re.compile(r"^fileName:\s*([^\r\n]+)\r?\n{1,2}([\s\S]*)$", re.IGNORECASE)
+_FIELD_RES = {
+    "fileName": re.compile(r"fileName:\s*([^\r\n]+)", re.IGNORECASE),
+    "language": re.compile(r"language:\s*([^\r\n]+)", re.IGNORECASE),
+}
+_ZERO_WIDTH_RE = re.compile("[\u200b-\u200d\ufeff]")
+_BIDI_RE = re.compile("[\u202a-\u202e\u2066-\u2069]")
+
+
+def render_prompt(template, file_name, job_text, profile_text):
+    """Fill the workflow placeholders of the prompt template."""
+    if template.startswith("="):
+        # n8n expression prefix
+        template = template[1:]
+    return (
+        template.replace("{{$json.fileName}}", file_name)
+        .replace("{{$json.jobText}}", job_text)
+        .replace("{{$json.extracted}}", profile_text)
+    )
+
+
+def custom_id(candidate, job_path, candidates_dir):
+    """Batch custom_id: candidate and the posting path below its inbox."""
+    rel = Path(job_path).relative_to(Path(candidates_dir) / candidate / job_index.INBOX_DIR)
+    return f"{candidate}|{rel.as_posix()}"
+
+
+def profile_selector(profile_text, budget=None):
+    """Function posting text -> profile text to send: the whole profile, or
+    with a budget only the relevant part (profile_retrieval.py)."""
+    if budget is None:
+        return lambda job_text: profile_text
+    import profile_retrieval
+
+    index = profile_retrieval.ProfileIndex(profile_text)
+    if index.core_tokens > budget:
+        print(
+            f"Warning: the profile's core sections alone are ~{index.core_tokens:,} tokens, over"
+            f" --profile-budget {budget:,}; they are always sent"
+        )
+    return lambda job_text: index.select(job_text, budget)["text"]
+
+
+def build_requests(candidate, jobs, prompt_template, profile_text, model, candidates_dir, profile_budget=None):
+    """(requests, manifest) for the given job rows."""
+    requests, manifest = [], {}
+    profile_for = profile_selector(profile_text, profile_budget)
+    for job in jobs:
+        path = Path(job["path"])
+        text = path.read_text(encoding="utf-8", errors="replace")
+        cid = custom_id(candidate, path, candidates_dir)
+        prompt = render_prompt(prompt_template, path.name, text, profile_for(text))
+        requests.append(
+            {
+                "custom_id": cid,
+                "method": "POST",
+                "url": ENDPOINT,
+                "body": {"model": model, "messages": [{"role": "user", "content": prompt}]},
+            }
+        )
+        manifest[cid] = {"candidate": candidate, "job": str(path), "job_file": path.name}
+    return requests, manifest
+
+
+def sanitize_file_name(name):
+    """Port of sanitizeFileName() from the workflow's response parser."""
+    name = unicodedata.normalize("NFKC", str(name or ""))
+    name = _BIDI_RE.sub("", _ZERO_WIDTH_RE.sub("", name))
+    name = re.sub(r"[\r\n\t]", "", name).strip()
+    name = re.sub(r"\s+", " ", re.sub(r'[/\\?%*:|"<>]', "-", name))
+    name = re.sub(r"[ .]+$", "", name)
+    return re.sub(r"\.[^.]*$", "", name) + ".md"
+
+
+def parse_answer(raw):
+    """(fileName, language, content) from a model answer, like the workflow parser.
+
+    fileName is None when the answer carries none.
+    """
+    cleaned = _FENCE_RE.sub("", raw.strip(), count=1)
+    cleaned = re.sub(r"```$", "", cleaned).strip()
+    m = _FRONT_RE.match(cleaned)
+    if m:
+        front, content = m.group(1), m.group(2).strip()
+        fields = {k: r.search(front) for k, r in _FIELD_RES.items()}
+        file_name = sanitize_file_name(fields["fileName"].group(1)) if fields["fileName"] else None
+        language = fields["language"].group(1).strip() if fields["language"] else None
+        return file_name, language, content
+    m = _OLD_FORMAT_RE.match(cleaned)
+    if m:
+        return sanitize_file_name(m.group(1)), None, m.group(2).strip()
+    return None, None, cleaned
+
+
+def language_tag(language, file_name):
+    """DE/ENG tag as in the letter front matter."""
+    lang = (language or "").strip().lower()
+    if lang.startswith(("german", "deutsch", "de")):
+        return "DE"
+    if lang.startswith(("english", "en")):
+        return "ENG"
+    stem = Path(file_name).stem.upper()
+    if stem.endswith(("_DE", "-DE")):
+        return "DE"
+    return "ENG"
+
+
+def answer_text(result):
+    """Message text of one Batch API output line, or (None, error)."""
+    if result.get("error"):
+        return None, json.dumps(result["error"])
+    response = result.get("response") or {}
+    if response.get("status_code") != 200:
+        return None, f"HTTP {response.get('status_code')}: {json.dumps(response.get('body'))[:200]}"
+    body = response.get("body") or {}
+    try:
+        return body["choices"][0]["message"]["content"], None
+    except (KeyError, IndexError, TypeError):
+        return None, "no message content in response"
+
+
+def write_letter(candidates_dir, candidate, day, answer, job_file, queue=True):
+    """Write one model answer as a letter; returns its path.
+
+    Raises ValueError for an empty answer. Without a fileName in the answer
+    the letter is named after the posting (job_file) plus the language tag.
+    Existing letters are never overwritten: a taken name gets a "-<n>"
+    suffix like normalize_mds.py gives colliding files.
+    """
+    file_name, language, content = parse_answer(answer)
+    if not content:
+        raise ValueError("empty answer")
+    if file_name is None:
+        file_name = f"{Path(job_file).stem}_{language_tag(language, '')}.md"
+    file_name = normalize_name(file_name)
+    tag = language_tag(language, file_name)
+    out_dir = Path(candidates_dir) / candidate / job_index.LETTERS_DIR / day
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out = unique_path(out_dir / file_name)
+    with open(out, "x", encoding="utf-8") as letter:
+        letter.write(f"---\nfileName: {out.name}\nlanguage: {tag}\n---\n\n{content}\n")
+    if queue:
+        CONTENT_DIR.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(out, unique_path(CONTENT_DIR / out.name))
+    return out
+
+
+def select_jobs(
+    conn,
+    candidate,
+    profile_text,
+    since=None,
+    shortlist=False,
+    threshold=None,
+    candidates_dir=None,
+    skip_duplicates=False,
+):
+    """Unprocessed postings of a candidate.
+
+    Optionally without the near-duplicates job_dedup.py finds and only the
+    job_rank.py shortlist.
+    """
+    job_index.scan(conn, candidates_dir or job_index.CANDIDATES_DIR)
+    jobs = job_index.unprocessed_jobs(conn, candidate, since)
+    if skip_duplicates and jobs:
+        import job_dedup
+
+        selected = {job["path"] for job in jobs}
+        clusters = {}
+        for d in job_dedup.find_duplicates(conn, candidate, since):
+            if not d["processed"] and d["path"] in selected:
+                clusters.setdefault(d["duplicate_of"], []).append(d)
+        duplicates = set()
+        for canonical, members in clusters.items():
+            if canonical not in selected and not any(d["letters"] for d in members):
+                # The canonical posting is unprocessed and outside --since:
+                # its oldest selected copy gets the letter instead
+                members = sorted(members, key=lambda d: (d["day"] or "9999", d["path"]))[1:]
+            duplicates.update(d["path"] for d in members)
+        if duplicates:
+            print(f"Skipping {len(duplicates)} near-duplicate posting(s) (job_dedup.py lists them)")
+            jobs = [job for job in jobs if job["path"] not in duplicates]
+    if not shortlist:
+        return jobs
+    import job_rank
+
+    threshold = job_rank.DEFAULT_THRESHOLD if threshold is None else threshold
+    texts = [(job["path"], Path(job["path"]).read_text(encoding="utf-8", errors="replace")) for job in jobs]
+    keep = {r["key"] for r in job_rank.rank(profile_text, texts) if r["score"] >= threshold}
+    print(f"Shortlist: {len(keep)} of {len(jobs)} posting(s) at or above {threshold:g}")
+    return [job for job in jobs if job["path"] in keep]
+
+
+def ingest(results_path, candidates_dir, day, queue=True, manifest=None):
+    """Write the letters of a Batch API result file; returns (written, failed)."""
+    written, failed = [], []
+    with open(results_path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                result = json.loads(line)
+            except ValueError:
+                failed.append((f"line {lineno}", "not JSON"))
+                continue
+            cid = str(result.get("custom_id") or "")
+            candidate, _, job_rel = cid.partition("|")
+            if not candidate or not job_rel or "/" in candidate or candidate.startswith("."):
+                failed.append((cid or f"line {lineno}", "custom_id is not <candidate>|<posting>"))
+                continue
+            text, error = answer_text(result)
+            if text is None:
+                failed.append((cid, error))
+                continue
+            job_file = (manifest or {}).get(cid, {}).get("job_file") or Path(job_rel).name
+            try:
+                out = write_letter(candidates_dir, candidate, day, text, job_file, queue=queue)
+            except ValueError as e:
+                failed.append((cid, str(e)))
+                continue
+            written.append(out)
+    return written, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OpenAI Batch API input/output for application letters")
+    parser.add_argument("--candidates", default=str(job_index.CANDIDATES_DIR), help="Candidates folder")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_build = sub.add_parser("build", help="Write the Batch API input file")
+    p_build.add_argument("candidate", help="Candidate folder name below candidates/")
+    p_build.add_argument("--since", type=job_index._iso_date, help="Only postings from this date on")
+    p_build.add_argument("--shortlist", action="store_true", help="Only postings job_rank.py keeps")
+    p_build.add_argument("--threshold", type=float, help="job_rank.py score threshold for --shortlist")
+    p_build.add_argument(
+        "--skip-duplicates", action="store_true", help="Leave out near-duplicate postings (job_dedup.py)"
+    )
+    p_build.add_argument("--model", default=DEFAULT_MODEL)
+    p_build.add_argument(
+        "--profile-budget", type=int, metavar="TOKENS", help="Send only the relevant profile parts (profile_retrieval.py)"
+    )
+    p_build.add_argument("--prompt", default=str(PROMPT_FILE), help="Prompt template")
+    p_build.add_argument("--out", default=str(BATCH_DIR / "requests.jsonl"), help="Output JSONL")
+    p_build.add_argument("--db", default=str(job_index.DEFAULT_DB), help="Job index database")
+    p_ingest = sub.add_parser("ingest", help="Write letters from a Batch API output file")
+    p_ingest.add_argument("results", help="Batch API output JSONL")
+    p_ingest.add_argument("--date", type=job_index._iso_date, help="Letter folder date (default: today)")
+    p_ingest.add_argument("--manifest", help="Manifest written by build (default: next to the input file)")
+    p_ingest.add_argument("--no-queue", action="store_true", help="Do not copy letters to 3_latex/src/content/")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "ingest":
+        manifest_path = Path(args.manifest or BATCH_DIR / "requests.manifest.json")
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8")) if manifest_path.is_file() else None
+        day = args.date or time.strftime("%Y-%m-%d")
+        written, failed = ingest(args.results, args.candidates, day, queue=not args.no_queue, manifest=manifest)
+        for path in written:
+            print(f"Wrote {path}")
+        for cid, error in failed:
+            print(f"Failed {cid}: {error}")
+        print(f"{len(written)} letter(s) written, {len(failed)} failed")
+        return 2 if failed else 0
+
+    candidate_dir = Path(args.candidates) / args.candidate
+    profile_path = candidate_dir / PROFILE_FILE
+    if not profile_path.is_file():
+        print(f"Error: competence profile not found: {profile_path}")
+        return 1
+    try:
+        prompt_template = Path(args.prompt).read_text(encoding="utf-8")
+    except OSError as e:
+        print(f"Error: cannot read prompt {args.prompt}: {e}")
+        return 1
+    profile_text = profile_path.read_text(encoding="utf-8", errors="replace")
+
+    conn = job_index.open_index(args.db)
+    jobs = select_jobs(
+        conn,
+        args.candidate,
+        profile_text,
+        args.since,
+        args.shortlist,
+        args.threshold,
+        args.candidates,
+        args.skip_duplicates,
+    )
+    if not jobs:
+        print(f"No unprocessed postings for {args.candidate}")
+        return 0
+
+    requests, manifest = build_requests(
+        args.candidate, jobs, prompt_template, profile_text, args.model, args.candidates, args.profile_budget
+    )
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        for request in requests:
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+    manifest_path = out.with_suffix(".manifest.json")
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    size = out.stat().st_size
+    print(f"Wrote {len(requests)} request(s) to {out} ({size / 1024:.0f} KB, ~{size // 4:,} input tokens)")
+    print(f"Manifest: {manifest_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
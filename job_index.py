@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""Index inbox job postings and generated letters in SQLite.
+
+Scans candidates/*/0_inbox-jobs/** (job postings) and
+candidates/*/2_applications-mds/** (generated letters) and keeps one row per
+file in .cache/jobs.sqlite3. Rescans are incremental: a file whose mtime and
+size are unchanged is not read, and a file whose content hash is unchanged is
+not parsed again. Files that disappeared are dropped.
+
+For every posting the metadata block of the job template is stored:
+
+  ## Company: <company>
+  **Location:** <city, country> (<Remote/Hybrid/On-site>)
+  **Employment Type:** ...
+  **Salary Range:** ...   -> salary_min / salary_max / salary_currency
+  **Posted:** ...         -> posted (ISO date when it can be parsed)
+  **Source:** ...
+
+A job counts as processed once a letter with the same name exists in the
+candidate's 2_applications-mds/ (n8n names letters after the posting file
+plus a _DE/_ENG language suffix). "Since" filters use the posted date, or
+the YYYY-MM-DD inbox folder when the posting has none.
+
+Usage:
+  job_index.py scan [--candidates DIR] [--db FILE]
+  job_index.py list [--user NAME] [--since YYYY-MM-DD] [--unprocessed] [--json]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import date, datetime
+from fnmatch import fnmatch
+from pathlib import Path
+
+from normalize_mds import DEFAULT_PRUNE
+
+REPO_ROOT = Path(__file__).resolve().parent
+CANDIDATES_DIR = REPO_ROOT / "candidates"
+DEFAULT_DB = REPO_ROOT / ".cache" / "jobs.sqlite3"
+INBOX_DIR = "0_inbox-jobs"
+LETTERS_DIR = "2_applications-mds"
+
+# Bump when the schema or the parsers change; the index is then rebuilt
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    candidate TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha1 TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    path TEXT PRIMARY KEY REFERENCES files(path) ON DELETE CASCADE,
+    candidate TEXT NOT NULL,
+    job_key TEXT NOT NULL,
+    folder_date TEXT,
+    title TEXT,
+    company TEXT,
+    location TEXT,
+    work_mode TEXT,
+    employment_type TEXT,
+    salary_text TEXT,
+    salary_min REAL,
+    salary_max REAL,
+    salary_currency TEXT,
+    posted_text TEXT,
+    posted TEXT,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_candidate ON jobs(candidate, job_key);
+CREATE INDEX IF NOT EXISTS jobs_date ON jobs(candidate, posted, folder_date);
+CREATE TABLE IF NOT EXISTS letters (
+    path TEXT PRIMARY KEY REFERENCES files(path) ON DELETE CASCADE,
+    candidate TEXT NOT NULL,
+    job_key TEXT NOT NULL,
+    language TEXT,
+    folder_date TEXT
+);
+CREATE INDEX IF NOT EXISTS letters_candidate ON letters(candidate, job_key);
+"""
+
+_DATE_DIR_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_TITLE_RE = re.compile(r"^#\s+(.+?)\s*$", re.MULTILINE)
+_COMPANY_RE = re.compile(r"^##\s*Company:\s*(.+?)\s*$", re.MULTILINE | re.IGNORECASE)
+_FIELD_RE = re.compile(r"^\*\*([^*:\n]+):\*\*\s*(.*?)\s*$", re.MULTILINE)
+_WORK_MODE_RE = re.compile(r"\b(remote|hybrid|on[- ]?site)\b", re.IGNORECASE)
+_LANG_SUFFIX_RE = re.compile(r"_(de|en|eng)$", re.IGNORECASE)
+_KEY_RE = re.compile(r"[^a-z0-9]+")
+
+_AMOUNT_RE = re.compile(r"(\d{1,3}(?:[.,' ]\d{3})+|\d+(?:[.,]\d+)?)\s*([kK]\b)?")
+_CURRENCIES = (("€", "EUR"), ("eur", "EUR"), ("chf", "CHF"), ("£", "GBP"), ("gbp", "GBP"), ("$", "USD"), ("usd", "USD"))
+
+_MONTHS = {
+    "jan": 1, "januar": 1, "january": 1, "feb": 2, "februar": 2, "february": 2,
+    "mar": 3, "march": 3, "märz": 3, "maerz": 3, "apr": 4, "april": 4,
+    "may": 5, "mai": 5, "jun": 6, "june": 6, "juni": 6, "jul": 7, "july": 7,
+    "juli": 7, "aug": 8, "august": 8, "sep": 9, "sept": 9, "september": 9,
+    "oct": 10, "okt": 10, "october": 10, "oktober": 10, "nov": 11,
+    "november": 11, "dec": 12, "dez": 12, "december": 12, "dezember": 12,
+}
+_ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+_DOT_DATE_RE = re.compile(r"\b(\d{1,2})\.(\d{1,2})\.(\d{4})\b")
+_DAY_MONTH_RE = re.compile(r"\b(\d{1,2})\.?\s+([A-Za-zä]+)\.?,?\s+(\d{4})\b")
+_MONTH_DAY_RE = re.compile(r"\b([A-Za-zä]+)\.?\s+(\d{1,2}),?\s+(\d{4})\b")
+
+
+def job_key(stem):
+    """Key shared by a posting and its letters: lowercased, language suffix removed."""
+    stem = _LANG_SUFFIX_RE.sub("", stem.lower())
+    # n8n may keep the posting's ".md" inside the letter name ("job.md_DE.md")
+    while stem.endswith(".md"):
+        stem = _LANG_SUFFIX_RE.sub("", stem[:-3])
+    return _KEY_RE.sub("_", stem).strip("_")
+
+
+def letter_language(stem):
+    m = _LANG_SUFFIX_RE.search(stem)
+    if m is None:
+        return None
+    return "de" if m.group(1).lower() == "de" else "en"
+
+
+def _placeholder(value):
+    """Template values like "[Company Name]" count as empty."""
+    value = (value or "").strip()
+    if not re.sub(r"\[[^\]]*\]|[\s(),/-]", "", value):
+        return None
+    return value
+
+
+def parse_salary(text):
+    """(min, max, currency) from a salary range such as "€70,000 - €90,000"."""
+    if not text:
+        return None, None, None
+    amounts = []
+    for number, k in _AMOUNT_RE.findall(text):
+        if re.fullmatch(r"\d{1,3}(?:[.,' ]\d{3})+", number):
+            value = float(re.sub(r"[.,' ]", "", number))
+        else:
+            value = float(number.replace(",", "."))
+        if k:
+            value *= 1000
+        amounts.append(value)
+    # Small numbers are days, percentages or years of experience, not salaries
+    amounts = [a for a in amounts if a >= 1000]
+    lower = text.lower()
+    currency = next((code for sym, code in _CURRENCIES if sym in lower), None)
+    if not amounts:
+        return None, None, currency
+    return min(amounts[:2]), max(amounts[:2]), currency
+
+
+def _make_date(year, month, day):
+    try:
+        return date(int(year), int(month), int(day)).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_date(text):
+    """ISO date from "2025-01-15", "15.01.2025", "15 January 2025" or "January 15, 2025"."""
+    if not text:
+        return None
+    m = _ISO_DATE_RE.search(text)
+    if m:
+        return _make_date(*m.groups())
+    m = _DOT_DATE_RE.search(text)
+    if m:
+        return _make_date(m.group(3), m.group(2), m.group(1))
+    m = _DAY_MONTH_RE.search(text)
+    if m and m.group(2).lower() in _MONTHS:
+        return _make_date(m.group(3), _MONTHS[m.group(2).lower()], m.group(1))
+    m = _MONTH_DAY_RE.search(text)
+    if m and m.group(1).lower() in _MONTHS:
+        return _make_date(m.group(3), _MONTHS[m.group(1).lower()], m.group(2))
+    return None
+
+
+def parse_job(text):
+    """Metadata of a job posting in the inbox template format."""
+    title = _TITLE_RE.search(text)
+    company = _COMPANY_RE.search(text)
+    fields = {}
+    for name, value in _FIELD_RE.findall(text):
+        fields.setdefault(name.strip().lower(), _placeholder(value))
+    location = fields.get("location")
+    work_mode = None
+    if location:
+        m = _WORK_MODE_RE.search(location)
+        if m:
+            work_mode = m.group(1).lower().replace(" ", "-")
+            if work_mode == "onsite":
+                work_mode = "on-site"
+        location = re.sub(r"\s*\(.*\)\s*$", "", location) or None
+    salary = fields.get("salary range") or fields.get("salary")
+    salary_min, salary_max, currency = parse_salary(salary)
+    posted = fields.get("posted")
+    return {
+        "title": _placeholder(title.group(1)) if title else None,
+        "company": _placeholder(company.group(1)) if company else None,
+        "location": location,
+        "work_mode": work_mode,
+        "employment_type": fields.get("employment type"),
+        "salary_text": salary,
+        "salary_min": salary_min,
+        "salary_max": salary_max,
+        "salary_currency": currency,
+        "posted_text": posted,
+        "posted": parse_date(posted),
+        "source": fields.get("source"),
+    }
+
+
+def open_index(db_path=DEFAULT_DB):
+    """Open (and create or migrate) the index database."""
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path))
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        # The index is a cache of the tree; rebuild it from scratch
+        conn.executescript("DROP TABLE IF EXISTS letters; DROP TABLE IF EXISTS jobs; DROP TABLE IF EXISTS files;")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _is_md(name):
+    return name.lower().endswith(".md") and not name.startswith(".")
+
+
+def iter_files(candidates=CANDIDATES_DIR):
+    """Yield (path, kind, candidate, folder_date, stat) for postings and letters."""
+    candidates = Path(candidates)
+    try:
+        owners = sorted(e.name for e in os.scandir(candidates) if e.is_dir() and not e.name.startswith("."))
+    except OSError:
+        return
+    for owner in owners:
+        for sub, kind in ((INBOX_DIR, "job"), (LETTERS_DIR, "letter")):
+            stack = [(candidates / owner / sub, None)]
+            while stack:
+                d, folder_date = stack.pop()
+                try:
+                    entries = list(os.scandir(d))
+                except OSError:
+                    continue
+                for e in entries:
+                    if e.is_dir(follow_symlinks=False):
+                        if not any(fnmatch(e.name, g) for g in DEFAULT_PRUNE):
+                            stack.append((Path(e.path), e.name if _DATE_DIR_RE.match(e.name) else folder_date))
+                    elif e.is_file() and _is_md(e.name):
+                        # Template and README-style files are not postings
+                        if kind == "job" and e.name.startswith("0_"):
+                            continue
+                        yield Path(e.path), kind, owner, folder_date, e.stat()
+
+
+def scan(conn, candidates=CANDIDATES_DIR):
+    """Bring the index up to date; returns counts of new/changed/unchanged/removed files."""
+    known = {row["path"]: row for row in conn.execute("SELECT path, mtime_ns, size, sha1 FROM files")}
+    counts = {"new": 0, "changed": 0, "unchanged": 0, "removed": 0}
+    seen = set()
+    now = time.time()
+    with conn:
+        for path, kind, owner, folder_date, st in iter_files(candidates):
+            key = str(path)
+            seen.add(key)
+            row = known.get(key)
+            if row is not None and row["mtime_ns"] == st.st_mtime_ns and row["size"] == st.st_size:
+                counts["unchanged"] += 1
+                continue
+            try:
+                data = path.read_bytes()
+            except OSError:
+                continue
+            sha1 = hashlib.sha1(data).hexdigest()
+            if row is not None and row["sha1"] == sha1:
+                # Touched but not edited: only remember the new stat
+                conn.execute(
+                    "UPDATE files SET mtime_ns = ?, size = ? WHERE path = ?",
+                    (st.st_mtime_ns, st.st_size, key),
+                )
+                counts["unchanged"] += 1
+                continue
+            counts["changed" if row is not None else "new"] += 1
+            conn.execute(
+                "INSERT OR REPLACE INTO files (path, kind, candidate, mtime_ns, size, sha1, indexed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, owner, st.st_mtime_ns, st.st_size, sha1, now),
+            )
+            if kind == "job":
+                meta = parse_job(data.decode("utf-8", errors="replace"))
+                meta.update(path=key, candidate=owner, job_key=job_key(path.stem), folder_date=folder_date)
+                columns = ", ".join(meta)
+                conn.execute(
+                    f"INSERT OR REPLACE INTO jobs ({columns}) VALUES ({', '.join('?' * len(meta))})",
+                    list(meta.values()),
+                )
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO letters (path, candidate, job_key, language, folder_date)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, owner, job_key(path.stem), letter_language(path.stem), folder_date),
+                )
+        gone = [p for p in known if p not in seen]
+        conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in gone])
+        counts["removed"] = len(gone)
+    return counts
+
+
+def find_jobs(conn, candidate=None, since=None, unprocessed=False):
+    """Indexed postings, newest first.
+
+    candidate is the folder name below candidates/; since an ISO date
+    (compared with the posted date, else the inbox folder date).
+    """
+    sql = [
+        "SELECT j.*, COALESCE(j.posted, j.folder_date) AS day,",
+        " EXISTS (SELECT 1 FROM letters l WHERE l.candidate = j.candidate AND l.job_key = j.job_key) AS processed",
+        " FROM jobs j WHERE 1 = 1",
+    ]
+    params = []
+    if candidate:
+        sql.append(" AND j.candidate = ?")
+        params.append(candidate)
+    if since:
+        sql.append(" AND COALESCE(j.posted, j.folder_date) >= ?")
+        params.append(since)
+    if unprocessed:
+        sql.append(" AND NOT EXISTS (SELECT 1 FROM letters l WHERE l.candidate = j.candidate AND l.job_key = j.job_key)")
+    sql.append(" ORDER BY day DESC, j.path")
+    return [dict(row) for row in conn.execute("".join(sql), params)]
+
+
+def unprocessed_jobs(conn, candidate=None, since=None):
+    """Postings of a candidate without a generated letter yet."""
+    return find_jobs(conn, candidate, since, unprocessed=True)
+
+
+def _iso_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
+
+
+def _salary(job):
+    if job["salary_min"] is None:
+        return ""
+    low, high = int(job["salary_min"]), int(job["salary_max"])
+    text = f"{low:,}" if low == high else f"{low:,}-{high:,}"
+    return f"{text} {job['salary_currency'] or ''}".strip()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index inbox job postings in SQLite")
+    parser.add_argument("--db", default=str(DEFAULT_DB), help="Index database (default: .cache/jobs.sqlite3)")
+    parser.add_argument("--candidates", default=str(CANDIDATES_DIR), help="Candidates folder")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("scan", help="Update the index")
+    p_list = sub.add_parser("list", help="Query postings (updates the index first)")
+    p_list.add_argument("--user", help="Candidate folder name")
+    p_list.add_argument("--since", type=_iso_date, help="Only postings from this date on")
+    p_list.add_argument("--unprocessed", action="store_true", help="Only postings without a letter")
+    p_list.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    args = parser.parse_args(argv)
+
+    conn = open_index(args.db)
+    start = time.perf_counter()
+    counts = scan(conn, args.candidates)
+    elapsed = time.perf_counter() - start
+    if args.cmd == "scan":
+        print(
+            f"Indexed {sum(counts.values()) - counts['removed']} file(s) in {elapsed:.2f}s: "
+            f"{counts['new']} new, {counts['changed']} changed, "
+            f"{counts['unchanged']} unchanged, {counts['removed']} removed"
+        )
+        return 0
+
+    jobs = find_jobs(conn, args.user, args.since, args.unprocessed)
+    if args.json:
+        print(json.dumps(jobs, ensure_ascii=False, indent=2))
+        return 0
+    for job in jobs:
+        status = "done" if job["processed"] else "open"
+        fields = [job["day"] or "?", status, job["candidate"], job["company"] or "?", job["location"] or "", _salary(job)]
+        print("  ".join(fields).rstrip() + f"\n    {job['path']}")
+    print(f"{len(jobs)} posting(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""Rank inbox job postings against a candidate's competence profile, offline.
+
+Every posting the n8n workflow picks up is sent to the model together with
+the full competence profile (~10k input tokens per letter, see
+4_n8n/application_letter_cost_analysis.md). This scores postings locally
+first so low-fit ones never reach the model.
+
+Scoring: postings and the profile sections (split at "##" headings) are
+tokenized and weighted with BM25 (term frequency saturation, length
+normalization, IDF over the postings and sections together). A posting's
+score is the cosine similarity between its vector and the whole profile's,
+so it lies in [0, 1] and one threshold works across inbox sizes. The best
+matching profile section and the strongest shared terms are reported as the
+reason. NumPy is used when installed (sparse rows, vectorized dot
+products); the pure-Python path gives the same scores.
+
+Postings come from job_index.py (by default the unprocessed ones). With
+--write the postings at or above the threshold are copied to
+.cache/shortlist/<candidate>/ together with shortlist.json; point the
+workflow's .latest_job.json at that folder (--update-latest does it) and
+the "fetch job.mds from repo" node reads only the shortlist.
+
+Usage:
+  job_rank.py CANDIDATE [--since YYYY-MM-DD] [--all] [--threshold T] [--top N]
+              [--json] [--write] [--update-latest]
+"""
+
+import argparse
+import json
+import math
+import re
+import shutil
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import job_index
+from normalize_mds import unique_path
+
+np = None
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+REPO_ROOT = Path(__file__).resolve().parent
+PROFILE_FILE = Path("1_profile") / "competence-profile.md"
+SHORTLIST_DIR = REPO_ROOT / ".cache" / "shortlist"
+# Where docker-compose mounts the repository inside the n8n container
+WORKSPACE = "/workspace/jobs"
+
+DEFAULT_THRESHOLD = 0.08
+K1 = 1.2
+B = 0.75
+# Input size of one letter request besides profile and posting (the prompt),
+# from application_letter_cost_analysis.md; ~4 characters per token
+PROMPT_CHARS = 13010
+CHARS_PER_TOKEN = 4
+
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_URL_RE = re.compile(r"\(?https?://\S+")
+_TOKEN_RE = re.compile(r"[a-zäöüß0-9][a-zäöüß0-9+#.]*")
+_SECTION_RE = re.compile(r"^#{2,}\s+(.+?)\s*$", re.MULTILINE)
+
+STOPWORDS = frozenset(
+    """
+    a about above after all also an and any are as at be been being both but by can could did do does
+    during each for from had has have having he her here his how i if in into is it its just more most
+    my no nor not of off on once only or other our out over own same she should so some such than that
+    the their them then there these they this those through to too under until up very was we were what
+    when where which while who whom why will with would you your yours us per etc e.g i.e via within
+    across including new well based plus required nice years year experience work working team
+    company location employment type salary range posted source role position responsibilities
+    requirements offer benefits about
+    aber alle als am an auch auf aus bei bin bis bist da damit dann das dass dein deine dem den der des
+    dich die dir doch dort du durch ein eine einem einen einer eines er es euch euer für hat hatte
+    hier ich ihr ihre im in ist ja jede jedem jeden jeder jedes kann kein keine mit mich mir muss nach
+    nicht noch nun nur ob oder ohne sehr sein seine sich sie sind so über um und uns unser unter vom
+    von vor war waren was weil wenn wer wie wir wird wo zu zum zur zwischen sowie bzw
+    m w f d mwd
+    """.split()
+)
+
+
+# Raw token -> indexed term (None for stopwords and numbers)
+_TERMS = {}
+
+
+def _term(tok):
+    term = tok.rstrip(".")
+    if len(term) < 2 or term in STOPWORDS or term.replace(".", "").isdigit():
+        term = None
+    _TERMS[tok] = term
+    return term
+
+
+def term_counts(text):
+    """Term counts of text, lowercased, without markup, URLs, stopwords and bare numbers."""
+    text = _URL_RE.sub(" ", _COMMENT_RE.sub(" ", text)).lower()
+    counts = {}
+    # Clean each distinct token once instead of every occurrence
+    for tok, n in Counter(_TOKEN_RE.findall(text)).items():
+        term = _TERMS[tok] if tok in _TERMS else _term(tok)
+        if term is not None:
+            counts[term] = counts.get(term, 0) + n
+    return counts
+
+
+def profile_sections(text):
+    """Split a competence profile into (heading, text) sections at ## headings."""
+    sections = []
+    matches = list(_SECTION_RE.finditer(text))
+    for i, m in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        body = text[m.end() : end]
+        if term_counts(body):
+            sections.append((m.group(1).strip("*# "), m.group(0) + body))
+    return sections or [("Profile", text)]
+
+
+class Corpus:
+    """BM25-weighted term vectors over postings and profile sections."""
+
+    def __init__(self, documents):
+        self.counts = [term_counts(d) for d in documents]
+        lengths = [sum(c.values()) for c in self.counts]
+        self.avglen = (sum(lengths) / len(lengths)) if lengths else 0.0
+        df = Counter()
+        for c in self.counts:
+            df.update(c.keys())
+        n = len(self.counts)
+        self.vocab = {t: i for i, t in enumerate(sorted(df))}
+        self.idf = {t: math.log(1.0 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+
+    def weights(self, i):
+        """BM25 weight per term of document i."""
+        c = self.counts[i]
+        length = sum(c.values())
+        norm = K1 * (1.0 - B + B * length / self.avglen) if self.avglen else K1
+        return {t: self.idf[t] * tf * (K1 + 1.0) / (tf + norm) for t, tf in c.items()}
+
+
+def _cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(w * b.get(t, 0.0) for t, w in a.items())
+    na = math.sqrt(sum(w * w for w in a.values()))
+    nb = math.sqrt(sum(w * w for w in b.values()))
+    return dot / (na * nb) if na and nb else 0.0
+
+
+def _similarities_python(post_vecs, query_vecs):
+    """Matrix [query][posting] of cosine similarities."""
+    return [[_cosine(p, q) for p in post_vecs] for q in query_vecs]
+
+
+def _similarities_numpy(corpus, post_vecs, query_vecs, chunk=256):
+    """Same as _similarities_python with the postings as CSR rows."""
+    vocab = corpus.vocab
+    queries = np.zeros((len(query_vecs), len(vocab)))
+    for row, vec in enumerate(query_vecs):
+        for t, w in vec.items():
+            queries[row, vocab[t]] = w
+    qnorm = np.linalg.norm(queries, axis=1)
+    out = np.zeros((len(query_vecs), len(post_vecs)))
+    for start in range(0, len(post_vecs), chunk):
+        block = post_vecs[start : start + chunk]
+        sizes = np.array([len(v) for v in block])
+        indices = np.fromiter((vocab[t] for v in block for t in v), dtype=np.int64, count=int(sizes.sum()))
+        data = np.fromiter((w for v in block for w in v.values()), dtype=float, count=int(sizes.sum()))
+        indptr = np.concatenate(([0], np.cumsum(sizes)))
+        nonempty = sizes > 0
+        dots = np.zeros((len(query_vecs), len(block)))
+        if indices.size:
+            products = queries[:, indices] * data
+            dots[:, nonempty] = np.add.reduceat(products, indptr[:-1][nonempty], axis=1)
+        pnorm = np.sqrt(np.add.reduceat(data * data, indptr[:-1][nonempty])) if indices.size else np.zeros(0)
+        norms = np.zeros(len(block))
+        norms[nonempty] = pnorm
+        denom = np.outer(qnorm, norms)
+        out[:, start : start + len(block)] = np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+    return out.tolist()
+
+
+def rank(profile_text, postings, use_numpy=None):
+    """Score postings [(key, text), ...] against a profile; best first.
+
+    Returns dicts with key, score, section (best matching profile section),
+    section_score and terms (strongest shared terms).
+    """
+    postings = list(postings)
+    if not postings:
+        return []
+    sections = profile_sections(profile_text)
+    texts = [text for _, text in postings]
+    corpus = Corpus(texts + [body for _, body in sections] + [profile_text])
+    post_vecs = [corpus.weights(i) for i in range(len(texts))]
+    query_vecs = [corpus.weights(len(texts) + j) for j in range(len(sections) + 1)]
+    if use_numpy is None:
+        use_numpy = NUMPY_AVAILABLE
+    if use_numpy:
+        sims = _similarities_numpy(corpus, post_vecs, query_vecs)
+    else:
+        sims = _similarities_python(post_vecs, query_vecs)
+    profile_vec = query_vecs[-1]
+    ranked = []
+    for i, (key, _) in enumerate(postings):
+        best = max(range(len(sections)), key=lambda j: sims[j][i])
+        shared = sorted(
+            (t for t in post_vecs[i] if t in profile_vec),
+            key=lambda t: post_vecs[i][t] * profile_vec[t],
+            reverse=True,
+        )
+        ranked.append(
+            {
+                "key": key,
+                "score": round(sims[-1][i], 4),
+                "section": sections[best][0],
+                "section_score": round(sims[best][i], 4),
+                "terms": shared[:6],
+            }
+        )
+    ranked.sort(key=lambda r: r["score"], reverse=True)
+    return ranked
+
+
+def estimate_tokens(profile_text, posting_text):
+    """Input tokens of one letter request for this posting."""
+    return (PROMPT_CHARS + len(profile_text) + len(posting_text)) // CHARS_PER_TOKEN
+
+
+def write_shortlist(candidate, kept, threshold, out_dir=None):
+    """Copy the kept postings into the shortlist folder; returns the folder."""
+    out_dir = Path(out_dir or SHORTLIST_DIR / candidate)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for old in out_dir.glob("*.md"):
+        old.unlink()
+    entries = []
+    for r in kept:
+        src = Path(r["key"])
+        # Keep the file name: n8n names the letter after it
+        dest = unique_path(out_dir / src.name)
+        shutil.copy2(src, dest)
+        entries.append(dict(r, path=str(src), copy=dest.name))
+    manifest = {
+        "candidate": candidate,
+        "threshold": threshold,
+        "generated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "jobs": entries,
+    }
+    tmp = out_dir / ".shortlist.json.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    tmp.replace(out_dir / "shortlist.json")
+    return out_dir
+
+
+def container_path(path):
+    """Path as the n8n container sees it (the repository is /workspace/jobs)."""
+    return f"{WORKSPACE}/{Path(path).resolve().relative_to(REPO_ROOT).as_posix()}"
+
+
+def update_latest_job(candidate_dir, folder):
+    """Point the candidate's .latest_job.json at folder, keeping its other keys."""
+    latest = Path(candidate_dir) / ".latest_job.json"
+    try:
+        with open(latest, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    data["jobs"] = [{"jobFilePath": container_path(folder)}]
+    with open(latest, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    return latest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank inbox jobs against a competence profile")
+    parser.add_argument("candidate", help="Candidate folder name below candidates/")
+    parser.add_argument("--candidates", default=str(job_index.CANDIDATES_DIR), help="Candidates folder")
+    parser.add_argument("--db", default=str(job_index.DEFAULT_DB), help="Job index database")
+    parser.add_argument("--since", type=job_index._iso_date, help="Only postings from this date on")
+    parser.add_argument("--all", action="store_true", help="Include postings that already have a letter")
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD, help=f"Minimum score to keep (default {DEFAULT_THRESHOLD})"
+    )
+    parser.add_argument("--top", type=int, help="Keep at most N postings")
+    parser.add_argument("--json", action="store_true", help="Print the ranking as JSON")
+    parser.add_argument("--write", action="store_true", help="Write the shortlist to .cache/shortlist/<candidate>/")
+    parser.add_argument(
+        "--update-latest", action="store_true", help="Also point the candidate's .latest_job.json at the shortlist"
+    )
+    args = parser.parse_args(argv)
+
+    candidate_dir = Path(args.candidates) / args.candidate
+    profile_path = candidate_dir / PROFILE_FILE
+    if not profile_path.is_file():
+        print(f"Error: competence profile not found: {profile_path}")
+        return 1
+    profile_text = profile_path.read_text(encoding="utf-8", errors="replace")
+
+    conn = job_index.open_index(args.db)
+    job_index.scan(conn, args.candidates)
+    jobs = job_index.find_jobs(conn, args.candidate, args.since, unprocessed=not args.all)
+    texts = {}
+    for job in jobs:
+        try:
+            texts[job["path"]] = Path(job["path"]).read_text(encoding="utf-8", errors="replace")
+        except OSError as e:
+            print(f"Warning: cannot read {job['path']}: {e}")
+    meta = {job["path"]: job for job in jobs}
+
+    ranked = rank(profile_text, texts.items())
+    kept = [r for r in ranked if r["score"] >= args.threshold][: args.top]
+    kept_keys = {r["key"] for r in kept}
+    for r in ranked:
+        r["keep"] = r["key"] in kept_keys
+        r["company"] = meta[r["key"]]["company"]
+
+    if args.json:
+        print(json.dumps(ranked, ensure_ascii=False, indent=2))
+    else:
+        for r in ranked:
+            mark = "keep" if r["keep"] else "skip"
+            print(f"{r['score']:.3f}  {mark}  {r['company'] or '?'}  ({r['section']}: {', '.join(r['terms'])})")
+            print(f"    {r['key']}")
+        skipped = [r for r in ranked if not r["keep"]]
+        saved = sum(estimate_tokens(profile_text, texts[r["key"]]) for r in skipped)
+        print(
+            f"{len(kept)} of {len(ranked)} posting(s) at or above {args.threshold:g}"
+            f" ({'numpy' if NUMPY_AVAILABLE else 'pure Python'}); "
+            f"skipping {len(skipped)} saves ~{saved:,} input tokens"
+        )
+
+    if args.write or args.update_latest:
+        folder = write_shortlist(args.candidate, kept, args.threshold)
+        print(f"Shortlist: {folder} (n8n jobFilePath: {container_path(folder)})")
+        if args.update_latest:
+            print(f"Updated {update_latest_job(candidate_dir, folder)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""Generate application letters directly against the OpenAI API, concurrently.
+
+The interactive counterpart of batch_letters.py: same postings (the
+unprocessed inbox jobs of job_index.py, optionally only the job_rank.py
+shortlist), same ATS prompt (with --profile-budget only the relevant
+profile parts, see profile_retrieval.py) and the same letter files, but
+answered now instead of within the Batch API's 24 hours. Requests run
+concurrently (--concurrency) and are paced by two token buckets, one for
+requests and one for tokens per minute (--rpm/--tpm, set them to the
+account's rate limits). Input tokens are estimated from the prompt length
+and corrected with the reported usage once the answer is in.
+
+HTTP 429 and 5xx answers and connection errors are retried with exponential
+backoff and full jitter, honouring Retry-After; a 429 also pauses the
+request bucket so the other workers back off too. 401/403 stop the run.
+
+Each finished posting is appended to a checkpoint (.cache/runner/
+<candidate>.jsonl) right after its letter is written, so an interrupted run
+picks up where it stopped; postings that failed are tried again.
+
+The API base URL comes from --base-url or OPENAI_BASE_URL, so the run can go
+through llm_cache_proxy.py or against 98_testfiles/stub_openai.py; the key
+from OPENAI_API_KEY.
+
+Usage:
+  letter_runner.py CANDIDATE [--since YYYY-MM-DD] [--shortlist [--threshold T]]
+                   [--skip-duplicates] [--concurrency 4] [--rpm 500] [--tpm 200000] [--max-retries 6]
+                   [--model M] [--profile-budget TOKENS] [--base-url URL]
+                   [--date YYYY-MM-DD] [--limit N] [--no-queue] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import batch_letters
+import job_index
+
+REPO_ROOT = Path(__file__).resolve().parent
+RUNNER_DIR = REPO_ROOT / ".cache" / "runner"
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+CHARS_PER_TOKEN = 4
+# Expected answer length; the letters are around 1,000 tokens
+OUTPUT_TOKENS = 1500
+REQUEST_TIMEOUT = 600
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+FATAL_STATUS = {401, 403}
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+
+class TokenBucket:
+    """Rate limiter refilling `per_minute` units per minute, up to one minute's worth."""
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return now
+
+    async def acquire(self, amount=1):
+        # More than the bucket holds can never be available; wait for a full one
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                now = self._refill()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def settle(self, estimated, actual):
+        """Give back (or take) the difference between an estimate and actual use."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + estimated - actual)
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class RetryableError(Exception):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class FatalError(Exception):
+    pass
+
+
+def _retry_after(headers):
+    try:
+        return max(0.0, float(headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return None
+
+
+def post_chat(base_url, api_key, payload, timeout=REQUEST_TIMEOUT):
+    """POST to /chat/completions; returns the decoded body or raises."""
+    req = urllib.request.Request(
+        base_url.rstrip("/") + "/chat/completions",
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        detail = e.read()[:200].decode("utf-8", "replace")
+        message = f"HTTP {e.code}: {detail}"
+        if e.code in RETRY_STATUS:
+            raise RetryableError(message, _retry_after(e.headers))
+        if e.code in FATAL_STATUS:
+            raise FatalError(message)
+        raise RuntimeError(message)
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        raise RetryableError(f"{type(e).__name__}: {e}")
+
+
+def backoff(attempt, retry_after=None):
+    """Seconds to wait before retry `attempt` (1-based): Retry-After, else full jitter."""
+    if retry_after is not None:
+        return retry_after
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt))
+
+
+def load_checkpoint(path):
+    """{custom_id: entry} of the last entry per posting."""
+    done = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut off by an interrupted run
+                    continue
+                done[entry.get("id")] = entry
+    except FileNotFoundError:
+        pass
+    return done
+
+
+class Runner:
+    def __init__(self, args, api_key, checkpoint):
+        self.args = args
+        self.api_key = api_key
+        self.checkpoint = checkpoint
+        self.requests = TokenBucket(args.rpm)
+        self.tokens = TokenBucket(args.tpm)
+        self.executor = ThreadPoolExecutor(max_workers=args.concurrency)
+        self.stop = asyncio.Event()
+        self.stats = {"written": 0, "failed": 0, "retries": 0, "input_tokens": 0, "output_tokens": 0}
+        self.total = 0
+
+    def _record(self, entry):
+        entry["at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.checkpoint.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.checkpoint.flush()
+
+    async def _call(self, cid, prompt):
+        loop = asyncio.get_running_loop()
+        payload = {"model": self.args.model, "messages": [{"role": "user", "content": prompt}]}
+        estimate = len(prompt) // CHARS_PER_TOKEN + OUTPUT_TOKENS
+        attempt = 0
+        while True:
+            await self.requests.acquire()
+            await self.tokens.acquire(estimate)
+            if self.stop.is_set():
+                raise FatalError("run stopped")
+            try:
+                body = await loop.run_in_executor(
+                    self.executor, post_chat, self.args.base_url, self.api_key, payload
+                )
+            except RetryableError as e:
+                self.tokens.settle(estimate, 0)
+                attempt += 1
+                if attempt > self.args.max_retries:
+                    raise RuntimeError(f"{e} (gave up after {self.args.max_retries} retries)")
+                delay = backoff(attempt, e.retry_after)
+                if str(e).startswith("HTTP 429"):
+                    self.requests.pause(delay)
+                self.stats["retries"] += 1
+                print(f"  retry {attempt} for {cid} in {delay:.1f}s: {str(e)[:80]}")
+                await asyncio.sleep(delay)
+                continue
+            usage = body.get("usage") or {}
+            used_in, used_out = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+            if used_in or used_out:
+                self.tokens.settle(estimate, used_in + used_out)
+            self.stats["input_tokens"] += used_in
+            self.stats["output_tokens"] += used_out
+            try:
+                return body["choices"][0]["message"]["content"]
+            except (KeyError, IndexError, TypeError):
+                raise RuntimeError("no message content in response")
+
+    async def _worker(self, queue):
+        while True:
+            try:
+                cid, job, prompt = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if self.stop.is_set():
+                continue
+            try:
+                answer = await self._call(cid, prompt)
+                out = batch_letters.write_letter(
+                    self.args.candidates, self.args.candidate, self.args.day, answer,
+                    Path(job["path"]).name, queue=not self.args.no_queue,
+                )
+            except FatalError as e:
+                if not self.stop.is_set():
+                    print(f"Error: {e}; stopping")
+                    self.stop.set()
+                continue
+            except (RuntimeError, ValueError, OSError) as e:
+                self.stats["failed"] += 1
+                self._record({"id": cid, "status": "failed", "error": str(e)[:300]})
+                print(f"Failed {cid}: {e}")
+                continue
+            self.stats["written"] += 1
+            self._record({"id": cid, "status": "done", "letter": str(out)})
+            done = self.stats["written"] + self.stats["failed"]
+            print(f"[{done}/{self.total}] Wrote {out}")
+
+    async def run(self, work):
+        self.total = len(work)
+        queue = asyncio.Queue()
+        for item in work:
+            queue.put_nowait(item)
+        try:
+            await asyncio.gather(*(self._worker(queue) for _ in range(self.args.concurrency)))
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate application letters concurrently via the OpenAI API")
+    parser.add_argument("candidate", help="Candidate folder name below candidates/")
+    parser.add_argument("--candidates", default=str(job_index.CANDIDATES_DIR), help="Candidates folder")
+    parser.add_argument("--since", type=job_index._iso_date, help="Only postings from this date on")
+    parser.add_argument("--shortlist", action="store_true", help="Only postings job_rank.py keeps")
+    parser.add_argument("--threshold", type=float, help="job_rank.py score threshold for --shortlist")
+    parser.add_argument(
+        "--skip-duplicates", action="store_true", help="Leave out near-duplicate postings (job_dedup.py)"
+    )
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight (default: 4)")
+    parser.add_argument("--rpm", type=int, default=500, help="Requests per minute (default: 500)")
+    parser.add_argument("--tpm", type=int, default=200000, help="Tokens per minute (default: 200000)")
+    parser.add_argument("--max-retries", type=int, default=6, help="Retries per posting (default: 6)")
+    parser.add_argument("--model", default=batch_letters.DEFAULT_MODEL)
+    parser.add_argument(
+        "--profile-budget", type=int, metavar="TOKENS", help="Send only the relevant profile parts (profile_retrieval.py)"
+    )
+    parser.add_argument("--base-url", default=os.environ.get("OPENAI_BASE_URL", DEFAULT_BASE_URL))
+    parser.add_argument("--prompt", default=str(batch_letters.PROMPT_FILE), help="Prompt template")
+    parser.add_argument("--date", type=job_index._iso_date, help="Letter folder date (default: today)")
+    parser.add_argument("--limit", type=int, help="At most N postings this run")
+    parser.add_argument("--no-queue", action="store_true", help="Do not copy letters to 3_latex/src/content/")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: .cache/runner/<candidate>.jsonl)")
+    parser.add_argument("--db", default=str(job_index.DEFAULT_DB), help="Job index database")
+    parser.add_argument("--dry-run", action="store_true", help="List the postings and estimated tokens only")
+    args = parser.parse_args(argv)
+    if args.concurrency < 1 or args.rpm < 1 or args.tpm < 1:
+        print("Error: --concurrency, --rpm and --tpm must be positive")
+        return 1
+    args.day = args.date or time.strftime("%Y-%m-%d")
+
+    profile_path = Path(args.candidates) / args.candidate / batch_letters.PROFILE_FILE
+    if not profile_path.is_file():
+        print(f"Error: competence profile not found: {profile_path}")
+        return 1
+    try:
+        prompt_template = Path(args.prompt).read_text(encoding="utf-8")
+    except OSError as e:
+        print(f"Error: cannot read prompt {args.prompt}: {e}")
+        return 1
+    profile_text = profile_path.read_text(encoding="utf-8", errors="replace")
+
+    conn = job_index.open_index(args.db)
+    jobs = batch_letters.select_jobs(
+        conn,
+        args.candidate,
+        profile_text,
+        args.since,
+        args.shortlist,
+        args.threshold,
+        args.candidates,
+        args.skip_duplicates,
+    )
+    checkpoint_path = Path(args.checkpoint or RUNNER_DIR / f"{args.candidate}.jsonl")
+    previous = load_checkpoint(checkpoint_path)
+    profile_for = batch_letters.profile_selector(profile_text, args.profile_budget)
+    work = []
+    for job in jobs:
+        cid = batch_letters.custom_id(args.candidate, job["path"], args.candidates)
+        if previous.get(cid, {}).get("status") == "done":
+            continue
+        text = Path(job["path"]).read_text(encoding="utf-8", errors="replace")
+        prompt = batch_letters.render_prompt(prompt_template, Path(job["path"]).name, text, profile_for(text))
+        work.append((cid, job, prompt))
+    skipped = len(jobs) - len(work)
+    if args.limit is not None:
+        work = work[: args.limit]
+    if skipped:
+        print(f"Checkpoint: {skipped} posting(s) already done")
+    if not work:
+        print(f"No unprocessed postings for {args.candidate}")
+        return 0
+
+    estimate = sum(len(prompt) // CHARS_PER_TOKEN + OUTPUT_TOKENS for _, _, prompt in work)
+    if args.dry_run:
+        for cid, _, prompt in work:
+            print(f"{len(prompt) // CHARS_PER_TOKEN:>7,}  {cid}")
+        print(f"{len(work)} posting(s), ~{estimate:,} tokens")
+        return 0
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        print("Error: OPENAI_API_KEY is not set")
+        return 1
+
+    print(f"{len(work)} posting(s), ~{estimate:,} tokens, {args.concurrency} concurrent via {args.base_url}")
+    started = time.monotonic()
+    checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+        runner = Runner(args, api_key, checkpoint)
+        try:
+            asyncio.run(runner.run(work))
+        except KeyboardInterrupt:
+            print(f"Interrupted; rerun to continue from {checkpoint_path}")
+            return 130
+    stats = runner.stats
+    print(
+        f"{stats['written']} letter(s) written, {stats['failed']} failed, {stats['retries']} retries, "
+        f"{stats['input_tokens']:,} in / {stats['output_tokens']:,} out tokens in {time.monotonic() - started:.1f}s"
+    )
+    if runner.stop.is_set():
+        return 1
+    return 2 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
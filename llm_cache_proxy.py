@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""Caching proxy for the OpenAI API, for the n8n letter workflow.
+
+Point the n8n OpenAI credential's Base URL at this proxy instead of
+https://api.openai.com/v1. Requests to the model endpoints
+(/v1/chat/completions, /v1/responses) are answered from a local cache when
+the same request was answered before; everything else is passed through.
+
+The cache key is a SHA-256 over the endpoint and the request body in
+canonical JSON (sorted keys): model, messages (prompt file, competence
+profile and job text all end up there) and every sampling parameter.
+Per-call bookkeeping fields (user, metadata, store) are left out. Re-running
+the workflow on the same job, or retrying after a failed "write generated
+letters to repo" step, is then answered instantly and costs nothing.
+Identical requests that arrive while the first one is still waiting for the
+model share its answer.
+
+Only successful (HTTP 200), non-streaming answers are stored, one file per
+key under .cache/llm/. The cache is bounded by --max-mb and evicts the
+least recently used answers first. Hit/miss counts and saved tokens are
+served at GET /_cache/stats and printed on exit. A request with
+"Cache-Control: no-cache" skips the lookup and replaces the stored answer.
+
+From the n8n container use http://host.docker.internal:8787/v1 as Base URL
+(on Linux start the proxy with --host 0.0.0.0 and add
+"host.docker.internal:host-gateway" to extra_hosts in docker-compose.yml).
+
+Usage:
+  llm_cache_proxy.py [--host 127.0.0.1] [--port 8787] [--upstream URL]
+                     [--cache-dir .cache/llm] [--max-mb 200]
+  llm_cache_proxy.py stats|clear [--cache-dir DIR]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent
+DEFAULT_CACHE_DIR = REPO_ROOT / ".cache" / "llm"
+DEFAULT_UPSTREAM = "https://api.openai.com/v1"
+CACHED_PATHS = ("/chat/completions", "/responses")
+# Request fields that do not change the answer
+IGNORED_FIELDS = ("user", "metadata", "store", "stream_options")
+# Headers forwarded to the upstream API
+FORWARD_HEADERS = ("authorization", "content-type", "accept", "openai-organization", "openai-project")
+UPSTREAM_TIMEOUT = 600
+
+
+def cache_key(path, request):
+    """Content address of a model request."""
+    payload = {k: v for k, v in request.items() if k not in IGNORED_FIELDS}
+    canonical = json.dumps([path, payload], sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def usage_tokens(body):
+    """(input, output) tokens from a chat/completions or responses answer."""
+    try:
+        usage = json.loads(body).get("usage") or {}
+    except (ValueError, AttributeError):
+        return 0, 0
+    return (
+        usage.get("prompt_tokens", usage.get("input_tokens", 0)) or 0,
+        usage.get("completion_tokens", usage.get("output_tokens", 0)) or 0,
+    )
+
+
+class ResponseCache:
+    """Size-bounded LRU store of answers, one JSON file per key."""
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=200 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size, least recently used first
+        self._total = 0
+        self.stats = {"hits": 0, "misses": 0, "bypass": 0, "evictions": 0, "saved_input_tokens": 0, "saved_output_tokens": 0}
+        self._load()
+
+    def _path(self, key):
+        return self.root / key[:2] / f"{key}.json"
+
+    def _load(self):
+        found = []
+        for path in self.root.glob("??/*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            found.append((st.st_mtime, path.stem, st.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total += size
+
+    def get(self, key):
+        """The stored answer for key, or None; a hit makes the entry most recent."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self._drop(key)
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        try:
+            # The file mtime carries the LRU order across restarts
+            os.utime(path)
+        except OSError:
+            pass
+        return record
+
+    def put(self, key, record):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(record, ensure_ascii=False).encode("utf-8")
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = len(data)
+            self._total += len(data)
+            self._evict()
+
+    def _drop(self, key):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._total -= size
+
+    def _evict(self):
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total -= size
+            self.stats["evictions"] += 1
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def count(self, outcome, record=None):
+        with self._lock:
+            self.stats[outcome] += 1
+            if outcome == "hits" and record is not None:
+                tokens_in, tokens_out = usage_tokens(record.get("body", ""))
+                self.stats["saved_input_tokens"] += tokens_in
+                self.stats["saved_output_tokens"] += tokens_out
+
+    def summary(self):
+        with self._lock:
+            out = dict(self.stats)
+            out.update(entries=len(self._entries), bytes=self._total, max_bytes=self.max_bytes)
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = round(out["hits"] / lookups, 3) if lookups else 0.0
+        return out
+
+
+class ProxyServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, cache, upstream=DEFAULT_UPSTREAM, verbose=True):
+        super().__init__(address, ProxyHandler)
+        self.cache = cache
+        self.upstream = upstream.rstrip("/")
+        self.verbose = verbose
+        self._key_locks = {}
+        self._key_locks_lock = threading.Lock()
+
+    @contextmanager
+    def key_lock(self, key):
+        """Serialize identical requests so a retry waits for the first answer."""
+        with self._key_locks_lock:
+            lock, users = self._key_locks.get(key, (threading.Lock(), 0))
+            self._key_locks[key] = (lock, users + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._key_locks_lock:
+                lock, users = self._key_locks[key]
+                if users == 1:
+                    del self._key_locks[key]
+                else:
+                    self._key_locks[key] = (lock, users - 1)
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    server_version = "llm-cache-proxy/1"
+
+    def log_message(self, fmt, *args):
+        # Per-request lines are printed by _log instead
+        pass
+
+    def _log(self, outcome, path, model, started, body=b""):
+        if self.server.verbose:
+            tokens_in, tokens_out = usage_tokens(body)
+            print(
+                f"{time.strftime('%H:%M:%S')} {outcome:6} {path} {model or '-'} "
+                f"{tokens_in}+{tokens_out} tokens {(time.monotonic() - started) * 1000:.0f} ms",
+                flush=True,
+            )
+
+    def _relative_path(self):
+        """Request path below the API root (/v1/chat/completions -> /chat/completions)."""
+        path = self.path
+        return path[3:] if path.startswith("/v1/") else path
+
+    def _send(self, status, body, content_type="application/json", extra=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (extra or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _forward(self, method, body=None):
+        """Send the request upstream; returns (status, content type, body)."""
+        headers = {k: v for k, v in self.headers.items() if k.lower() in FORWARD_HEADERS}
+        req = urllib.request.Request(
+            self.server.upstream + self._relative_path(), data=body, headers=headers, method=method
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=UPSTREAM_TIMEOUT) as resp:
+                return resp.status, resp.headers.get("Content-Type", "application/json"), resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers.get("Content-Type", "application/json"), e.read()
+        except (urllib.error.URLError, OSError) as e:
+            error = {"error": {"message": f"upstream unreachable: {e}", "type": "proxy_error"}}
+            return 502, "application/json", json.dumps(error).encode("utf-8")
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/_cache/stats":
+            self._send(200, json.dumps(self.server.cache.summary(), indent=2).encode("utf-8"))
+            return
+        status, content_type, body = self._forward("GET")
+        self._send(status, body, content_type)
+
+    def do_POST(self):
+        started = time.monotonic()
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        path = self._relative_path()
+        try:
+            request = json.loads(body)
+        except ValueError:
+            request = None
+        if path not in CACHED_PATHS or not isinstance(request, dict) or request.get("stream"):
+            # Streaming answers and other endpoints are not cached
+            status, content_type, answer = self._forward("POST", body)
+            self.server.cache.count("bypass")
+            self._log("BYPASS", path, request.get("model") if isinstance(request, dict) else None, started)
+            self._send(status, answer, content_type, {"X-Cache": "BYPASS"})
+            return
+
+        cache = self.server.cache
+        key = cache_key(path, request)
+        refresh = "no-cache" in (self.headers.get("Cache-Control") or "").lower()
+        with self.server.key_lock(key):
+            record = None if refresh else cache.get(key)
+            if record is not None:
+                cache.count("hits", record)
+                answer = record["body"].encode("utf-8")
+                self._log("HIT", path, request.get("model"), started, answer)
+                self._send(200, answer, record.get("content_type", "application/json"), {"X-Cache": "HIT", "X-Cache-Key": key})
+                return
+            status, content_type, answer = self._forward("POST", body)
+            cache.count("misses")
+            if status == 200:
+                try:
+                    text = answer.decode("utf-8")
+                except UnicodeDecodeError:
+                    text = None
+                if text is not None:
+                    cache.put(
+                        key,
+                        {
+                            "path": path,
+                            "model": request.get("model"),
+                            "created": time.time(),
+                            "content_type": content_type,
+                            "body": text,
+                        },
+                    )
+        self._log("MISS", path, request.get("model"), started, answer)
+        self._send(status, answer, content_type, {"X-Cache": "MISS", "X-Cache-Key": key})
+
+
+def _disk_summary(cache_dir):
+    files = list(Path(cache_dir).glob("??/*.json"))
+    return len(files), sum(f.stat().st_size for f in files)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Caching proxy for the OpenAI API")
+    parser.add_argument("command", nargs="?", choices=["serve", "stats", "clear"], default="serve")
+    parser.add_argument("--host", default="127.0.0.1", help="Listen address (0.0.0.0 for Docker on Linux)")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--upstream", default=os.environ.get("LLM_UPSTREAM", DEFAULT_UPSTREAM), help="Upstream API base URL")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR))
+    parser.add_argument("--max-mb", type=float, default=200.0, help="Cache size limit in MB")
+    parser.add_argument("--quiet", action="store_true", help="Do not log requests")
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        count, size = _disk_summary(args.cache_dir)
+        print(f"{args.cache_dir}: {count} cached answer(s), {size / 1024 / 1024:.1f} MB")
+        return 0
+    if args.command == "clear":
+        shutil.rmtree(args.cache_dir, ignore_errors=True)
+        print(f"Cleared {args.cache_dir}")
+        return 0
+
+    cache = ResponseCache(args.cache_dir, int(args.max_mb * 1024 * 1024))
+    server = ProxyServer((args.host, args.port), cache, args.upstream, verbose=not args.quiet)
+    print(f"Caching {args.upstream} on http://{args.host}:{args.port}/v1 ({len(cache._entries)} cached answer(s))", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(cache.summary(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
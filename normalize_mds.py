@@ -3,16 +3,36 @@
 
 Usage:
   normalize_mds.py [--roots ROOTS [ROOTS ...]] [--dry-run] [--verbose]
+                   [--prune GLOB ...] [--no-default-prune] [--workers N]
 
 If no --roots are provided the script will operate on the current working
 directory (so you can run it from anywhere and it will normalize files under
 that path).
+
+Directories whose name (or path relative to the root, for globs containing
+"/") matches a prune glob are not entered; by default that is .git, build,
+output, figures and a few tool caches. Name collisions are resolved against
+the directory listing read during the walk, so no extra stat calls are made.
+With --workers N the top-level folders of each root are walked in N threads.
 """
 
 import argparse
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
 from pathlib import Path
 
+DEFAULT_PRUNE = (
+    ".git",
+    "build",
+    "output",
+    "figures",
+    "node_modules",
+    "__pycache__",
+    ".venv",
+)
+
 
 def normalize_name(filename: str) -> str:
     lower = filename.lower()
@@ -38,7 +58,122 @@ def unique_path(path: Path) -> Path:
         i += 1
 
 
-def collect_and_normalize(roots, dry_run=False, verbose=False):
+def _same(name):
+    return name
+
+
+def unique_name(name, taken, counters, fold=_same):
+    """In-memory unique_path: first "<stem>-<i><suffix>" whose fold() is not in taken.
+
+    counters remembers the next index per (stem, suffix) so many collisions
+    on the same name do not re-probe from 1.
+    """
+    p = Path(name)
+    stem, suffix = p.stem, p.suffix
+    i = counters.get((stem, suffix), 1)
+    while True:
+        candidate = f"{stem}-{i}{suffix}"
+        if fold(candidate) not in taken:
+            counters[(stem, suffix)] = i + 1
+            return candidate
+        i += 1
+
+
+def is_case_insensitive(path):
+    """Best guess whether the filesystem holding path ignores case."""
+    s = str(path)
+    swapped = s.swapcase()
+    if swapped != s:
+        try:
+            return os.path.samefile(s, swapped)
+        except OSError:
+            return False
+    return sys.platform in ("darwin", "win32")
+
+
+def _pruned(name, rel, prune):
+    return any(fnmatch(rel if "/" in glob else name, glob) for glob in prune)
+
+
+def _scan(path):
+    """Split a directory listing into (subdirs, filenames, all names).
+
+    Like os.walk, symlinks to directories are listed but not entered, and
+    unreadable directories are skipped.
+    """
+    dirs, files, names = [], [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                names.append(entry.name)
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if not entry.is_symlink():
+                        dirs.append(entry.name)
+                else:
+                    files.append(entry.name)
+    except OSError:
+        pass
+    return dirs, files, names
+
+
+def _plan_dir(dirpath, filenames, names, fold, verbose):
+    """Planned (old, new) renames for the files of one directory."""
+    changes = []
+    taken = None
+    counters = {}
+    for filename in filenames:
+        new_filename = normalize_name(filename)
+        if new_filename == filename:
+            continue
+        if taken is None:
+            taken = {fold(n) for n in names}
+        if fold(new_filename) in taken:
+            new_filename = unique_name(new_filename, taken, counters, fold)
+            if verbose:
+                print(f"Collision, will use: {Path(dirpath) / new_filename}")
+        # Reserve the target so two files never map to the same name
+        taken.add(fold(new_filename))
+        changes.append((Path(dirpath) / filename, Path(dirpath) / new_filename))
+    return changes
+
+
+def _walk(top, root, prune, fold, verbose):
+    """Plan renames below top (pre-order, like os.walk)."""
+    changes = []
+    stack = [top]
+    while stack:
+        dirpath = stack.pop()
+        dirs, files, names = _scan(dirpath)
+        changes.extend(_plan_dir(dirpath, files, names, fold, verbose))
+        subdirs = []
+        for d in dirs:
+            path = os.path.join(dirpath, d)
+            if prune and _pruned(d, os.path.relpath(path, root), prune):
+                continue
+            subdirs.append(path)
+        stack.extend(reversed(subdirs))
+    return changes
+
+
+def _walk_root(root_p, prune, fold, verbose, workers):
+    root = str(root_p)
+    if workers <= 1:
+        return _walk(root, root, prune, fold, verbose)
+    # Files of the root itself first, then each top-level folder in a thread
+    dirs, files, names = _scan(root)
+    changes = _plan_dir(root, files, names, fold, verbose)
+    tops = [os.path.join(root, d) for d in dirs if not (prune and _pruned(d, d, prune))]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for sub in pool.map(lambda top: _walk(top, root, prune, fold, verbose), tops):
+            changes.extend(sub)
+    return changes
+
+
+def collect_and_normalize(roots, dry_run=False, verbose=False, prune=DEFAULT_PRUNE, workers=1):
     changes = []
     for root in roots:
         root_p = Path(root).expanduser().resolve()
@@ -46,18 +181,8 @@ def collect_and_normalize(roots, dry_run=False, verbose=False):
             if verbose:
                 print(f"Skip non-existent root: {root_p}")
             continue
-        for dirpath, _, filenames in os.walk(root_p):
-            for filename in filenames:
-                new_filename = normalize_name(filename)
-                if new_filename == filename:
-                    continue
-                old_path = Path(dirpath) / filename
-                new_path = Path(dirpath) / new_filename
-                if new_path.exists():
-                    new_path = unique_path(new_path)
-                    if verbose:
-                        print(f"Collision, will use: {new_path}")
-                changes.append((old_path, new_path))
+        fold = str.lower if is_case_insensitive(root_p) else _same
+        changes.extend(_walk_root(root_p, tuple(prune or ()), fold, verbose, workers))
 
     for old_path, new_path in changes:
         if verbose or dry_run:
@@ -82,7 +207,26 @@ def main(argv=None):
         "--dry-run", action="store_true", help="Show planned renames without applying"
     )
     parser.add_argument("--verbose", action="store_true", help="Verbose output")
+    parser.add_argument(
+        "--prune",
+        nargs="+",
+        default=[],
+        metavar="GLOB",
+        help="Additional directory globs to skip",
+    )
+    parser.add_argument(
+        "--no-default-prune",
+        action="store_true",
+        help=f"Also walk {', '.join(DEFAULT_PRUNE)}",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Walk the top-level folders of each root in N threads",
+    )
     args = parser.parse_args(argv)
+    prune = list(args.prune) if args.no_default_prune else list(DEFAULT_PRUNE) + args.prune
 
     if args.roots:
         roots = args.roots
@@ -94,7 +238,13 @@ def main(argv=None):
         for r in roots:
             print(" -", r)
 
-    changes = collect_and_normalize(roots, dry_run=args.dry_run, verbose=args.verbose)
+    changes = collect_and_normalize(
+        roots,
+        dry_run=args.dry_run,
+        verbose=args.verbose,
+        prune=prune,
+        workers=args.workers,
+    )
     if args.dry_run:
         print(f"Dry run: {len(changes)} candidate(s) found")
     else:
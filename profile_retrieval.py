@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""Send only the parts of the competence profile that matter for a job.
+
+The competence profile is 58% of a letter request's input (~6,000 tokens,
+see 4_n8n/application_letter_cost_analysis.md) and goes out whole for every
+posting. This cuts it per posting:
+
+- The profile is chunked at its headings and bullets: each bullet is a
+  chunk, as is each paragraph. Paragraphs before a section's first bullet
+  (a position's organization, duration, location) are that section's lead.
+- Chunks are weighted with BM25 like job_rank.py (IDF over the chunks and
+  the posting) and scored by cosine similarity with the posting; a
+  chunk's nearest heading counts as part of its text.
+- The core sections (personal information, professional summary) are
+  always kept, even when they alone exceed --budget (the result is then
+  flagged over_budget). The best-scoring chunks are added, at most
+  --top-k, while the profile stays within --budget tokens; a chunk's lead
+  and headings come along and count against the budget.
+- The kept chunks are put back together in profile order under their
+  headings.
+
+batch_letters.py and letter_runner.py use it with --profile-budget. On its
+own it reports the tokens saved per posting (by default the candidate's
+unprocessed inbox jobs) or prints the reduced profile for one (--show).
+
+Usage:
+  profile_retrieval.py CANDIDATE [--job FILE ...] [--since YYYY-MM-DD]
+                       [--budget 1500] [--top-k 20] [--show] [--json]
+"""
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+
+import job_index
+import job_rank
+
+DEFAULT_BUDGET = 1500
+DEFAULT_TOP_K = 20
+# Lowercased parts of "##" headings whose sections are always sent
+CORE_SECTIONS = ("personal information", "professional summary", "persönliche daten", "zusammenfassung", "kurzprofil")
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_BULLET_RE = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+\S")
+_RULE_RE = re.compile(r"^\s*(?:-{3,}|\*{3,}|_{3,})\s*$")
+
+
+def tokens(text):
+    return len(text) // job_rank.CHARS_PER_TOKEN
+
+
+def _heading_text(line):
+    return _HEADING_RE.match(line).group(2).strip("*# ")
+
+
+def chunk_profile(text):
+    """Chunks of a profile in order: dicts with headings, kind and text.
+
+    headings is the line of every enclosing heading, outermost first; kind
+    is "bullet", "lead" (paragraph before the section's first bullet) or
+    "paragraph".
+    """
+    text = job_rank._COMMENT_RE.sub("", text)
+    chunks = []
+    stack = []
+    current = []
+    state = {"kind": None, "bullets": False}
+
+    def flush():
+        if current:
+            headings = tuple(line for _, line in stack)
+            chunks.append({"headings": headings, "kind": state["kind"], "text": "\n".join(current)})
+            current.clear()
+        state["kind"] = None
+
+    for line in text.splitlines():
+        m = _HEADING_RE.match(line)
+        if m:
+            flush()
+            level = len(m.group(1))
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, line.strip()))
+            state["bullets"] = False
+        elif _RULE_RE.match(line) or not line.strip():
+            flush()
+        elif _BULLET_RE.match(line):
+            flush()
+            state["kind"], state["bullets"] = "bullet", True
+            current.append(line.rstrip())
+        elif state["kind"] is not None:
+            # Continuation of a bullet or paragraph
+            current.append(line.rstrip())
+        else:
+            state["kind"] = "paragraph" if state["bullets"] else "lead"
+            current.append(line.rstrip())
+    flush()
+    return chunks
+
+
+class ProfileIndex:
+    """A chunked competence profile to select from per posting."""
+
+    def __init__(self, text, core=CORE_SECTIONS):
+        self.full_tokens = tokens(text)
+        self.chunks = chunk_profile(text)
+        self.core = set()
+        for i, chunk in enumerate(self.chunks):
+            top = [h for h in chunk["headings"] if h.startswith("## ")]
+            if not top or any(key in _heading_text(top[0]).lower() for key in core):
+                # Text before the first "##" section belongs to the core too
+                self.core.add(i)
+        # A lead on its own ("**Key Achievements:**") says nothing; it only
+        # comes along with its section unless the section has nothing else
+        with_body = {c["headings"] for c in self.chunks if c["kind"] != "lead"}
+        self.candidates = [
+            i
+            for i, c in enumerate(self.chunks)
+            if i not in self.core and (c["kind"] != "lead" or c["headings"] not in with_body)
+        ]
+        # Score text: the chunk and its nearest heading
+        self.texts = [
+            (_heading_text(c["headings"][-1]) + "\n" if c["headings"] else "") + c["text"]
+            for c in self.chunks
+        ]
+        self.core_tokens = self._cost(sorted(self.core), set())
+
+    def score(self, posting_text):
+        """Cosine similarity of every chunk with the posting."""
+        corpus = job_rank.Corpus(self.texts + [posting_text])
+        posting = corpus.weights(len(self.texts))
+        return [job_rank._cosine(corpus.weights(i), posting) for i in range(len(self.texts))]
+
+    def _cost(self, indices, emitted):
+        """Tokens the chunks add, counting headings not emitted yet."""
+        seen = set(emitted)
+        cost = 0
+        for i in indices:
+            for heading in self.chunks[i]["headings"]:
+                if heading not in seen:
+                    seen.add(heading)
+                    cost += tokens(heading) + 1
+            cost += tokens(self.chunks[i]["text"]) + 1
+        return cost
+
+    def _leads(self, i):
+        headings = self.chunks[i]["headings"]
+        return [j for j, c in enumerate(self.chunks) if c["kind"] == "lead" and c["headings"] == headings and j != i]
+
+    def select(self, posting_text, budget=DEFAULT_BUDGET, top_k=DEFAULT_TOP_K):
+        """Reduced profile for a posting.
+
+        Returns a dict with text, tokens, full_tokens, saved, selected (the
+        number of scored chunks taken), sections (their headings) and
+        over_budget (the core sections alone exceed budget).
+        """
+        keep = set(self.core)
+        used = self.core_tokens
+        emitted = {h for i in keep for h in self.chunks[i]["headings"]}
+        scores = self.score(posting_text)
+        order = sorted((i for i in self.candidates if scores[i] > 0), key=lambda i: -scores[i])
+        selected = []
+        for i in order:
+            if top_k is not None and len(selected) >= top_k:
+                break
+            extra = [i] + [j for j in self._leads(i) if j not in keep]
+            cost = self._cost(extra, emitted)
+            if used + cost > budget:
+                continue
+            used += cost
+            keep.update(extra)
+            for j in extra:
+                emitted.update(self.chunks[j]["headings"])
+            selected.append(i)
+        text = self.assemble(keep)
+        reduced = tokens(text)
+        sections = {_heading_text(self.chunks[i]["headings"][-1]) for i in selected if self.chunks[i]["headings"]}
+        return {
+            "text": text,
+            "tokens": reduced,
+            "full_tokens": self.full_tokens,
+            "saved": max(0, self.full_tokens - reduced),
+            "selected": len(selected),
+            "sections": sorted(sections),
+            "over_budget": self.core_tokens > budget,
+        }
+
+    def assemble(self, keep):
+        """The kept chunks in profile order under their headings."""
+        parts = []
+        emitted = ()
+        previous = None
+        for i, chunk in enumerate(self.chunks):
+            if i not in keep:
+                continue
+            headings = chunk["headings"]
+            if previous == (headings, "bullet") and chunk["kind"] == "bullet":
+                # Keep a list a list
+                parts[-1] += "\n" + chunk["text"]
+                continue
+            shared = 0
+            while shared < min(len(headings), len(emitted)) and headings[shared] == emitted[shared]:
+                shared += 1
+            parts.extend(headings[shared:])
+            emitted = headings
+            parts.append(chunk["text"])
+            previous = (headings, chunk["kind"])
+        return "\n\n".join(parts) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Select the competence profile parts relevant to a job")
+    parser.add_argument("candidate", help="Candidate folder name below candidates/")
+    parser.add_argument("--candidates", default=str(job_index.CANDIDATES_DIR), help="Candidates folder")
+    parser.add_argument("--db", default=str(job_index.DEFAULT_DB), help="Job index database")
+    parser.add_argument("--job", action="append", help="Posting file (repeatable; default: unprocessed inbox jobs)")
+    parser.add_argument("--since", type=job_index._iso_date, help="Only postings from this date on")
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET, help=f"Profile tokens (default {DEFAULT_BUDGET})")
+    parser.add_argument(
+        "--top-k", type=int, default=DEFAULT_TOP_K, help=f"Scored chunks at most (default {DEFAULT_TOP_K})"
+    )
+    parser.add_argument("--show", action="store_true", help="Print the reduced profile of the first posting")
+    parser.add_argument("--json", action="store_true", help="Print the per-posting report as JSON")
+    args = parser.parse_args(argv)
+
+    profile_path = Path(args.candidates) / args.candidate / job_rank.PROFILE_FILE
+    if not profile_path.is_file():
+        print(f"Error: competence profile not found: {profile_path}")
+        return 1
+    index = ProfileIndex(profile_path.read_text(encoding="utf-8", errors="replace"))
+
+    if args.job:
+        paths = args.job
+    else:
+        conn = job_index.open_index(args.db)
+        job_index.scan(conn, args.candidates)
+        paths = [job["path"] for job in job_index.unprocessed_jobs(conn, args.candidate, args.since)]
+    if not paths:
+        print(f"No unprocessed postings for {args.candidate}")
+        return 0
+
+    report = []
+    for path in paths:
+        try:
+            posting = Path(path).read_text(encoding="utf-8", errors="replace")
+        except OSError as e:
+            print(f"Warning: cannot read {path}: {e}")
+            continue
+        result = index.select(posting, args.budget, args.top_k)
+        if args.show:
+            print(result["text"])
+            return 0
+        result["path"] = str(path)
+        report.append(result)
+
+    if args.json:
+        print(json.dumps([{k: v for k, v in r.items() if k != "text"} for r in report], ensure_ascii=False, indent=2))
+        return 0
+    for r in report:
+        print(f"{r['tokens']:>6,} of {r['full_tokens']:,} tokens (-{r['saved']:,})  {r['selected']:>2} chunk(s)")
+        print(f"    {r['path']}")
+        if r["sections"]:
+            print(f"    {', '.join(r['sections'])}")
+        if r["over_budget"]:
+            print(f"    over budget: core sections alone ~{index.core_tokens:,} tokens")
+    saved = sum(r["saved"] for r in report)
+    full = sum(r["full_tokens"] for r in report)
+    if full:
+        print(f"{len(report)} posting(s): ~{saved:,} of {full:,} profile tokens saved ({saved / full:.0%})")
+    if index.core_tokens > args.budget:
+        print(
+            f"Warning: the core sections alone are ~{index.core_tokens:,} tokens, over --budget {args.budget:,};"
+            " they are always sent"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())